@@ -0,0 +1,68 @@
+"""
+Benchmark: /ans escrito na base de dados (com group commit) vs. escrito no log de respostas (KUKO_ANSWER_LOG).
+
+Mesma carga de bench_shards (uma thread por quiz a enviar /ans de todos os participantes, todas ao mesmo tempo), com a
+base de dados num único ficheiro. Nas duas configurações, cada resposta está no disco quando /ans responde: com FULL
+(--synchronous), a base de dados faz fsync a cada commit, e o log a cada grupo de respostas acrescentadas.
+Imprime respostas/s e latências de /ans (as de log incluem as passagens para a base de dados feitas por /next).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_answer_log --quizzes 100 --participants 20 --flush-ms 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = ("db", "log")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--synchronous", default="FULL", help="PRAGMA synchronous dos commits")
+    parser.add_argument("--flush-ms", type=float, default=200, help="KUKO_ANSWER_LOG_FLUSH_MS")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)  # uso interno: processo de uma configuração
+    args = parser.parse_args()
+
+    if args.run:
+        from benchmarks.bench_shards import run
+        result = run(1, args.quizzes, args.participants, args.questions)
+        import kuko_flask
+        if kuko_flask.answer_log is not None:
+            result["flushed"] = kuko_flask.answer_log.flushed
+        print(json.dumps(result))
+        return
+
+    print(
+        f"{args.quizzes} concurrent quizzes, {args.participants} participants, {args.questions} questions, "
+        f"synchronous={args.synchronous}, flush every {args.flush_ms} ms"
+    )
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ, KUKO_GROUP_COMMIT="1", KUKO_DB_SYNCHRONOUS=args.synchronous, KUKO_WRITE_SYNCHRONOUS=args.synchronous,
+                KUKO_ANSWER_LOG=os.path.join(tmp, "answers.log") if mode == "log" else "",
+                KUKO_ANSWER_LOG_FLUSH_MS=str(args.flush_ms), KUKO_LOG_LEVEL="WARNING",
+            )
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_answer_log", "--run", mode, "--quizzes", str(args.quizzes),
+                    "--participants", str(args.participants), "--questions", str(args.questions),
+                ],
+                env=env, stdout=subprocess.PIPE, check=True, text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        flushed = f"  {result['flushed']} flushed from log" if "flushed" in result else ""
+        print(
+            f"{mode:<4} {result['answers'] / result['seconds']:>8.0f} answers/s  "
+            f"p50 {result['p50'] * 1000:>7.2f} ms  p95 {result['p95'] * 1000:>7.2f} ms  "
+            f"p99 {result['p99'] * 1000:>7.2f} ms  errors {result['errors']}{flushed}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: conexão por pedido (comportamento antigo de connect_db) vs. ConnectionPool.
+
+Cada "pedido" simulado faz o mesmo que a rota /score: obtém uma conexão, executa
+Kuko.get_participant_score e liberta a conexão. (A rota /get já não consulta a base de
+dados enquanto o estado do quiz estiver em cache.)
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_connections --requests 20000 --threads 4
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import isfile
+
+from kuko_data import Kuko
+from setup_db import init_db, ConnectionPool
+
+def prepare_db(dbname, participants):
+    """
+    Cria base de dados de teste, com o quiz 1 lançado e participantes registados.
+    """
+    init_db(dbname)
+    connection = sqlite3.connect(dbname)
+    kd = Kuko(lambda query, args=(), one=False: _run(connection, query, args, one))
+    for participant in range(1, participants + 1):
+        kd.register_participant(1, participant)
+    kd.launch_quiz(1)
+    connection.commit()
+    connection.close()
+
+def _run(connection, query, args, one):
+    cursor = connection.execute(query, args)
+    res = cursor.fetchall()
+    cursor.close()
+    return (res[0] if res else None) if one else res
+
+def run(label, acquire, release, requests, threads, participants):
+    """
+    Executa os pedidos simulados e imprime pedidos/s.
+    """
+    local = threading.local()
+    kd = Kuko(lambda query, args=(), one=False: _run(local.connection, query, args, one))
+
+    def one_request(i):
+        local.connection = acquire()
+        try:
+            kd.get_participant_score(1, i % participants + 1)
+        finally:
+            release(local.connection)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<22} {requests / elapsed:>10.0f} req/s  ({elapsed:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--participants", type=int, default=100)
+    parser.add_argument("--synchronous", default="NORMAL")
+    parser.add_argument("--mmap-size", type=int, default=256 * 1024 * 1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dbname = os.path.join(tmp, "kuko.db")
+        prepare_db(dbname, args.participants)
+
+        def legacy_acquire():
+            # Comportamento anterior de connect_db: stat ao ficheiro e nova conexão a cada pedido
+            isfile(dbname)
+            return sqlite3.connect(dbname)
+
+        run("connect-per-request", legacy_acquire, lambda connection: connection.close(), args.requests, args.threads, args.participants)
+
+        pool = ConnectionPool(dbname, synchronous=args.synchronous, mmap_size=args.mmap_size)
+        run("ConnectionPool", pool.acquire, pool.release, args.requests, args.threads, args.participants)
+        pool.close_all()
+
+if __name__ == "__main__":
+    main()
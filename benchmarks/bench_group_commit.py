@@ -0,0 +1,66 @@
+"""
+Benchmark: cada pedido faz o seu commit (KUKO_GROUP_COMMIT=0) vs. escritas feitas por um único writer, com group commit.
+
+Mesma carga de bench_shards (uma thread por quiz a enviar /ans de todos os participantes, todas ao mesmo tempo), com a
+base de dados num único ficheiro. Nas duas configurações, cada commit usa o mesmo PRAGMA synchronous (--synchronous; com
+FULL, cada commit espera pelo disco). Imprime respostas/s, latências de /ans e o nº médio de escritas por commit.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_group_commit --quizzes 100 --participants 20 --max-delay-ms 1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODES = ("direct", "group")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--synchronous", default="FULL", help="PRAGMA synchronous dos commits")
+    parser.add_argument("--max-batch", type=int, default=64, help="KUKO_WRITE_MAX_BATCH")
+    parser.add_argument("--max-delay-ms", type=float, default=1, help="KUKO_WRITE_MAX_DELAY_MS")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)  # uso interno: processo de uma configuração
+    args = parser.parse_args()
+
+    if args.run:
+        from benchmarks.bench_shards import run
+        result = run(1, args.quizzes, args.participants, args.questions)
+        import kuko_flask
+        if kuko_flask.db_writer is not None:
+            result["per_commit"] = kuko_flask.db_writer.committed / max(kuko_flask.db_writer.commits, 1)
+        print(json.dumps(result))
+        return
+
+    print(
+        f"{args.quizzes} concurrent quizzes, {args.participants} participants, {args.questions} questions, "
+        f"synchronous={args.synchronous}, max batch {args.max_batch}, max delay {args.max_delay_ms} ms"
+    )
+    for mode in args.modes:
+        env = dict(
+            os.environ, KUKO_GROUP_COMMIT="1" if mode == "group" else "0", KUKO_DB_SYNCHRONOUS=args.synchronous,
+            KUKO_WRITE_SYNCHRONOUS=args.synchronous, KUKO_WRITE_MAX_BATCH=str(args.max_batch),
+            KUKO_WRITE_MAX_DELAY_MS=str(args.max_delay_ms), KUKO_LOG_LEVEL="WARNING",
+        )
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_group_commit", "--run", mode, "--quizzes", str(args.quizzes),
+                "--participants", str(args.participants), "--questions", str(args.questions),
+            ],
+            env=env, stdout=subprocess.PIPE, check=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        per_commit = f"  {result['per_commit']:.1f} writes/commit" if "per_commit" in result else ""
+        print(
+            f"{mode:<7} {result['answers'] / result['seconds']:>8.0f} answers/s  "
+            f"p50 {result['p50'] * 1000:>7.2f} ms  p95 {result['p95'] * 1000:>7.2f} ms  "
+            f"p99 {result['p99'] * 1000:>7.2f} ms  errors {result['errors']}{per_commit}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: importação de um banco de questões com uma chamada a Kuko.add_new_question por questão
+vs. Kuko.add_questions_bulk em transações de --chunk-size questões (o que faz a rota /question/bulk).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_import --questions 100000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from kuko_data import Kuko
+from setup_db import init_db
+
+def make_kuko(connection):
+    def query_db(query, args=(), one=False):
+        cursor = connection.execute(query, args)
+        res = cursor.fetchall()
+        cursor.close()
+        return (res[0] if res else None) if one else res
+
+    def query_many_db(query, args_list):
+        connection.executemany(query, args_list).close()
+
+    return Kuko(query_db, query_many_db)
+
+def question_lines(n):
+    """
+    Gera n linhas JSON, no formato aceite por /question/bulk.
+    """
+    for i in range(n):
+        yield json.dumps({"question": f"Question {i}?", "answers": ["a", "b", "c", "d"], "right_answer": i % 4 + 1})
+
+def import_one_by_one(dbname, n):
+    connection = sqlite3.connect(dbname)
+    kd = make_kuko(connection)
+    for line in question_lines(n):
+        args = json.loads(line)
+        kd.add_new_question(args["question"], args["answers"], args["right_answer"])
+        connection.commit()  # um commit por questão, como na rota /question
+    connection.close()
+
+def import_bulk(dbname, n, chunk_size):
+    connection = sqlite3.connect(dbname)
+    kd = make_kuko(connection)
+    chunk = []
+    for line in question_lines(n):
+        args = json.loads(line)
+        chunk.append((args["question"], args["answers"], args["right_answer"]))
+        if len(chunk) >= chunk_size:
+            kd.add_questions_bulk(chunk)
+            connection.commit()
+            chunk.clear()
+    if chunk:
+        kd.add_questions_bulk(chunk)
+        connection.commit()
+    connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--one-by-one", type=int, default=5000, help="nº de questões a importar uma a uma")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, n, func in (
+            ("one by one", args.one_by_one, lambda dbname: import_one_by_one(dbname, args.one_by_one)),
+            ("bulk", args.questions, lambda dbname: import_bulk(dbname, args.questions, args.chunk_size)),
+        ):
+            dbname = os.path.join(tmp, f"{label.replace(' ', '_')}.db")
+            init_db(dbname)
+            start = time.perf_counter()
+            func(dbname)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<12} {n:>9} questions {elapsed:>8.2f}s  {n / elapsed:>10.0f} questions/s")
+
+if __name__ == "__main__":
+    main()
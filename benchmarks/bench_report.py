@@ -0,0 +1,110 @@
+"""
+Benchmark: relatório de um quiz (/rel) com o cálculo antigo, uma query por resultado (N+1),
+vs. uma única query agregada sobre results (Kuko.compute_quiz_scores),
+vs. Kuko.get_quiz_report, que lê as pontuações mantidas em quiz_score.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_report --participants 5000 --questions 20
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from kuko_data import Kuko
+from setup_db import init_db
+
+def prepare_db(dbname, participants, questions):
+    """
+    Cria base de dados de teste com um quiz terminado, em que todos os participantes responderam a todas as perguntas.
+    Devolve o identificador do quiz.
+    """
+    init_db(dbname)
+    connection = sqlite3.connect(dbname)
+    kd = Kuko(lambda query, args=(), one=False: _run(connection, query, args, one))
+
+    question_ids = [str(kd.add_new_question(f"Question {i}?", ["a", "b", "c", "d"], random.randint(1, 4))[0]) for i in range(questions)]
+    id_qset = kd.add_new_question_set(question_ids)[0]
+    id_quiz = kd.add_new_quiz(id_qset, [str(random.randint(1, 10)) for _ in range(questions)])[0][0]
+
+    connection.executemany(
+        "INSERT INTO quiz_participant (id_quiz, participant) VALUES (?, ?)",
+        ((id_quiz, participant) for participant in range(1, participants + 1)),
+    )
+    connection.executemany(
+        "INSERT INTO results (id_quiz, question_i, participant, answer) VALUES (?, ?, ?, ?)",
+        (
+            (id_quiz, question_i, participant, random.randint(1, 4))
+            for question_i in range(questions)
+            for participant in range(1, participants + 1)
+        ),
+    )
+    connection.execute("UPDATE quiz SET state = 'ENDED', question_i = ? WHERE id_quiz = ?", (questions - 1, id_quiz))
+    # Resultados foram inseridos diretamente, por isso calculamos quiz_score a partir deles
+    kd.rebuild_quiz_scores(id_quiz)
+    connection.commit()
+    connection.close()
+
+    return id_quiz
+
+def _run(connection, query, args, one):
+    cursor = connection.execute(query, args)
+    res = cursor.fetchall()
+    cursor.close()
+    return (res[0] if res else None) if one else res
+
+def legacy_report(query_db, id_quiz):
+    """
+    Cálculo anterior do relatório: todos os resultados numa query, e uma query por resultado para obter a resposta certa.
+    """
+    quiz_info = query_db(
+        "SELECT q.state, q.id_qset, re.question_i, re.participant, re.answer FROM quiz q LEFT OUTER JOIN results re ON re.id_quiz = q.id_quiz WHERE q.id_quiz = ? ORDER BY re.question_i, re.participant",
+        (id_quiz, ),
+    )
+    scores = {}
+    for result in quiz_info:
+        question_right_answer, points = query_db(
+            "SELECT qu.k, qp.points FROM qset_question qq JOIN question qu ON qu.id_question = qq.id_question JOIN quiz_points qp ON qp.id_quiz = ? AND qp.position = qq.position WHERE qq.id_qset = ? AND qq.position = ?",
+            (id_quiz, result[1], result[2]), one = True
+        )
+        scores[result[3]] = scores.get(result[3], 0) + (points if question_right_answer == result[-1] else 0)
+
+    return (id_quiz, scores)
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<22} {elapsed * 1000:>10.1f} ms/report")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dbname = os.path.join(tmp, "kuko.db")
+        id_quiz = prepare_db(dbname, args.participants, args.questions)
+        print(f"{args.participants * args.questions} result rows")
+
+        connection = sqlite3.connect(dbname)
+        query_db = lambda query, args=(), one=False: _run(connection, query, args, one)
+
+        kd = Kuko(query_db)
+        legacy = timed("N+1 queries", lambda: legacy_report(query_db, id_quiz), args.repeat)
+        aggregate = timed("aggregate query", lambda: kd.compute_quiz_scores(id_quiz), args.repeat)
+        report = timed("quiz_score table", lambda: kd.get_quiz_report(id_quiz), args.repeat)
+
+        # Mesmo conteúdo e mesma ordem de participantes
+        assert list(legacy[1].items()) == list(report[1].items()), "Reports differ"
+        assert dict(legacy[1]) == {participant: score for participant, score, _ in aggregate}, "Reports differ"
+        connection.close()
+
+if __name__ == "__main__":
+    main()
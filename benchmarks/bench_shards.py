@@ -0,0 +1,126 @@
+"""
+Benchmark: escritas concorrentes em muitos quizzes, com a base de dados num único ficheiro vs. dividida em shards (KUKO_DB_SHARDS).
+
+São criados --quizzes quizzes (100 por omissão), lançados, com --participants participantes cada. Depois, uma thread por
+quiz envia /ans de todos os participantes, pergunta a pergunta (com /next entre perguntas), todas ao mesmo tempo.
+Cada /ans é uma transação de escrita: num único ficheiro, todas esperam pelo mesmo lock; com shards, só as dos quizzes
+do mesmo shard. Os pedidos passam pela app Flask (test_client, sem rede), com um ZooKeeper em memória.
+Cada configuração corre num processo próprio, sobre uma base de dados temporária. Imprime respostas/s e latências de /ans.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_shards --quizzes 100 --participants 20 --shards 1 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+def run(shards, quizzes, participants, questions):
+    """
+    (Processo de cada configuração) Prepara os quizzes e mede /ans. Devolve os resultados num dict.
+    """
+    tmp = tempfile.TemporaryDirectory()
+    dbname = os.path.join(tmp.name, "kuko.db")
+    os.environ["KUKO_DB"] = dbname
+    os.environ["KUKO_DB_SHARDS"] = str(shards)
+
+    # O quiz de exemplo de schema.sql fica na base de dados principal: é movido para o seu shard antes do arranque
+    from shard_db import reshard
+    reshard(dbname, shards, vacuum=False, report=lambda message: None)
+
+    import kuko_flask
+    from tests import fake_zk
+    fake_zk.install(kuko_flask)
+
+    client = kuko_flask.app.test_client()
+    lines = "\n".join(
+        json.dumps({"question": f"Question {i}?", "answers": ["a", "b", "c", "d"], "right_answer": i % 4 + 1})
+        for i in range(questions)
+    )
+    first_id = client.post("/question/bulk?client_id=1", data=lines).get_json()["data"]["ids"][0][0]
+    response = client.post("/qset", json={"questions": [str(i) for i in range(first_id, first_id + questions)], "client_id": 1})
+    id_qset = int(response.get_json()["message"].split("QSet ID: ")[1].split("\n")[0])
+
+    quiz_ids = []
+    for _ in range(quizzes):
+        response = client.post("/quiz", json={"qset_id": str(id_qset), "scores": ["10"] * questions, "client_id": 1})
+        id_quiz = int(response.get_json()["message"].rsplit(" ", 1)[1])
+        for participant in range(1, participants + 1):
+            client.post(f"/reg/{id_quiz}", json={"client_id": participant})
+        client.post(f"/launch/{id_quiz}", json={"client_id": 1})
+        quiz_ids.append(id_quiz)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(quizzes)
+
+    def answer_quiz(id_quiz):
+        nonlocal errors
+        quiz_client = kuko_flask.app.test_client()
+        for question in range(questions):
+            barrier.wait()
+            for participant in range(1, participants + 1):
+                start = time.perf_counter()
+                response = quiz_client.post(f"/ans/{id_quiz}", json={"client_id": participant, "answer_given": question % 4 + 1})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    errors += response.status_code != 200
+            quiz_client.post(f"/next/{id_quiz}", json={"client_id": 1})
+
+    threads = [threading.Thread(target=answer_quiz, args=(id_quiz,)) for id_quiz in quiz_ids]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+
+    kuko_flask.zk_publisher.stop(0)
+    latencies.sort()
+    return {
+        "answers": len(latencies), "errors": errors, "seconds": total,
+        "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 8], help="nº de shards de cada configuração")
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous das conexões (KUKO_DB_SYNCHRONOUS)")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)  # uso interno: processo de uma configuração
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(args.run, args.quizzes, args.participants, args.questions)))
+        return
+
+    print(f"{args.quizzes} concurrent quizzes, {args.participants} participants, {args.questions} questions, synchronous={args.synchronous}")
+    for shards in args.shards:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_shards", "--run", str(shards), "--quizzes", str(args.quizzes),
+                "--participants", str(args.participants), "--questions", str(args.questions),
+            ],
+            env=dict(os.environ, KUKO_DB_SYNCHRONOUS=args.synchronous, KUKO_LOG_LEVEL="WARNING"),
+            stdout=subprocess.PIPE, check=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{shards:>3} shard(s) {result['answers'] / result['seconds']:>8.0f} answers/s  "
+            f"p50 {result['p50'] * 1000:>7.2f} ms  p95 {result['p95'] * 1000:>7.2f} ms  "
+            f"p99 {result['p99'] * 1000:>7.2f} ms  errors {result['errors']}"
+        )
+
+if __name__ == "__main__":
+    main()
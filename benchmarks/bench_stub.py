@@ -0,0 +1,106 @@
+"""
+Benchmark: latência por chamada do cliente com um pedido avulso por chamada (requests.get, como o KukoStub fazia,
+com nova conexão TCP e handshake mTLS a cada pedido) vs. uma sessão persistente (kuko_stub.make_session).
+
+O servidor (kuko_asgi, com mTLS) corre num processo próprio, sobre uma base de dados temporária com o quiz 1
+lançado. Os certificados (CA, servidor e cliente) são gerados para o teste com o comando openssl.
+
+Uso (a partir da raiz do repositório, requer uvicorn e a2wsgi):
+    python -m benchmarks.bench_stub --requests 500
+"""
+import argparse
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchmarks.bench_connections import prepare_db
+from benchmarks.load_async import wait_for_port
+from kuko_stub import make_session
+
+def openssl(*args, cwd):
+    subprocess.run(["openssl", *args], cwd=cwd, check=True, capture_output=True)
+
+def make_certificates(folder):
+    """
+    Gera CA, certificado do servidor (para localhost) e certificado do cliente, assinados pela CA.
+    """
+    openssl("req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", "root.key", "-out", "root.pem",
+            "-days", "1", "-subj", "/CN=Kuko Test CA", cwd=folder)
+    with open(os.path.join(folder, "san.cnf"), "w") as f:
+        f.write("subjectAltName=DNS:localhost,IP:127.0.0.1\n")
+    for name, subject in (("serv", "/CN=localhost"), ("cli", "/CN=kuko-client")):
+        openssl("req", "-newkey", "rsa:2048", "-nodes", "-keyout", f"{name}.key", "-out", f"{name}.csr", "-subj", subject, cwd=folder)
+        openssl("x509", "-req", "-in", f"{name}.csr", "-CA", "root.pem", "-CAkey", "root.key", "-CAcreateserial",
+                "-out", f"{name}.crt", "-days", "1", "-sha256", "-extfile", "san.cnf", cwd=folder)
+
+def serve(port, folder):
+    """
+    Arranca o servidor com mTLS (num processo filho), no modo assíncrono (kuko_asgi). Usa a base de dados indicada em KUKO_DB.
+    (O servidor de desenvolvimento do Flask fecha a conexão após cada resposta, pelo que não permite reutilizá-las.)
+    """
+    import uvicorn
+    from kuko_asgi import app
+    uvicorn.run(
+        app, host="localhost", port=port, lifespan="off", log_level="warning",
+        ssl_keyfile=os.path.join(folder, "serv.key"),
+        ssl_certfile=os.path.join(folder, "serv.crt"),
+        ssl_ca_certs=os.path.join(folder, "root.pem"),
+        ssl_cert_reqs=ssl.CERT_REQUIRED,
+    )
+
+def run(label, get, url, requests_count):
+    """
+    Executa os pedidos, um de cada vez, e imprime latência média e p99 por chamada.
+    """
+    latencies = []
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        get(url).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<22} mean {mean * 1000:>7.2f} ms  p99 {p99 * 1000:>7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--port", type=int, default=5200)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)  # uso interno: processo do servidor (pasta dos certificados)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.serve)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_certificates(tmp)
+        dbname = os.path.join(tmp, "kuko.db")
+        prepare_db(dbname, 1)
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_stub", "--serve", tmp, "--port", str(args.port)],
+            env=dict(os.environ, KUKO_DB=dbname), stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(args.port)
+            url = f"https://localhost:{args.port}/get/1?client_id=1"
+            ca_file = os.path.join(tmp, "root.pem")
+            cert = (os.path.join(tmp, "cli.crt"), os.path.join(tmp, "cli.key"))
+
+            run("request per call", lambda url: requests.get(url, verify=ca_file, cert=cert), url, args.requests)
+
+            session = make_session(cert, ca_file=ca_file)
+            run("persistent session", session.get, url, args.requests)
+            session.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Teste de carga: servidor WSGI com uma thread por conexão (werkzeug, threaded) vs. modo assíncrono (kuko_asgi, uvicorn).
+
+Cada servidor corre num processo próprio, em HTTP simples, sobre uma base de dados temporária com o quiz 1
+lançado. Um cliente asyncio abre --concurrency conexões em simultâneo, cada uma com um pedido GET /get/1 de um participante,
+até completar --requests pedidos, e imprime pedidos/s, latências (p50, p95, p99) e nº de erros.
+
+Uso (a partir da raiz do repositório, requer uvicorn e a2wsgi):
+    python -m benchmarks.load_async --concurrency 2000 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_connections import prepare_db
+
+SERVERS = ("threaded", "async")
+
+def serve(mode, port):
+    """
+    Arranca o servidor (num processo filho). Usa a base de dados indicada em KUKO_DB.
+    """
+    if mode == "threaded":
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # sem uma linha de log por pedido
+        from kuko_flask import app
+        make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from kuko_asgi import app
+        # lifespan="off": o teste não precisa de ZooKeeper (GET /get não publica nada)
+        uvicorn.run(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning", backlog=4096)
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+async def one_request(port, request, timeout):
+    """
+    Envia um pedido numa conexão nova e devolve (código HTTP, latência em segundos).
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+    try:
+        writer.write(request)
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(response.split(b" ", 2)[1])
+    return status, time.perf_counter() - start
+
+async def load(port, concurrency, requests, participants, timeout):
+    """
+    Executa os pedidos com --concurrency conexões em simultâneo.
+
+    Returns:
+    - tuple: (latências dos pedidos com sucesso, nº de erros, duração total)
+    """
+    requests_by_participant = [
+        f"GET /get/1?client_id={participant} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nConnection: close\r\n\r\n".encode()
+        for participant in range(1, participants + 1)
+    ]
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            try:
+                status, latency = await one_request(port, requests_by_participant[remaining % participants], timeout)
+                if status == 200:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000 if values else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--participants", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+    parser.add_argument("--serve", choices=SERVERS, help=argparse.SUPPRESS)  # uso interno: processo do servidor
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dbname = os.path.join(tmp, "kuko.db")
+        prepare_db(dbname, args.participants)
+        env = dict(os.environ, KUKO_DB=dbname)
+
+        print(f"{args.requests} requests, {args.concurrency} concurrent connections")
+        for i, mode in enumerate(args.servers):
+            port = args.port + i
+            server = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.load_async", "--serve", mode, "--port", str(port)],
+                env=env, stdout=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_port(port)
+                latencies, errors, elapsed = asyncio.run(load(port, args.concurrency, args.requests, args.participants, args.timeout))
+            finally:
+                server.terminate()
+                server.wait()
+
+            latencies.sort()
+            print(
+                f"{mode:<10} {len(latencies) / elapsed:>8.0f} req/s  "
+                f"p50 {percentile(latencies, 50):>7.1f} ms  p95 {percentile(latencies, 95):>7.1f} ms  "
+                f"p99 {percentile(latencies, 99):>7.1f} ms  errors {errors}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Teste de carga de ponta a ponta: simula quizzes completos sobre kuko_flask.app, com um ZooKeeper em memória.
+
+Para cada quiz: /quiz -> /reg x N -> /launch -> (/get x N, /ans x N, /next) x Q -> /rel.
+Os pedidos passam por toda a aplicação Flask (test_client, sem rede), sobre uma base de dados temporária.
+Imprime, por rota, nº de pedidos, erros, pedidos/s e latências (p50, p95, p99), e o tamanho da base de dados.
+Com --output, os resultados são escritos em JSON (chaves ordenadas, valores arredondados), para comparar execuções com diff.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.load_e2e --participants 1000 --questions 10 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROUTES = ("quiz", "reg", "launch", "get", "ans", "next", "rel")
+
+class Recorder:
+    """
+    Guarda a latência e o resultado de cada pedido, por rota.
+    """
+
+    def __init__(self):
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self.elapsed = {route: 0.0 for route in ROUTES}
+        self._lock = threading.Lock()
+
+    def add(self, route, latency, ok):
+        with self._lock:
+            self.latencies[route].append(latency)
+            if not ok:
+                self.errors[route] += 1
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+class QuizSimulation:
+    """
+    Executa os pedidos de um quiz completo através de um cliente de teste da app Flask.
+    """
+
+    def __init__(self, app, recorder, threads):
+        self.app = app
+        self.recorder = recorder
+        self.threads = threads
+        self.local = threading.local()
+
+    def client(self):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        return self.local.client
+
+    def call(self, route, method, url, **kwargs):
+        start = time.perf_counter()
+        response = getattr(self.client(), method)(url, **kwargs)
+        self.recorder.add(route, time.perf_counter() - start, response.status_code == 200)
+        return response
+
+    def phase(self, route, function, items):
+        """
+        Executa function para cada item (com --threads threads) e soma a duração da fase à rota.
+        """
+        start = time.perf_counter()
+        if self.threads > 1:
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                list(executor.map(function, items))
+        else:
+            for item in items:
+                function(item)
+        self.recorder.elapsed[route] += time.perf_counter() - start
+
+    def run(self, id_qset, participants, questions):
+        start = time.perf_counter()
+        response = self.call("quiz", "post", "/quiz", json={"qset_id": str(id_qset), "scores": ["10"] * questions, "client_id": 1})
+        self.recorder.elapsed["quiz"] += time.perf_counter() - start
+        id_quiz = int(response.get_json()["message"].rsplit(" ", 1)[1])
+
+        ids = range(1, participants + 1)
+        self.phase("reg", lambda p: self.call("reg", "post", f"/reg/{id_quiz}", json={"client_id": p}), ids)
+
+        start = time.perf_counter()
+        self.call("launch", "post", f"/launch/{id_quiz}", json={"client_id": 1})
+        self.recorder.elapsed["launch"] += time.perf_counter() - start
+
+        for _ in range(questions):
+            self.phase("get", lambda p: self.call("get", "get", f"/get/{id_quiz}?client_id={p}"), ids)
+            self.phase("ans", lambda p: self.call("ans", "post", f"/ans/{id_quiz}", json={"client_id": p, "answer_given": random.randint(1, 4)}), ids)
+
+            start = time.perf_counter()
+            self.call("next", "post", f"/next/{id_quiz}", json={"client_id": 1})
+            self.recorder.elapsed["next"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.call("rel", "get", f"/rel/{id_quiz}")
+        self.recorder.elapsed["rel"] += time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--quizzes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="threads concorrentes nas fases /reg, /get e /ans")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="ficheiro JSON para os resultados")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    tmp = tempfile.TemporaryDirectory()
+    dbname = os.path.join(tmp.name, "kuko.db")
+    os.environ["KUKO_DB"] = dbname
+
+    import kuko_flask
+    from tests import fake_zk
+    fake_zk.install(kuko_flask)
+
+    recorder = Recorder()
+    simulation = QuizSimulation(kuko_flask.app, recorder, args.threads)
+
+    # Banco de questões e qset usados por todos os quizzes
+    client = kuko_flask.app.test_client()
+    lines = "\n".join(
+        json.dumps({"question": f"Question {i}?", "answers": ["a", "b", "c", "d"], "right_answer": i % 4 + 1})
+        for i in range(args.questions)
+    )
+    first_id = client.post("/question/bulk?client_id=1", data=lines).get_json()["data"]["ids"][0][0]
+    response = client.post("/qset", json={"questions": [str(i) for i in range(first_id, first_id + args.questions)], "client_id": 1})
+    id_qset = int(response.get_json()["message"].split("QSet ID: ")[1].split("\n")[0])
+
+    start = time.perf_counter()
+    for _ in range(args.quizzes):
+        simulation.run(id_qset, args.participants, args.questions)
+    total = time.perf_counter() - start
+
+    kuko_flask.db_pool.close_all()
+    db_size = sum(os.path.getsize(dbname + suffix) for suffix in ("", "-wal") if os.path.exists(dbname + suffix))
+
+    results = {
+        "parameters": {
+            "participants": args.participants, "questions": args.questions, "quizzes": args.quizzes,
+            "threads": args.threads, "seed": args.seed,
+        },
+        "environment": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": sys.platform},
+        "total_seconds": round(total, 3),
+        "db_size_bytes": db_size,
+        "routes": {},
+    }
+
+    print(f"{'route':<8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route in ROUTES:
+        latencies = sorted(recorder.latencies[route])
+        elapsed = recorder.elapsed[route]
+        stats = {
+            "requests": len(latencies),
+            "errors": recorder.errors[route],
+            "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+        results["routes"][route] = stats
+        print(f"{route:<8} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput']:>9.0f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    print(f"total {total:.2f}s, database {db_size / 1024 / 1024:.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
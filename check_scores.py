@@ -0,0 +1,89 @@
+"""
+Verifica a consistência das pontuações guardadas em quiz_score com as respostas registadas em results.
+
+Uso:
+    python check_scores.py [--db kuko.db] [--shards N] [--quiz ID] [--repair]
+
+Sem --repair, apenas lista as diferenças (termina com código 1 se existirem).
+Com --repair, reconstrói quiz_score a partir de results nos quizzes com diferenças.
+Com a base de dados dividida em shards (KUKO_DB_SHARDS), --shards deve ter o mesmo valor: são verificados todos os shards.
+"""
+import argparse
+import sys
+
+from kuko_data import Kuko
+from setup_db import init_db, connect_db, shard_path, shard_index, BANK_ALIAS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="kuko.db", help="base de dados a verificar")
+    parser.add_argument("--shards", type=int, default=1, help="nº de shards da base de dados (KUKO_DB_SHARDS)")
+    parser.add_argument("--quiz", type=int, help="identificador do quiz a verificar (por omissão, todos)")
+    parser.add_argument("--repair", action="store_true", help="reconstrói as pontuações dos quizzes com diferenças")
+    args = parser.parse_args()
+
+    init_db(args.db)
+
+    if args.shards > 1:
+        shards = [shard_path(args.db, index) for index in range(args.shards)]
+        if args.quiz is not None:
+            shards = [shards[shard_index(args.quiz, args.shards)]]
+    else:
+        shards = [args.db]
+
+    checked = inconsistent = 0
+    for dbname in shards:
+        attach = {BANK_ALIAS: args.db} if dbname != args.db else None
+        connection = connect_db(dbname, synchronous="FULL", attach=attach)
+        try:
+            quizzes, differences = check_db(connection, args.quiz, args.repair)
+        finally:
+            connection.close()
+        checked += quizzes
+        inconsistent += differences
+
+    print(f"Checked {checked} quiz(zes), {inconsistent} inconsistent.")
+
+    if inconsistent and not args.repair:
+        sys.exit(1)
+
+def check_db(connection, id_quiz=None, repair=False):
+    """
+    Verifica (e, com repair, reconstrói) as pontuações dos quizzes guardados numa base de dados.
+
+    Returns:
+    - tuple: (nº de quizzes verificados, nº de quizzes com diferenças)
+    """
+    def query_db(query, args=(), one=False):
+        cursor = connection.execute(query, args)
+        res = cursor.fetchall()
+        cursor.close()
+        return (res[0] if res else None) if one else res
+
+    kd = Kuko(query_db)
+
+    if id_quiz is not None:
+        quiz_ids = [id_quiz]
+    else:
+        quiz_ids = [quiz[0] for quiz in query_db("SELECT id_quiz FROM quiz ORDER BY id_quiz")]
+
+    inconsistent = 0
+    for id_quiz in quiz_ids:
+        differences = kd.check_quiz_scores(id_quiz)
+        if not differences:
+            continue
+
+        inconsistent += 1
+        print(f"Quiz {id_quiz}: {len(differences)} participant(s) with inconsistent scores")
+        for participant, stored, expected in differences:
+            print(f"  participant {participant}: stored={stored} expected={expected}")
+
+        if repair:
+            kd.rebuild_quiz_scores(id_quiz)
+            connection.commit()
+            print(f"  rebuilt scores of quiz {id_quiz}")
+
+    return len(quiz_ids), inconsistent
+
+if __name__ == "__main__":
+    main()
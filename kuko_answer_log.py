@@ -0,0 +1,261 @@
+import glob
+import os
+import threading
+
+from kuko_logging import log
+
+class AnswerLog:
+    """
+    Registo local (append-only) das respostas aceites, para /ans responder sem esperar pela base de dados.
+
+    Cada resposta aceite é acrescentada ao ficheiro do log, e o pedido só recebe resposta depois de um fsync que a inclua
+    (uma thread faz fsync de todas as respostas acrescentadas entretanto, de uma só vez). Uma segunda thread passa
+    periodicamente as respostas para a base de dados, em bloco (função apply), e apaga a parte do log já passada.
+    Se o processo terminar antes disso, as respostas que ficaram no log são passadas para a base de dados no arranque (replay).
+
+    O log é dividido em segmentos (path.000000, path.000001, ...): a cada passagem para a base de dados, o segmento atual
+    é fechado e começa um novo; um segmento só é apagado depois de todas as suas respostas estarem commited.
+
+    As respostas repetidas (mesmo participante, quiz e pergunta) são detetadas em memória: por quiz, é guardado o conjunto
+    de participantes que já responderam à pergunta atual (lido da base de dados na primeira resposta a cada pergunta), e
+    descartado quando o quiz termina. Assume que todas as respostas de um quiz são recebidas por este processo.
+    """
+
+    def __init__(self, path, apply, load_answered, flush_interval=0.2, max_pending=5000):
+        """
+        Args:
+        - path (str): caminho base dos ficheiros do log
+        - apply (function): recebe lista de respostas (id_quiz, question_i, participante, resposta, pontos) e guarda-as na base
+          de dados, com commit; deve ignorar respostas já guardadas (são repetidas se o processo terminar a meio de uma passagem)
+        - load_answered (function): dados id_quiz e question_i, devolve o conjunto de participantes com resposta na base de dados,
+          ou None se question_i já não for a pergunta atual do quiz (ou o quiz já não estiver a decorrer)
+        - flush_interval (float): intervalo, em segundos, entre passagens das respostas para a base de dados
+        - max_pending (int): nº de respostas por passar a partir do qual é feita uma passagem, sem esperar pelo intervalo
+        """
+        self.path = path
+        self.apply = apply
+        self.load_answered = load_answered
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._answered = {}  # id_quiz -> (question_i, participantes que já responderam)
+        self._changes = 0  # incrementado por close e forget
+        self._rows = []  # respostas do segmento atual
+        self._sealed = []  # (ficheiro, respostas) de segmentos fechados, por passar para a base de dados
+        self._file = None
+        self._segment = 0
+        self._written = 0  # nº de respostas acrescentadas ao log
+        self._synced = 0  # nº de respostas já no disco (fsync)
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._sync_lock = threading.Lock()  # fsync e troca de segmento (adquirido antes de _cond)
+        self._flush_lock = threading.Lock()
+
+        self.flushed = 0
+        self.failures = 0
+
+    def segment_path(self, segment):
+        return f"{self.path}.{segment:06d}"
+
+    def start(self):
+        """
+        Passa para a base de dados as respostas que ficaram no log (replay) e começa um novo segmento.
+        """
+        segments = sorted(glob.glob(glob.escape(self.path) + ".[0-9]*"))
+        for path in segments:
+            rows = read_segment(path)
+            if rows:
+                self.apply(rows)
+                log.info("Replayed %d answer(s) from %s", len(rows), path)
+            os.remove(path)
+        if segments:
+            self._segment = int(segments[-1].rsplit(".", 1)[1]) + 1
+
+        self._file = open(self.segment_path(self._segment), "a")
+        threading.Thread(target=self._run_sync, name="kuko-answer-log-sync", daemon=True).start()
+        threading.Thread(target=self._run_flush, name="kuko-answer-log-flush", daemon=True).start()
+
+    def stop(self):
+        """
+        Passa para a base de dados as respostas pendentes e fecha o log.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        try:
+            self.flush()
+        except Exception as e:
+            log.warning("Couldn't flush answer log on shutdown, answers will be replayed on startup: %s", e)
+        with self._sync_lock, self._cond:
+            self._file.close()
+            if not self._rows and not self._sealed:
+                os.remove(self.segment_path(self._segment))
+
+    def add(self, id_quiz, question_i, id_participant, answer, points):
+        """
+        Acrescenta uma resposta ao log, se o participante ainda não tiver respondido a esta pergunta, e espera pelo fsync.
+
+        Returns:
+        - bool: True se a resposta foi aceite, False se o participante já tinha respondido; None se o quiz já passou
+          a outra pergunta (o estado usado para validar a resposta está desatualizado)
+        """
+        accepted = self.add_many(id_quiz, question_i, [(id_participant, answer, points)])
+        return None if accepted is None else accepted[0]
+
+    def add_many(self, id_quiz, question_i, answers):
+        """
+        Acrescenta várias respostas à mesma pergunta de um quiz, com um único fsync (ver add).
+
+        Args:
+        - answers (list[tuple]): lista de (participante, resposta, pontos obtidos)
+
+        Returns:
+        - list[bool]: para cada resposta, se foi aceite; None se a pergunta já não aceita respostas (ver close)
+        """
+        while True:
+            with self._cond:
+                entry = self._answered.get(id_quiz)
+                if entry is not None and entry[0] > question_i:
+                    return None
+                if entry is not None and entry[0] == question_i and entry[1] is not None:
+                    # Verificação e escrita no log com _cond: close não pode fechar a pergunta entre as duas
+                    return self._append(id_quiz, question_i, entry[1], answers)
+                changes = self._changes
+
+            # Primeira resposta a esta pergunta: participantes que já responderam são lidos da base de dados
+            answered = self.load_answered(id_quiz, question_i)
+            if answered is None:
+                return None
+            with self._cond:
+                # Se houve um close ou forget durante a leitura, o que foi lido pode já estar desatualizado: lê de novo
+                if changes == self._changes:
+                    entry = self._answered.get(id_quiz)
+                    if entry is None or entry[0] < question_i or (entry[0] == question_i and entry[1] is None):
+                        self._answered[id_quiz] = (question_i, answered)
+
+    def _append(self, id_quiz, question_i, answered, answers):
+        """
+        (Com _cond) Acrescenta ao log as respostas de participantes que ainda não responderam, e espera pelo fsync.
+        """
+        accepted = []
+        for id_participant, answer, points in answers:
+            if id_participant in answered:
+                accepted.append(False)
+                continue
+            answered.add(id_participant)
+
+            row = (id_quiz, question_i, id_participant, answer, points)
+            self._file.write("%d %d %d %d %d\n" % row)
+            self._rows.append(row)
+            self._written += 1
+            accepted.append(True)
+
+        position = self._written
+        self._cond.notify_all()
+        while self._synced < position:
+            self._cond.wait()
+        return accepted
+
+    def close(self, id_quiz, question_i):
+        """
+        Deixa de aceitar respostas à pergunta question_i (e anteriores) de um quiz, ex: antes de o quiz avançar.
+        Depois de close, flush passa para a base de dados todas as respostas a essa pergunta.
+        """
+        with self._cond:
+            self._changes += 1
+            entry = self._answered.get(id_quiz)
+            if entry is None or entry[0] <= question_i:
+                # Participantes que já responderam à pergunta seguinte lidos da base de dados na primeira resposta
+                self._answered[id_quiz] = (question_i + 1, None)
+
+    def forget(self, id_quiz):
+        """
+        Descarta o que está guardado em memória sobre um quiz (ex: quando termina, ou se não chegou a avançar depois de close).
+        Respostas seguintes voltam a ser validadas com load_answered.
+        """
+        with self._cond:
+            self._changes += 1
+            self._answered.pop(id_quiz, None)
+
+    def pending(self):
+        """
+        Devolve o nº de respostas ainda por passar para a base de dados.
+        """
+        with self._cond:
+            return len(self._rows) + sum(len(rows) for _, rows in self._sealed)
+
+    def flush(self):
+        """
+        Passa para a base de dados todas as respostas já aceites. Exceções de apply são relançadas
+        (as respostas ficam no log, para a próxima passagem).
+        """
+        with self._flush_lock:
+            with self._sync_lock, self._cond:
+                if self._rows:
+                    # Fecha o segmento atual (já no disco) e começa outro
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._file.close()
+                    self._sealed.append((self.segment_path(self._segment), self._rows))
+                    self._synced = self._written
+                    self._cond.notify_all()
+                    self._rows = []
+                    self._segment += 1
+                    self._file = open(self.segment_path(self._segment), "a")
+                sealed = list(self._sealed)
+
+            for path, rows in sealed:
+                self.apply(rows)
+                os.remove(path)
+                with self._cond:
+                    self._sealed.pop(0)
+                self.flushed += len(rows)
+
+    def _run_sync(self):
+        while True:
+            with self._cond:
+                while self._synced == self._written and not self._stopped:
+                    self._cond.wait()
+                if self._stopped and self._synced == self._written:
+                    return
+
+            with self._sync_lock:
+                with self._cond:
+                    if self._synced == self._written:
+                        continue  # já incluídas no fsync de uma troca de segmento
+                    self._file.flush()
+                    target = self._written
+                    fd = self._file.fileno()
+                # fsync sem bloquear novas respostas, que ficam para o fsync seguinte
+                os.fsync(fd)
+                with self._cond:
+                    self._synced = max(self._synced, target)
+                    self._cond.notify_all()
+
+    def _run_flush(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or len(self._rows) >= self.max_pending, self.flush_interval)
+                if self._stopped:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                self.failures += 1
+                log.warning("Couldn't flush answer log, retrying: %s", e)
+
+def read_segment(path):
+    """
+    Lê as respostas de um segmento do log. Uma última linha incompleta (escrita interrompida) é ignorada.
+    """
+    rows = []
+    with open(path) as segment:
+        for line in segment:
+            try:
+                row = tuple(int(value) for value in line.split())
+            except ValueError:
+                break
+            if len(row) != 5:
+                break
+            rows.append(row)
+    return rows
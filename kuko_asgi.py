@@ -0,0 +1,197 @@
+"""
+Modo de execução assíncrono (ASGI) da aplicação Kuko.
+
+Expõe as mesmas rotas, com as mesmas respostas, que kuko_flask. Um event loop mantém as conexões abertas,
+e cada pedido é executado num pool limitado de threads, onde correm as chamadas bloqueantes (SQLite e ZooKeeper).
+Assim, um único processo aceita milhares de pedidos em simultâneo sem precisar de uma thread por conexão.
+
+Execução (requer uvicorn e a2wsgi):
+    python kuko_asgi.py
+ou
+    uvicorn kuko_asgi:app --port 5000 --ssl-keyfile ./server/serv.key --ssl-certfile ./server/serv.crt --ssl-ca-certs root.pem --ssl-cert-reqs 2
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+import kuko_flask
+from kuko_events import SSE_KEEPALIVE
+from kuko_flask import app as flask_app, zh, zk_publisher
+from utils import SERVICE_UNAVAILABLE_URL, SERVICE_UNAVAILABLE_TITLE, SERVICE_UNAVAILABLE_ERROR
+
+# Nº de threads que executam pedidos, e nº máximo de pedidos em curso (a executar ou em espera) antes de se responder 503
+ASGI_WORKERS = int(os.environ.get("KUKO_ASGI_WORKERS", 32))
+ASGI_MAX_PENDING = int(os.environ.get("KUKO_ASGI_MAX_PENDING", 10000))
+
+class KukoAsgi:
+    """
+    Adaptador da aplicação Kuko para um servidor ASGI. Os pedidos são executados pela app Flask através de
+    a2wsgi.WSGIMiddleware, com um pool limitado de threads; os pedidos a /stream/<id_quiz> são tratados diretamente no
+    event loop: cada participante ligado ocupa apenas uma corrotina, e não uma thread do pool.
+    """
+    STREAM_PATH = re.compile(r"^/stream/(\d+)$")
+
+    def __init__(self, wsgi_app, max_workers=ASGI_WORKERS, max_pending=ASGI_MAX_PENDING):
+        """
+        Args:
+        - wsgi_app: aplicação WSGI
+        - max_workers (int): nº de threads que executam pedidos
+        - max_pending (int): nº máximo de pedidos em curso antes de se responder 503
+        """
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=max_workers)
+        self.executor = self.wsgi.executor  # também usado para as chamadas bloqueantes de /stream e do arranque
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            match = self.STREAM_PATH.match(scope["path"])
+            if match and scope["method"] == "GET":
+                await self.handle_stream(int(match.group(1)), scope, receive, send)
+            else:
+                await self.handle_http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """
+        Arranque e encerramento do servidor: liga e desliga o cliente ZooKeeper, tal como em kuko_flask.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await loop.run_in_executor(self.executor, zh.start)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # Publica as escritas pendentes antes de fechar a sessão ZooKeeper
+                await loop.run_in_executor(self.executor, zk_publisher.stop)
+                await loop.run_in_executor(self.executor, zh.stop)
+                zh.close()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle_http(self, scope, receive, send):
+        if self.pending >= self.max_pending:
+            await self.send_unavailable(send)
+            return
+
+        self.pending += 1
+        try:
+            await self.wsgi(scope, receive, send)
+        finally:
+            self.pending -= 1
+
+    @staticmethod
+    async def send_unavailable(send):
+        """
+        Responde 503, com o mesmo formato de return_error_success_msg, quando há demasiados pedidos em curso.
+        """
+        body = json.dumps({
+            "describedBy": SERVICE_UNAVAILABLE_URL,
+            "httpStatus": 503,
+            "title": SERVICE_UNAVAILABLE_TITLE,
+            "detail": SERVICE_UNAVAILABLE_ERROR
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def prepare_stream(self, id_quiz, participant_id):
+        """
+        Valida o pedido (numa thread do pool, com o contexto da aplicação). Devolve (status, body, primeiro evento).
+        """
+        with flask_app.app_context():
+            error, first_event = kuko_flask.prepare_stream(id_quiz, participant_id)
+            if error:
+                response, code = error
+                return code, response.get_data(), None
+            return 200, None, first_event
+
+    async def handle_stream(self, id_quiz, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        participant_id = parse_qs(scope["query_string"].decode("latin-1")).get("client_id", [None])[0]
+
+        # Subscrevemos antes de ler o estado atual, para não perder notificações publicadas entretanto
+        subscription = kuko_flask.event_bus.subscribe(id_quiz, loop)
+        try:
+            status, body, event = await loop.run_in_executor(self.executor, self.prepare_stream, id_quiz, participant_id)
+
+            if status != 200:
+                await send({
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+            })
+
+            disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+            next_event = None
+            try:
+                while True:
+                    if event is None:
+                        chunk, last = SSE_KEEPALIVE, False
+                    else:
+                        chunk, last = event
+                    await send({"type": "http.response.body", "body": chunk, "more_body": not last})
+                    if last:
+                        return
+
+                    next_event = next_event or asyncio.ensure_future(subscription.queue.get())
+                    done, _ = await asyncio.wait(
+                        (next_event, disconnected), timeout=kuko_flask.STREAM_KEEPALIVE, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if disconnected in done:
+                        return
+                    event = None
+                    if next_event in done:
+                        event, next_event = next_event.result(), None
+            finally:
+                disconnected.cancel()
+                if next_event is not None:
+                    next_event.cancel()
+        finally:
+            kuko_flask.event_bus.unsubscribe(subscription)
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+app = KukoAsgi(flask_app)
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The async serving mode requires uvicorn (pip install uvicorn a2wsgi).")
+
+    uvicorn.run(
+        app,
+        host=kuko_flask.HOST,
+        port=kuko_flask.PORT,
+        ssl_keyfile="./server/serv.key",
+        ssl_certfile="./server/serv.crt",
+        ssl_ca_certs="root.pem",
+        ssl_cert_reqs=2,  # ssl.CERT_REQUIRED
+    )
@@ -0,0 +1,155 @@
+import threading
+
+class QuizState:
+    """
+    Fotografia do estado de um quiz, usada para validar pedidos sem consultar a base de dados.
+    """
+    __slots__ = ("id_quiz", "state", "question_i", "question_ids", "points", "participants", "question", "answers", "n_answers", "k", "version", "response")
+
+    def __init__(self, id_quiz, state, question_i, question_ids, points, participants, question, answers, n_answers, k, version=0):
+        """
+        Args:
+        - id_quiz (int): identificador do quiz
+        - state (str): estado do quiz (PREPARED, ONGOING, ENDED)
+        - question_i (int): índice da pergunta atual
+        - question_ids (list[int]): identificadores das questões do qset, por ordem
+        - points (list[int]): pontuação de cada questão, por ordem
+        - participants (frozenset[int]): participantes inscritos no quiz
+        - question (tuple): pergunta atual e respostas possíveis (separadas por ';'), ou None
+        - answers (list[str]): respostas possíveis da pergunta atual
+        - n_answers (int): nº de respostas possíveis da pergunta atual
+        - k (int): resposta certa da pergunta atual
+        - version (int): versão do quiz (quiz.version) lida; as escritas que dependem deste estado só são feitas se não tiver mudado
+        """
+        self.id_quiz = id_quiz
+        self.state = state
+        self.question_i = question_i
+        self.question_ids = question_ids
+        self.points = points
+        self.participants = participants
+        self.question = question
+        self.answers = answers
+        self.n_answers = n_answers
+        self.k = k
+        self.version = version
+        # Resposta de /get para a pergunta atual, já serializada (igual para todos os participantes), criada no primeiro uso.
+        # É descartada com o resto do estado quando o quiz muda (ou sai da cache), pelo que não é preciso invalidá-la
+        self.response = None
+
+class QuizStateCache:
+    """
+    Cache em memória do estado de cada quiz, para as rotas mais usadas (/get e /ans) não consultarem a base de dados.
+
+    O estado de um quiz só muda em /launch, /next e /reg, que invalidam a entrada respetiva.
+    A cache é local ao processo: se outro processo alterar o quiz, a entrada só é descartada quando é pedida com
+    check=True, que compara a versão em cache com quiz.version (uma leitura pela chave primária).
+    """
+
+    def __init__(self, loader, max_entries=1024, version_loader=None):
+        """
+        Args:
+        - loader (function): função que, dado id_quiz, lê o estado do quiz da base de dados (QuizState ou None)
+        - max_entries (int): nº máximo de quizzes em cache
+        - version_loader (function): função que, dado id_quiz, lê a versão atual do quiz (quiz.version, ou None se não existir)
+        """
+        self.loader = loader
+        self.max_entries = max_entries
+        self.version_loader = version_loader
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._entries = {}
+        self._version = 0  # incrementado a cada invalidação
+        self._lock = threading.Lock()
+
+    def get(self, id_quiz, check=False):
+        """
+        Devolve estado do quiz, da cache ou, se não estiver em cache, da base de dados.
+
+        Args:
+        - id_quiz (int): identificador do quiz
+        - check (bool): confirmar que o estado em cache não foi alterado por outro processo (ver version_loader)
+
+        Returns:
+        - QuizState: estado do quiz, ou None se quiz não existir
+        """
+        with self._lock:
+            entry = self._entries.get(id_quiz)
+            if entry is not None and not check:
+                self.hits += 1
+                return entry
+
+        if entry is not None:
+            if self.version_loader is None or self.version_loader(id_quiz) == entry.version:
+                with self._lock:
+                    self.hits += 1
+                return entry
+            with self._lock:
+                self.stale += 1
+                self._version += 1
+                if self._entries.get(id_quiz) is entry:
+                    self._entries.pop(id_quiz)
+
+        with self._lock:
+            self.misses += 1
+            version = self._version
+
+        entry = self.loader(id_quiz)
+
+        if entry is not None:
+            with self._lock:
+                # Se houve uma invalidação durante a leitura, o estado lido pode já estar desatualizado
+                if version == self._version:
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[id_quiz] = entry
+
+        return entry
+
+    def invalidate(self, id_quiz):
+        """
+        Remove estado de um quiz da cache. Deve ser chamada sempre que o estado do quiz é alterado, após o commit.
+
+        Args:
+        - id_quiz (int): identificador do quiz
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.pop(id_quiz, None)
+
+    def stats(self):
+        """
+        Devolve contadores da cache.
+
+        Returns:
+        - dict: hits, misses, entradas descartadas por estarem desatualizadas e nº de entradas em cache
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "entries": len(self._entries)}
+
+class ValidatorCache:
+    """
+    Conjunto limitado de chaves de recursos já servidos por este processo (ex: identificadores de questões), usado
+    para responder 304 a pedidos condicionais sem consultar a base de dados. Quando cheio, descarta as chaves mais antigas.
+    """
+
+    def __init__(self, max_entries=4096):
+        """
+        Args:
+        - max_entries (int): nº máximo de chaves guardadas
+        """
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            if key in self._entries:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
@@ -18,7 +18,9 @@ COMMANDS_CODES_MAP = {
     "ANS": [80, 3],
     "REL": [90, 2],
     "GET_QUESTION": [100, 2],
-    "GET_QUIZ_STATUS": [110, 2]
+    "GET_QUIZ_STATUS": [110, 2],
+    "SCORE": [120, 2],
+    "IMPORT": [130, 2]
 }
 
 def validate_input(input):
@@ -40,7 +42,7 @@ def validate_input(input):
 
     # Verificações específicas para cada comando
     match input_split[0]:
-        case "QUESTION" | "LAUNCH" | "REG" | "GET" | "NEXT" | "REL" | "GET_QUESTION" | "GET_QUIZ_STATUS":
+        case "QUESTION" | "LAUNCH" | "REG" | "GET" | "NEXT" | "REL" | "GET_QUESTION" | "GET_QUIZ_STATUS" | "SCORE":
             # Verificamos se podemos fazer cast para int, ou seja, se são passados inteiros válidos como ids, etc.
             try:
                 n = int(input_split[-1])
@@ -60,7 +62,9 @@ def main():
     id_client = int(sys.argv[1])
     # Crio instância de kuko_stub - esta fará os requests
     client_cert = ("./client/cli.crt", "./client/cli.key")
-    client_stub = KukoStub("localhost", 5000, client_cert, id_client)
+    # Modo de notificações opcional: "zookeeper" (por omissão) ou "sse"
+    notifications = sys.argv[2] if len(sys.argv) > 2 else "zookeeper"
+    client_stub = KukoStub("localhost", 5000, client_cert, id_client, notifications=notifications)
     
     while True:
         try:
@@ -160,6 +164,20 @@ def main():
                     id_client,
                 ],
             ),
+            "IMPORT": (
+                client_stub.import_questions,
+                [
+                    input_split[1],  # ficheiro com as questões
+                    id_client,
+                ],
+            ),
+            "SCORE": (
+                client_stub.score,
+                [
+                    input_split[-1],  # id do quiz
+                    id_client,
+                ],
+            ),
 
         }
 
@@ -1,10 +1,42 @@
+import json
 import time
 from sqlite3 import IntegrityError
+from kuko_cache import QuizState, QuizStateCache
+
+# Versão do formato das notificações publicadas nos nós dos quizzes (ver Kuko.get_quiz_notification)
+NOTIFICATION_VERSION = 1
+
+# Erro devolvido quando o quiz foi alterado por outro pedido entre a leitura do seu estado e a escrita (ver quiz.version)
+QUIZ_CONFLICT_ERROR = "Quiz was changed by another request. Fetch its state and try again."
+
+# Erro devolvido a respostas e pedidos de participantes não inscritos no quiz
+NOT_REGISTERED_ERROR = "Participant is not registered in quiz."
+
+# Pontuação de cada participante de um quiz, calculada a partir das respostas registadas em results
+SCORES_QUERY = (
+    "SELECT re.participant, SUM(CASE WHEN re.answer = qu.k THEN qp.points ELSE 0 END), MIN(re.question_i) "
+    "FROM results re "
+    "JOIN quiz q ON q.id_quiz = re.id_quiz "
+    "JOIN qset_question qq ON qq.id_qset = q.id_qset AND qq.position = re.question_i "
+    "JOIN question qu ON qu.id_question = qq.id_question "
+    "JOIN quiz_points qp ON qp.id_quiz = re.id_quiz AND qp.position = re.question_i "
+    "WHERE re.id_quiz = ? "
+    "GROUP BY re.participant"
+)
 
 class Kuko:
 
-    def __init__(self, query_function):
+    def __init__(self, query_function, query_many_function=None, cache_size=1024, begin_function=None, shared=False):
         self.query_db = query_function
+        self.query_many_db = query_many_function
+        # Começa as transações de escrita que precisam do lock antes de ler (por omissão, BEGIN IMMEDIATE). Quem já executa
+        # a escrita dentro de uma transação com o lock (ex: o writer de kuko_flask) passa uma função que não começa outra
+        self.begin_write = begin_function or (lambda: self.query_db("BEGIN IMMEDIATE"))
+        # Estado de cada quiz em memória, para /get e /ans não consultarem a bd (além de confirmarem a versão do quiz)
+        self.quiz_cache = QuizStateCache(self._load_quiz_state, max_entries=cache_size, version_loader=self._load_quiz_version)
+        # True se outros processos podem alterar os quizzes na mesma base de dados: as leituras (/get, /quiz) confirmam então a
+        # versão do estado em cache. Com um único processo, todas as alterações passam por este e invalidam a cache
+        self.shared = shared
 
     def get_registered_question(self, question_id):
         """
@@ -17,12 +49,32 @@ class Kuko:
         - tuple: composto por descrição da questão e respostas possíveis
         """
         question_info =  self.query_db(
-            "SELECT question, answers FROM question WHERE question.id_question = ?",
+            "SELECT question FROM question WHERE question.id_question = ?",
             (question_id,),
             one = True
         )
 
-        return question_info
+        if not question_info:
+            return None
+
+        return (question_info[0], ";".join(self.get_question_answers(question_id)))
+
+    def get_question_answers(self, question_id):
+        """
+        Devolve respostas possíveis de uma questão, pela ordem em que foram dadas.
+
+        Args:
+        - question_id (int): identificador da questão
+
+        Returns:
+        - list[str]: lista de respostas possíveis
+        """
+        answers = self.query_db(
+            "SELECT answer FROM question_answer WHERE id_question = ? ORDER BY position",
+            (question_id,)
+        )
+
+        return [answer[0] for answer in answers]
 
     def add_new_question(self, question, answers, right_answer):
         """
@@ -39,15 +91,51 @@ class Kuko:
         if right_answer < 1 or right_answer > len(answers):
             return False
         else:
-            # Inserimos na bd nova questão.
+            # Inserimos na bd nova questão. RETURNING devolve o id na mesma query
+            insert_id = self.query_db(
+                "INSERT INTO question (question, k) VALUES (?, ?) RETURNING id_question",
+                (question, right_answer),
+                one=True
+            )
+
+            # Respostas possíveis, numeradas a partir de 1 (tal como right_answer)
             self.query_db(
-                "INSERT INTO question (question, answers, k) VALUES (?, ?, ?)",
-                (question, ";".join(answers), right_answer)
+                "INSERT INTO question_answer (id_question, position, answer) SELECT ?, key + 1, value FROM json_each(?)",
+                (insert_id[0], json.dumps(list(answers)))
             )
-            insert_id = self.query_db("SELECT last_insert_rowid()", one=True)
 
             return insert_id
 
+    def add_questions_bulk(self, questions):
+        """
+        Insere várias questões na base de dados, numa única transação. As questões já devem estar validadas.
+        Os identificadores atribuídos são consecutivos.
+
+        Args:
+        - questions (list[tuple]): lista de (questão, lista de respostas possíveis, resposta certa)
+
+        Returns:
+        - tuple: (primeiro id, último id) das questões inseridas
+        """
+        # Lock de escrita antes de ler o último id, para os ids atribuídos não serem usados por outra escrita
+        self.begin_write()
+        first_id = self.query_db("SELECT COALESCE(MAX(id_question), 0) + 1 FROM question", one=True)[0]
+
+        self.query_many_db(
+            "INSERT INTO question (id_question, question, k) VALUES (?, ?, ?)",
+            [(first_id + i, question, right_answer) for i, (question, _, right_answer) in enumerate(questions)]
+        )
+        self.query_many_db(
+            "INSERT INTO question_answer (id_question, position, answer) VALUES (?, ?, ?)",
+            [
+                (first_id + i, position, answer)
+                for i, (_, answers, _) in enumerate(questions)
+                for position, answer in enumerate(answers, start=1)
+            ]
+        )
+
+        return (first_id, first_id + len(questions) - 1)
+
     def add_new_question_set(self, question_list):
         """
         Insere qset na base dados, dada uma lista de perguntas.
@@ -56,70 +144,90 @@ class Kuko:
         - question_list (list[str]): lista de identificadores de questões associadas ao qset
 
         Returns:
-        - insert_id (int): identificador do qset que foi criado
+        - tuple: (identificador do qset que foi criado, None), ou (False, lista de ids de questões que não existem)
         """
-        # Verificamos se perguntas existem
-        for question_id in question_list:
-            if len(self.query_db("SELECT * FROM question WHERE question.id_question = ?",(question_id, ))) == 0: #questão não existe na bd
-                return False
+        question_ids = json.dumps([str(i) for i in question_list])
+
+        # Verificamos, numa única query, que perguntas não existem na bd
+        missing = self.query_db(
+            "SELECT DISTINCT j.value FROM json_each(?) j LEFT JOIN question q ON q.id_question = CAST(j.value AS INTEGER) "
+            "WHERE q.id_question IS NULL ORDER BY j.key",
+            (question_ids, )
+        )
+
+        if missing:
+            return (False, [question_id[0] for question_id in missing])
 
         # Inserimos qset na BD
+        insert_id = self.query_db("INSERT INTO qset DEFAULT VALUES RETURNING id_qset", one = True)
+
+        # Questões do qset, pela ordem dada (posições a partir de 0, tal como question_i)
         self.query_db(
-            "INSERT INTO qset (questions) VALUES (?)",
-            (";".join([str(i) for i in question_list]),),
+            "INSERT INTO qset_question (id_qset, position, id_question) SELECT ?, key, CAST(value AS INTEGER) FROM json_each(?)",
+            (insert_id[0], question_ids)
         )
-        insert_id = self.query_db("SELECT last_insert_rowid()", one = True)
 
-        return insert_id
+        return (insert_id[0], None)
 
-    def add_new_quiz(self, qset_id, scores_list):
+    def add_new_quiz(self, qset_id, scores_list, id_quiz=None):
         """
         Insere novo Quiz na base de dados.
         
         Args:
         - qset_id (str): identificador do qset
         - scores_list (list[str]): lista de pontuações associadas ao qset dado
+        - id_quiz (int): identificador a dar ao quiz (por omissão, o seguinte ao maior existente)
 
         Returns:
         - insert_id (int): identificador do quiz que foi criado
         """
-        # Vemos se qset existe na bd
+        # Vemos se qset existe na bd e quantas perguntas tem, numa única query
         qset_info = self.query_db(
-            "SELECT questions FROM qset WHERE qset.id_qset = ?", (qset_id, ), one = True
+            "SELECT qs.id_qset, (SELECT COUNT(*) FROM qset_question qq WHERE qq.id_qset = qs.id_qset) FROM qset qs WHERE qs.id_qset = ?",
+            (qset_id, ), one = True
         )
 
         if not qset_info:
             return (False, "Qset doesn't exist in database")
 
         # Vemos se o nº de perguntas do qset, corresponde ao nº de scores dado
-        if len(qset_info[0].split(";")) != len(scores_list):
+        if qset_info[1] != len(scores_list):
             return (
                 False,
                 "Number of scores passed doesn't match number of questions in qset"
             )
 
-        self.query_db(
-            "INSERT INTO quiz (id_qset, points, timestamp_p) VALUES (?, ?, ?)",
-            (qset_id, ";".join([str(i) for i in scores_list]), round(time.time()))
-        ) 
+        insert_id = self.query_db(
+            "INSERT INTO quiz (id_quiz, id_qset, timestamp_p) VALUES (?, ?, ?) RETURNING id_quiz",
+            (id_quiz, qset_id, round(time.time())),
+            one = True
+        )
 
-        insert_id = self.query_db("SELECT last_insert_rowid()", one = True)
+        # Pontuação de cada questão (posições a partir de 0, tal como question_i)
+        self.query_db(
+            "INSERT INTO quiz_points (id_quiz, position, points) SELECT ?, key, CAST(value AS INTEGER) FROM json_each(?)",
+            (insert_id[0], json.dumps([str(i) for i in scores_list]))
+        )
 
         return (insert_id, "PREPARED")
 
     def get_quiz_status(self, id_quiz):
         """
-        Retorna estado de um dado quiz.
+        Retorna estado de um dado quiz (da cache de estado dos quizzes, confirmado com a versão do quiz se a base de dados for
+        partilhada com outros processos).
 
         Args:
         - id_quiz (int): identificador do quiz a procurar
 
         Returns:
-        - quiz_status (str): estado do quiz
+        - quiz_status (tuple): estado do quiz e índice da pergunta atual, ou None se quiz não existir
         """
-        quiz_status = self.query_db("SELECT state FROM quiz WHERE id_quiz = ?", (id_quiz,), one = True)
+        quiz_state = self.quiz_cache.get(id_quiz, check=self.shared)
 
-        return quiz_status
+        if not quiz_state:
+            return None
+
+        return (quiz_state.state, quiz_state.question_i)
 
     def launch_quiz(self, id_quiz):
         """
@@ -128,11 +236,13 @@ class Kuko:
         Args:
         - id_quiz(int): identificador do quiz
         """
-        # Verificamos se quiz existe na bd
-        if len(self.query_db("SELECT * FROM quiz WHERE id_quiz = ?", (id_quiz,))) == 0:
+        # Um único UPDATE: se o quiz não existir, nenhuma linha é alterada
+        if not self.query_db(
+            "UPDATE quiz SET state = 'ONGOING', version = version + 1 WHERE id_quiz = ? RETURNING version", (id_quiz,), one=True
+        ):
             return False
 
-        self.query_db("UPDATE quiz SET state = 'ONGOING' WHERE id_quiz = ?", (id_quiz,))
+        self.quiz_cache.invalidate(id_quiz)
 
         return True
 
@@ -147,37 +257,84 @@ class Kuko:
         Returns:
         - existing_participants (str): string com ids dos participantes atualizado
         """
-        # Verificamos se quiz existe na bd
-        quiz_info = self.query_db(
-            "SELECT state, participants FROM quiz WHERE id_quiz = ?",
+        # Adicionamos participante ao quiz só se este estiver PREPARED, na mesma query (o estado não pode mudar entre a
+        # verificação e a inscrição). A chave primária impede inscrições repetidas
+        try:
+            registered = self.query_db(
+                "INSERT INTO quiz_participant (id_quiz, participant) "
+                "SELECT id_quiz, ? FROM quiz WHERE id_quiz = ? AND state = 'PREPARED' RETURNING participant",
+                (id_participant, id_quiz),
+            )
+        except IntegrityError:
+            return (False, f"Participant is already registered in quiz {id_quiz}.")
+
+        if not registered:
+            if not self.query_db("SELECT 1 FROM quiz WHERE id_quiz = ?", (id_quiz,), one=True):
+                return (False, "Quiz doesn't exist in the database.")
+            return (False, "Quiz is not accepting new participants at this time.")
+
+        self.query_db("UPDATE quiz SET version = version + 1 WHERE id_quiz = ?", (id_quiz,))
+        self.quiz_cache.invalidate(id_quiz)
+
+        existing_participants = self.query_db(
+            "SELECT participant FROM quiz_participant WHERE id_quiz = ? ORDER BY rowid",
             (id_quiz,),
-            one=True
         )
 
-        if not quiz_info:
-            return (False, "Quiz doesn't exist in the database.")
+        # Retornamos id do quiz e participantes inscritos
+        return (id_quiz, ";".join([str(participant[0]) for participant in existing_participants]))
 
-        # Verificamos se estado do quiz é PREPARED
-        if quiz_info[0] != "PREPARED":
-            return (False, "Quiz is not accepting new participants at this time.")
+    def _load_quiz_state(self, id_quiz):
+        """
+        Lê da base de dados o estado de um quiz (usada pela cache de estado dos quizzes).
 
-        # Adicionamos id do participante a participants
-        existing_participants = quiz_info[1]
+        Args:
+        - id_quiz(int): identificador do quiz
 
-        if not existing_participants:
-            existing_participants = str(id_participant)
-        elif str(id_participant) in existing_participants:
-            return (False, f"Participant is already registered in quiz {id_quiz}.")
-        else:
-            existing_participants += ";" + str(id_participant)
+        Returns:
+        - QuizState: estado do quiz, ou None se quiz não existir
+        """
+        quiz_info = self.query_db(
+            "SELECT state, question_i, id_qset, version FROM quiz WHERE id_quiz = ?", (id_quiz, ), one = True
+        )
 
-        self.query_db(
-            "UPDATE quiz SET participants = ? WHERE id_quiz = ?",
-            (existing_participants, id_quiz),
+        if not quiz_info:
+            return None
+
+        state, question_i, id_qset, version = quiz_info
+
+        question_ids = [
+            question[0] for question in self.query_db(
+                "SELECT id_question FROM qset_question WHERE id_qset = ? ORDER BY position", (id_qset, )
+            )
+        ]
+        points = [
+            points[0] for points in self.query_db(
+                "SELECT points FROM quiz_points WHERE id_quiz = ? ORDER BY position", (id_quiz, )
+            )
+        ]
+        participants = frozenset(
+            participant[0] for participant in self.query_db(
+                "SELECT participant FROM quiz_participant WHERE id_quiz = ?", (id_quiz, )
+            )
         )
 
-        # Retornamos id do quiz e participantes inscritos
-        return (id_quiz, existing_participants)
+        question, answers, k = None, [], None
+        if question_i < len(question_ids):
+            text, k = self.query_db(
+                "SELECT question, k FROM question WHERE id_question = ?", (question_ids[question_i], ), one = True
+            )
+            answers = self.get_question_answers(question_ids[question_i])
+            question = (text, ";".join(answers))
+
+        return QuizState(id_quiz, state, question_i, question_ids, points, participants, question, answers, len(answers), k, version)
+
+    def _load_quiz_version(self, id_quiz):
+        """
+        Lê da base de dados a versão atual de um quiz (usada pela cache para detetar alterações feitas por outros processos).
+        """
+        version = self.query_db("SELECT version FROM quiz WHERE id_quiz = ?", (id_quiz, ), one = True)
+        return version[0] if version else None
 
     def get_current_question(self, id_quiz, id_participant):
         """
@@ -188,34 +345,67 @@ class Kuko:
         - id_participant(int): identificador do participante
 
         Returns:
-        - question_info (list[str]): lista com pergunta e respostas possíveis
+        - tuple: (True, QuizState do quiz, com a pergunta atual), ou (False, mensagem de erro)
         """
-        # Verificamos se quiz existe na bd
-        quiz_info = self.query_db(
-            "SELECT q.state, q.id_qset, q.participants, q.question_i, qs.questions FROM quiz q JOIN qset qs ON q.id_qset = qs.id_qset WHERE q.id_quiz = ?",
-            (id_quiz, ), one = True
-        )
+        # Verificamos se quiz existe na bd (e, com a base de dados partilhada, se o estado em cache não foi alterado por outro processo)
+        quiz_state = self.quiz_cache.get(id_quiz, check=self.shared)
 
-        if not quiz_info:
+        if not quiz_state:
             return (False, "Quiz doesn't exist in the database.")
 
         # Verificamos se estado do quiz é ONGOING
-        if quiz_info[0] != "ONGOING":
+        if quiz_state.state != "ONGOING":
             return (False, "Quiz is currently not ongoing.")
 
         # Verificamos se partcipante está inscrito no quiz
-        if quiz_info[2]:
-            if str(id_participant) not in quiz_info[2]:
-                return (False, "Participant is not registered in quiz.")
-        else:
-            return (False, "Participant is not registered in quiz.")
+        if int(id_participant) not in quiz_state.participants:
+            return (False, NOT_REGISTERED_ERROR)
 
-        question_info = self.query_db(
-            "SELECT question, answers FROM question WHERE id_question = ?",
-            (quiz_info[-1].split(";")[quiz_info[3]], )
-        )
+        return (True, quiz_state)
 
-        return (True, question_info)
+    def question_payload(self, quiz_state):
+        """
+        Devolve a pergunta atual de um quiz em formato estruturado (o mesmo que é publicado no nó do quiz).
+        """
+        return {
+            "v": NOTIFICATION_VERSION,
+            "type": "next",
+            "quiz": quiz_state.id_quiz,
+            "question_i": quiz_state.question_i,
+            "question": quiz_state.question[0],
+            "answers": quiz_state.answers,
+        }
+
+    def get_quiz_notification(self, id_quiz):
+        """
+        Devolve o conteúdo a publicar no nó ZooKeeper do quiz, para os participantes não terem de o pedir ao servidor:
+        a pergunta atual, se o quiz estiver ONGOING, ou as pontuações, se tiver terminado.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+
+        Returns:
+        - dict: conteúdo da notificação (v, type - next ou rel -, quiz, e question_i, question e answers
+        ou scores), ou None se não houver nada a publicar
+        """
+        quiz_state = self.quiz_cache.get(id_quiz)
+
+        if not quiz_state:
+            return None
+
+        if quiz_state.state == "ONGOING" and quiz_state.question:
+            return self.question_payload(quiz_state)
+
+        if quiz_state.state == "ENDED":
+            report = self.get_quiz_report(id_quiz)
+            return {
+                "v": NOTIFICATION_VERSION,
+                "type": "rel",
+                "quiz": id_quiz,
+                "scores": report[1] if report[0] else {},
+            }
+
+        return None
 
     def answer_question(self, id_quiz, answer, id_participant):
         """
@@ -229,39 +419,291 @@ class Kuko:
         Returns:
         - str: string que indica se resposta está correta ou não
         """
-        quiz_info = self.query_db("SELECT q.state, q.id_qset, q.participants, q.question_i, qs.questions FROM quiz q JOIN qset qs ON q.id_qset = qs.id_qset WHERE q.id_quiz = ?", (id_quiz, ), one=True)
+        quiz_state = self.quiz_cache.get(id_quiz)
+
+        error = self._check_answer(quiz_state, answer, id_participant)
+        if error and quiz_state:
+            # Rejeição com base no estado em cache: confirmamos que o quiz não foi alterado por outro processo
+            quiz_state = self.quiz_cache.get(id_quiz, check=True)
+            error = self._check_answer(quiz_state, answer, id_participant)
+        if error:
+            return (False, error)
+        
+        # A resposta só é inserida se o quiz não tiver mudado desde que o estado foi lido (ex: /next noutro processo)
+        try:
+            inserted = self.query_db(
+                "INSERT INTO results (id_quiz, question_i, participant, answer) "
+                "SELECT id_quiz, ?, ?, ? FROM quiz WHERE id_quiz = ? AND version = ? RETURNING 1",
+                (quiz_state.question_i, id_participant, answer, id_quiz, quiz_state.version)
+            )
+        except IntegrityError:
+            return (False, f"Participant {id_participant} has already registered an answer to this question.")
+
+        if not inserted:
+            self.quiz_cache.invalidate(id_quiz)
+            return (False, QUIZ_CONFLICT_ERROR)
+
+        correct = answer == quiz_state.k
+
+        # Atualizamos pontuação do participante, na mesma transação em que se regista a resposta
+        self.query_db(
+            "INSERT INTO quiz_score (id_quiz, participant, score, first_question_i) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id_quiz, participant) DO UPDATE SET score = score + excluded.score",
+            (id_quiz, id_participant, quiz_state.points[quiz_state.question_i] if correct else 0, quiz_state.question_i)
+        )
 
+        return (True, "Correct" if correct else "Incorrect")
+
+    def _check_answer(self, quiz_state, answer, id_participant):
+        """
+        Valida uma resposta contra o estado do quiz. Devolve mensagem de erro, ou None se a resposta for válida.
+        """
         # Verificamos se quiz existe
-        if not quiz_info:
-            return (False, "Quiz doesn't exist in the database.")
+        if not quiz_state:
+            return "Quiz doesn't exist in the database."
 
         # Verificamos se estado do quiz é ONGOING
-        if quiz_info[0] != "ONGOING":
-            return (False, "Quiz is currently not ongoing.")
+        if quiz_state.state != "ONGOING":
+            return "Quiz is currently not ongoing."
 
         # Verificamos se partcipante está inscrito no quiz
-        if quiz_info[2]:
-            if str(id_participant) not in quiz_info[2]:
-                return (False, "Participant is not registered in quiz.")
-        else:
-            return (False, "Participant is not registered in quiz.")
+        if int(id_participant) not in quiz_state.participants:
+            return NOT_REGISTERED_ERROR
 
-        question_info = self.query_db(
-            "SELECT answers, k FROM question WHERE id_question = ?",
-            (quiz_info[-1].split(";")[quiz_info[3]], ), one=True)
+        if answer > quiz_state.n_answers or answer < 1:
+            return f"Invalid answer (answer must be number between 1 and {quiz_state.n_answers})."
 
-        if answer > len(question_info[0].split(";")) or answer < 1:
-            return (False, f"Invalid answer (answer must be number between 1 and {len(question_info[0])}).")
-        
-        try:
-            self.query_db(
-                "INSERT INTO results (id_quiz, question_i, participant, answer) VALUES (?, ?, ?, ?)",
-                (id_quiz, quiz_info[3], id_participant, answer)
-            )
-        except IntegrityError:
+        return None
+
+    def log_answer(self, id_quiz, answer, id_participant, answer_log):
+        """
+        Regista resposta dada pelo participante no log de respostas (ver kuko_answer_log), em vez de na base de dados:
+        a resposta é validada tal como em answer_question, e passada para results mais tarde, com record_answers.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+        - answer(int): resposta dada pelo participante
+        - id_participant(int): identificador do participante
+        - answer_log (AnswerLog): log onde é registada a resposta
+
+        Returns:
+        - str: string que indica se resposta está correta ou não
+        """
+        # A resposta não passa por uma escrita com verificação da versão: o estado em cache é sempre confirmado
+        quiz_state = self.quiz_cache.get(id_quiz, check=True)
+
+        error = self._check_answer(quiz_state, answer, id_participant)
+        if error:
+            return (False, error)
+
+        correct = answer == quiz_state.k
+        points = quiz_state.points[quiz_state.question_i] if correct else 0
+
+        accepted = answer_log.add(id_quiz, quiz_state.question_i, int(id_participant), answer, points)
+        if accepted is None:
+            self.quiz_cache.invalidate(id_quiz)
+            return (False, QUIZ_CONFLICT_ERROR)
+        if not accepted:
             return (False, f"Participant {id_participant} has already registered an answer to this question.")
 
-        return (True, "Correct" if answer == question_info[1] else "Incorrect")
+        return (True, "Correct" if correct else "Incorrect")
+
+    def get_answered_participants(self, id_quiz, question_i):
+        """
+        Devolve o conjunto de participantes que já responderam a uma pergunta de um quiz, ou None se o quiz não estiver
+        a decorrer com essa pergunta (ex: estado usado para validar a resposta desatualizado).
+        """
+        current = self.query_db("SELECT state, question_i FROM quiz WHERE id_quiz = ?", (id_quiz, ), one = True)
+        if not current or tuple(current) != ("ONGOING", question_i):
+            return None
+
+        return {
+            participant[0] for participant in self.query_db(
+                "SELECT participant FROM results WHERE id_quiz = ? AND question_i = ?", (id_quiz, question_i)
+            )
+        }
+
+    def record_answers(self, answers):
+        """
+        Insere em results, de uma só vez, respostas já validadas (ex: do log de respostas), e atualiza as pontuações.
+        Respostas que já estejam em results são ignoradas, pelo que a mesma lista pode ser inserida mais do que uma vez.
+
+        Args:
+        - answers(list[tuple]): lista de (id_quiz, question_i, participante, resposta, pontos obtidos)
+
+        Returns:
+        - int: nº de respostas inseridas
+        """
+        inserted = self.query_db(
+            "INSERT INTO results (id_quiz, question_i, participant, answer) "
+            "SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'), json_extract(value, '$[3]') "
+            "FROM json_each(?) WHERE true ON CONFLICT DO NOTHING RETURNING id_quiz, question_i, participant",
+            (json.dumps(answers), )
+        )
+
+        points = {(id_quiz, question_i, participant): score for id_quiz, question_i, participant, _, score in answers}
+        self.query_many_db(
+            "INSERT INTO quiz_score (id_quiz, participant, score, first_question_i) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id_quiz, participant) DO UPDATE SET score = score + excluded.score",
+            [(id_quiz, participant, points[(id_quiz, question_i, participant)], question_i) for id_quiz, question_i, participant in inserted]
+        )
+
+        return len(inserted)
+
+    def answer_questions_batch(self, id_quiz, answers):
+        """
+        Regista várias respostas à pergunta atual de um quiz, numa única transação.
+        Todas as respostas são validadas contra o mesmo estado do quiz, e inseridas com executemany.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+        - answers(list[dict]): lista de respostas, cada uma com client_id e answer_given
+
+        Returns:
+        - list[dict]: resultado de cada resposta, pela ordem dada (Correct, Incorrect, Duplicate ou mensagem de erro)
+        """
+        quiz_state, results, accepted = self._validate_batch(id_quiz, answers, check=False)
+        if not quiz_state:
+            return (False, results)
+
+        question_i = quiz_state.question_i
+
+        if accepted:
+            # Lock de escrita antes de procurar respostas já registadas, para nenhuma ser inserida entretanto
+            self.begin_write()
+
+            # Todas as respostas foram validadas contra o estado lido: se o quiz mudou entretanto, nenhuma é registada
+            current = self.query_db("SELECT version FROM quiz WHERE id_quiz = ?", (id_quiz, ), one = True)
+            if not current or current[0] != quiz_state.version:
+                self.quiz_cache.invalidate(id_quiz)
+                return (False, QUIZ_CONFLICT_ERROR)
+
+            already_answered = self.query_db(
+                "SELECT re.participant FROM results re JOIN json_each(?) j ON re.participant = j.value "
+                "WHERE re.id_quiz = ? AND re.question_i = ?",
+                (json.dumps(list(accepted)), id_quiz, question_i)
+            )
+            for participant in already_answered:
+                index, _ = accepted.pop(participant[0])
+                results[index]["result"] = "Duplicate"
+
+            points = quiz_state.points[question_i]
+            rows = []
+            scores = []
+            for id_participant, (index, answer) in accepted.items():
+                correct = answer == quiz_state.k
+                results[index]["result"] = "Correct" if correct else "Incorrect"
+                rows.append((id_quiz, question_i, id_participant, answer))
+                scores.append((id_quiz, id_participant, points if correct else 0, question_i))
+
+            self.query_many_db(
+                "INSERT INTO results (id_quiz, question_i, participant, answer) VALUES (?, ?, ?, ?)", rows
+            )
+            self.query_many_db(
+                "INSERT INTO quiz_score (id_quiz, participant, score, first_question_i) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id_quiz, participant) DO UPDATE SET score = score + excluded.score",
+                scores
+            )
+
+        return (True, results)
+
+    def _validate_batch(self, id_quiz, answers, check):
+        """
+        Valida uma lista de respostas contra o estado do quiz. Se o estado em cache levar a rejeições (quiz não ONGOING,
+        ou participantes não inscritos), confirma que o quiz não foi alterado por outro processo e, se foi, valida de novo.
+
+        Args:
+        - check (bool): confirmar sempre a versão do estado em cache
+
+        Returns:
+        - tuple: (QuizState, resultados, respostas válidas - ver _check_answers_batch), ou (None, mensagem de erro, None)
+        """
+        while True:
+            quiz_state = self.quiz_cache.get(id_quiz, check=check)
+
+            # Verificamos se quiz existe
+            if not quiz_state:
+                return (None, "Quiz doesn't exist in the database.", None)
+
+            # Verificamos se estado do quiz é ONGOING
+            if quiz_state.state != "ONGOING":
+                if check:
+                    return (None, "Quiz is currently not ongoing.", None)
+            else:
+                results, accepted = self._check_answers_batch(quiz_state, answers)
+                if check or all(item["result"] != NOT_REGISTERED_ERROR for item in results):
+                    return (quiz_state, results, accepted)
+
+            check = True
+
+    def _check_answers_batch(self, quiz_state, answers):
+        """
+        Valida uma lista de respostas contra o estado do quiz.
+
+        Returns:
+        - tuple: (resultado de cada resposta, None nas válidas; dict participante -> (índice em results, resposta) das válidas)
+        """
+        results = []
+        accepted = {}
+
+        for item in answers:
+            try:
+                id_participant = int(item.get("client_id"))
+                answer = int(item.get("answer_given"))
+            except (AttributeError, TypeError, ValueError):
+                results.append({"client_id": item.get("client_id") if isinstance(item, dict) else None, "result": "Answer given and client id must be integers."})
+                continue
+
+            if id_participant not in quiz_state.participants:
+                result = NOT_REGISTERED_ERROR
+            elif answer > quiz_state.n_answers or answer < 1:
+                result = f"Invalid answer (answer must be number between 1 and {quiz_state.n_answers})."
+            elif id_participant in accepted:
+                result = "Duplicate"
+            else:
+                accepted[id_participant] = (len(results), answer)
+                result = None
+
+            results.append({"client_id": id_participant, "result": result})
+
+        return results, accepted
+
+    def log_answers_batch(self, id_quiz, answers, answer_log):
+        """
+        Regista várias respostas à pergunta atual de um quiz no log de respostas, com um único fsync (ver log_answer e
+        answer_questions_batch).
+
+        Args:
+        - id_quiz(int): identificador do quiz
+        - answers(list[dict]): lista de respostas, cada uma com client_id e answer_given
+        - answer_log (AnswerLog): log onde são registadas as respostas
+
+        Returns:
+        - list[dict]: resultado de cada resposta, pela ordem dada (Correct, Incorrect, Duplicate ou mensagem de erro)
+        """
+        # As respostas não passam por uma escrita com verificação da versão: o estado em cache é sempre confirmado
+        quiz_state, results, accepted = self._validate_batch(id_quiz, answers, check=True)
+        if not quiz_state:
+            return (False, results)
+
+        if accepted:
+            points = quiz_state.points[quiz_state.question_i]
+            rows = [
+                (id_participant, answer, points if answer == quiz_state.k else 0)
+                for id_participant, (_, answer) in accepted.items()
+            ]
+            logged = answer_log.add_many(id_quiz, quiz_state.question_i, rows)
+            if logged is None:
+                self.quiz_cache.invalidate(id_quiz)
+                return (False, QUIZ_CONFLICT_ERROR)
+
+            for (index, answer), added in zip(accepted.values(), logged):
+                if not added:
+                    results[index]["result"] = "Duplicate"
+                else:
+                    results[index]["result"] = "Correct" if answer == quiz_state.k else "Incorrect"
+
+        return (True, results)
 
     def go_to_next_question(self, id_quiz):
         """
@@ -271,7 +713,7 @@ class Kuko:
         - id_quiz(int): id do quiz
         """
         quiz_info = self.query_db(
-            "SELECT q.state, q.question_i, qs.questions FROM quiz q JOIN qset qs ON q.id_qset = qs.id_qset WHERE q.id_quiz = ?",
+            "SELECT q.state, q.question_i, (SELECT COUNT(*) FROM qset_question qq WHERE qq.id_qset = q.id_qset), q.version FROM quiz q WHERE q.id_quiz = ?",
             (id_quiz, ), one = True)
 
         # Verificamos se quiz existe
@@ -282,23 +724,26 @@ class Kuko:
         if quiz_info[0] != "ONGOING":
             return (False, "Quiz is currently not ongoing.")
 
+        # Cada transição é um UPDATE condicional à versão lida: se outro pedido alterou o quiz entretanto (ex: dois /next
+        # em simultâneo), nenhuma linha é alterada e é devolvido um conflito, em vez de se avançar duas vezes
         # Verificamos se quiz já está na útlima pergunta
-        if quiz_info[1] == len(quiz_info[-1].split(";")) - 1:
-            self.query_db(
-                "UPDATE quiz SET state = ? WHERE id_quiz = ?", ("ENDED", id_quiz)
+        if quiz_info[1] == quiz_info[2] - 1:
+            updated = self.query_db(
+                "UPDATE quiz SET state = ?, version = version + 1 WHERE id_quiz = ? AND version = ? RETURNING version",
+                ("ENDED", id_quiz, quiz_info[3]), one = True
             )
+            if not updated:
+                return (False, QUIZ_CONFLICT_ERROR)
+            self.quiz_cache.invalidate(id_quiz)
             return (True, "Quiz has no more questions")
         else:
-            self.query_db(
-                "UPDATE quiz SET question_i = ? WHERE id_quiz = ?",
-                (quiz_info[1] + 1, id_quiz)
+            updated = self.query_db(
+                "UPDATE quiz SET question_i = question_i + 1, version = version + 1 WHERE id_quiz = ? AND version = ? RETURNING version",
+                (id_quiz, quiz_info[3]), one = True
             )
-
-            # Get da nova questão
-            # question_info = self.query_db(
-            #     "SELECT question, answers FROM question WHERE id_question = ?",
-            #    ( quiz_info[-1].split(";")[quiz_info[1] + 1], ), one = True
-            # )
+            if not updated:
+                return (False, QUIZ_CONFLICT_ERROR)
+            self.quiz_cache.invalidate(id_quiz)
 
             return (True,)
 
@@ -313,32 +758,101 @@ class Kuko:
         - scores (dict): dicionário em que chaves são ids dos participantes do quiz, e valores a sua pontuação no mesmo
         """
         quiz_info = self.query_db(
-            "SELECT q.state, q.points, qs.questions, re.* FROM quiz q LEFT OUTER JOIN qset qs ON q.id_qset = qs.id_qset LEFT OUTER JOIN results re ON re.id_quiz = q.id_quiz WHERE q.id_quiz = ?",
-            (id_quiz, ),
+            "SELECT q.state, EXISTS (SELECT 1 FROM quiz_score s WHERE s.id_quiz = q.id_quiz) FROM quiz q WHERE q.id_quiz = ?",
+            (id_quiz, ), one = True
         )
 
         # Verificamos se quiz existe
         if not quiz_info:
             return (False, "Quiz doesn't exist in the database.")
-        elif len(quiz_info) == 1 and quiz_info[0][-1] == None:
+        elif not quiz_info[1]:
             return (False, "Quiz has no registered answers. Unable to calculate scores.")
 
         # Verificamos se estado do quiz é ONGOING
-        if quiz_info[0][0] != "ENDED":
+        if quiz_info[0] != "ENDED":
             return (False, "Quiz is ongoing.")
 
-        scores = {}
+        # Pontuações são mantidas em quiz_score à medida que as respostas são registadas
+        scores = {
+            participant: score
+            for participant, score in self.query_db(
+                "SELECT participant, score FROM quiz_score WHERE id_quiz = ? ORDER BY first_question_i, participant",
+                (id_quiz, ),
+            )
+        }
 
-        for result in quiz_info:
-            question_right_answer = self.query_db(
-                "SELECT k FROM question WHERE id_question = ?",
-                (result[2].split(";")[result[4]], ), one = True
-            )[0]
+        return (id_quiz, scores)
 
-            if scores.get(result[5]):
-                scores[result[5]] += int(result[1].split(";")[result[4]]) if question_right_answer == result[-1] else 0
-                
-            else:
-                scores[result[5]] = int(result[1].split(";")[result[4]]) if question_right_answer == result[-1] else 0
+    def get_participant_score(self, id_quiz, id_participant):
+        """
+        Devolve pontuação atual de um participante num quiz. Pode ser consultada enquanto o quiz decorre.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+        - id_participant(int): identificador do participante
+
+        Returns:
+        - score (int): pontuação do participante
+        """
+        quiz_info = self.query_db(
+            "SELECT EXISTS (SELECT 1 FROM quiz_participant p WHERE p.id_quiz = q.id_quiz AND p.participant = ?), "
+            "(SELECT s.score FROM quiz_score s WHERE s.id_quiz = q.id_quiz AND s.participant = ?) "
+            "FROM quiz q WHERE q.id_quiz = ?",
+            (id_participant, id_participant, id_quiz), one = True
+        )
+
+        if not quiz_info:
+            return (False, "Quiz doesn't exist in the database.")
+
+        if not quiz_info[0]:
+            return (False, NOT_REGISTERED_ERROR)
+
+        return (True, quiz_info[1] or 0)
+
+    def compute_quiz_scores(self, id_quiz):
+        """
+        Calcula a pontuação de cada participante de um quiz a partir das respostas registadas em results, numa única query agregada.
+        Só aparecem participantes que responderam a pelo menos uma pergunta.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+
+        Returns:
+        - list[tuple]: lista de (participante, pontuação, índice da primeira pergunta respondida)
+        """
+        return self.query_db(SCORES_QUERY, (id_quiz, ))
 
-        return (id_quiz, scores)
\ No newline at end of file
+    def check_quiz_scores(self, id_quiz):
+        """
+        Compara as pontuações guardadas em quiz_score com as calculadas a partir de results.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+
+        Returns:
+        - list[tuple]: lista de (participante, pontuação guardada, pontuação esperada) para os participantes com diferenças
+        """
+        expected = {participant: score for participant, score, _ in self.compute_quiz_scores(id_quiz)}
+        stored = {
+            participant: score
+            for participant, score in self.query_db("SELECT participant, score FROM quiz_score WHERE id_quiz = ?", (id_quiz, ))
+        }
+
+        return [
+            (participant, stored.get(participant), expected.get(participant))
+            for participant in sorted(expected.keys() | stored.keys())
+            if stored.get(participant) != expected.get(participant)
+        ]
+
+    def rebuild_quiz_scores(self, id_quiz):
+        """
+        Reconstrói as pontuações de um quiz em quiz_score a partir de results.
+
+        Args:
+        - id_quiz(int): identificador do quiz
+        """
+        self.query_db("DELETE FROM quiz_score WHERE id_quiz = ?", (id_quiz, ))
+        self.query_db(
+            f"INSERT INTO quiz_score (id_quiz, participant, score, first_question_i) SELECT ?, * FROM ({SCORES_QUERY})",
+            (id_quiz, id_quiz)
+        )
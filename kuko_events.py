@@ -0,0 +1,133 @@
+import asyncio
+import json
+import queue
+import threading
+
+# Nome do evento SSE para cada tipo de notificação (ver Kuko.get_quiz_notification)
+SSE_EVENTS = {"next": "next", "rel": "end"}
+
+def format_sse(payload):
+    """
+    Formata uma notificação como evento SSE (server-sent events).
+
+    Args:
+    - payload (dict): conteúdo da notificação (type next ou rel)
+
+    Returns:
+    - bytes: evento, com o tipo (next ou end) e a notificação em JSON
+    """
+    return f"event: {SSE_EVENTS[payload['type']]}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+
+# Comentário SSE enviado periodicamente, para manter a conexão aberta através de proxies
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+class Subscription:
+    """
+    Subscrição das notificações de um quiz, consumida por uma thread (get bloqueante).
+    """
+
+    def __init__(self, id_quiz, max_pending):
+        self.id_quiz = id_quiz
+        self.queue = queue.Queue(max_pending)
+
+    def deliver(self, payload):
+        # Se o cliente for demasiado lento, descartamos as notificações mais antigas (cada uma traz o estado atual)
+        while True:
+            try:
+                self.queue.put_nowait(payload)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """
+        Devolve a próxima notificação, ou None se não chegar nenhuma em timeout segundos.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class AsyncSubscription:
+    """
+    Subscrição das notificações de um quiz, consumida por uma corrotina (entregues através do event loop).
+    """
+
+    def __init__(self, id_quiz, loop, max_pending):
+        self.id_quiz = id_quiz
+        self.loop = loop
+        self.queue = asyncio.Queue(max_pending)
+
+    def deliver(self, payload):
+        self.loop.call_soon_threadsafe(self._put, payload)
+
+    def _put(self, payload):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+class EventBus:
+    """
+    Canal publish/subscribe em memória, local ao processo, com as notificações de cada quiz (usado por /stream).
+    """
+
+    def __init__(self, max_pending=16):
+        """
+        Args:
+        - max_pending (int): nº máximo de notificações por entregar a cada subscritor
+        """
+        self.max_pending = max_pending
+        self._subscribers = {}  # id_quiz -> set de subscrições
+        self._lock = threading.Lock()
+
+    def subscribe(self, id_quiz, loop=None):
+        """
+        Subscreve as notificações de um quiz.
+
+        Args:
+        - id_quiz (int): identificador do quiz
+        - loop: event loop, se a subscrição for consumida por uma corrotina
+
+        Returns:
+        - Subscription ou AsyncSubscription
+        """
+        if loop is None:
+            subscription = Subscription(id_quiz, self.max_pending)
+        else:
+            subscription = AsyncSubscription(id_quiz, loop, self.max_pending)
+
+        with self._lock:
+            self._subscribers.setdefault(id_quiz, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.id_quiz)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.id_quiz]
+
+    def publish(self, id_quiz, payload):
+        """
+        Entrega uma notificação a todos os subscritores do quiz.
+
+        Args:
+        - id_quiz (int): identificador do quiz
+        - payload (dict): conteúdo da notificação
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(id_quiz, ()))
+
+        for subscription in subscribers:
+            subscription.deliver(payload)
+
+    def count(self):
+        """
+        Devolve o nº total de subscrições ativas.
+        """
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
@@ -1,21 +1,143 @@
-from flask import Flask, request, g
-from kuko_data import Kuko
+from flask import Flask, request, g, Response
+from kuko_data import Kuko, QUIZ_CONFLICT_ERROR
+from kuko_cache import ValidatorCache
+import atexit
+import itertools
+import json
+import logging
+import os
 import ssl
+import time
+from contextlib import contextmanager
 from utils import *
 from kazoo.client import KazooClient
-from setup_db import connect_db
+from setup_db import init_db, init_shards, shard_path, shard_index, next_quiz_id, connect_db, ConnectionPool, BANK_ALIAS
+from kuko_logging import log, setup_logging, parse_sample_rates, RequestLogSampler
+from kuko_metrics import MetricsRegistry, StatementLabels
+from kuko_profiler import QueryProfiler
+from kuko_events import EventBus, format_sse, SSE_KEEPALIVE
+from kuko_publisher import ZkPublisher
+from kuko_writer import GroupCommitWriter, WriterUnavailableError
+from kuko_answer_log import AnswerLog
+from shard_db import reshard
 
 app = Flask(__name__)
 
-zh = KazooClient(hosts='127.0.0.1:2181')
+# Configuração da base de dados (pode ser alterada através de variáveis de ambiente)
+DB_NAME = os.environ.get("KUKO_DB", "kuko.db")
+DB_SYNCHRONOUS = os.environ.get("KUKO_DB_SYNCHRONOUS", "NORMAL")
+DB_MMAP_SIZE = int(os.environ.get("KUKO_DB_MMAP_SIZE", 256 * 1024 * 1024))
+DB_CACHED_STATEMENTS = int(os.environ.get("KUKO_DB_CACHED_STATEMENTS", 256))
+DB_POOL_MAX_IDLE = int(os.environ.get("KUKO_DB_POOL_MAX_IDLE", 32))
+# Nº de ficheiros (shards) pelos quais são repartidos os dados dos quizzes; 1 mantém tudo em DB_NAME
+DB_SHARDS = int(os.environ.get("KUKO_DB_SHARDS", 1))
+# 1 se vários processos servem a mesma base de dados (ex: uvicorn --workers): /get e /quiz confirmam então a versão do
+# estado do quiz em cache (ver Kuko.shared)
+DB_SHARED = os.environ.get("KUKO_DB_SHARED", "0") == "1"
+
+# 1 para as escritas serem feitas por uma thread por ficheiro da base de dados, com group commit (ver kuko_writer); por
+# omissão, cada pedido faz o seu commit.
+# Cada commit junta até WRITE_MAX_BATCH escritas, esperando no máximo WRITE_MAX_DELAY_MS por mais; WRITE_SYNCHRONOUS é o
+# PRAGMA synchronous da conexão de escrita (FULL: cada grupo está no disco quando os pedidos recebem resposta). Um pedido
+# espera no máximo WRITE_TIMEOUT_MS pela sua escrita; depois disso (ou se o writer parar), recebe 503
+GROUP_COMMIT = os.environ.get("KUKO_GROUP_COMMIT", "0") == "1"
+WRITE_MAX_BATCH = int(os.environ.get("KUKO_WRITE_MAX_BATCH", 64))
+WRITE_MAX_DELAY_MS = float(os.environ.get("KUKO_WRITE_MAX_DELAY_MS", 1))
+WRITE_SYNCHRONOUS = os.environ.get("KUKO_WRITE_SYNCHRONOUS", "FULL")
+WRITE_TIMEOUT_MS = float(os.environ.get("KUKO_WRITE_TIMEOUT_MS", 10000))
+
+# Log de respostas (desativado por omissão): /ans responde depois de a resposta estar no log local (ver kuko_answer_log), que é
+# passado para a base de dados a cada ANSWER_LOG_FLUSH_MS (ou com ANSWER_LOG_MAX_PENDING respostas). Cada processo tem o seu log
+ANSWER_LOG = os.environ.get("KUKO_ANSWER_LOG", "")
+ANSWER_LOG_FLUSH_MS = float(os.environ.get("KUKO_ANSWER_LOG_FLUSH_MS", 200))
+ANSWER_LOG_MAX_PENDING = int(os.environ.get("KUKO_ANSWER_LOG_MAX_PENDING", 5000))
+
+# Configuração dos registos: nível, formato (text ou json) e taxa de amostragem por rota (ver kuko_logging)
+LOG_LEVEL = os.environ.get("KUKO_LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("KUKO_LOG_FORMAT", "text")
+LOG_SAMPLE = os.environ.get("KUKO_LOG_SAMPLE", "")
+
+log_handler = setup_logging(LOG_LEVEL, json_output=LOG_FORMAT == "json")
+log_sampler = RequestLogSampler(parse_sample_rates(LOG_SAMPLE))
+
+# Métricas expostas em /metrics
+metrics = MetricsRegistry()
+http_requests = metrics.counter("kuko_http_requests_total", "Requests handled.", ("route", "method", "status"))
+http_latency = metrics.histogram("kuko_http_request_duration_seconds", "Request latency.", ("route", "method", "status"))
+db_latency = metrics.histogram("kuko_db_query_duration_seconds", "SQL statement latency (execute and fetch).", ("statement",))
+zk_latency = metrics.histogram("kuko_zk_call_duration_seconds", "ZooKeeper call latency.", ("operation",))
+zk_publish_lag = metrics.histogram("kuko_zk_publish_lag_seconds", "Delay between a ZooKeeper update being requested and published.")
+db_write_batch = metrics.histogram("kuko_db_write_batch_size", "Writes per group commit.", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+db_commit_latency = metrics.histogram("kuko_db_commit_duration_seconds", "Group commit latency.")
+statement_label = StatementLabels()
+
+# Perfil das queries (desativado por omissão): estatísticas por query e EXPLAIN QUERY PLAN das mais lentas,
+# disponíveis em /admin/queries e escritas em PROFILE_DUMP quando o servidor termina
+PROFILE_QUERIES = os.environ.get("KUKO_PROFILE_QUERIES", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("KUKO_SLOW_QUERY_MS", 10))
+PROFILE_DUMP = os.environ.get("KUKO_PROFILE_DUMP", "query_profile.json")
+
+query_profiler = None
+if PROFILE_QUERIES:
+    query_profiler = QueryProfiler(SLOW_QUERY_MS / 1000, statement_label)
+    atexit.register(query_profiler.dump, PROFILE_DUMP)
+
+# Endereço do servidor e do ZooKeeper
+HOST = os.environ.get("KUKO_HOST", "localhost")
+PORT = int(os.environ.get("KUKO_PORT", 5000))
+ZK_HOSTS = os.environ.get("KUKO_ZK_HOSTS", "127.0.0.1:2181")
+
+zh = KazooClient(hosts=ZK_HOSTS)
+
+# Escritas no ZooKeeper feitas em segundo plano, fora dos pedidos (ver kuko_publisher)
+ZK_MAX_PENDING = int(os.environ.get("KUKO_ZK_MAX_PENDING", 10000))
+ZK_MAX_RETRIES = int(os.environ.get("KUKO_ZK_MAX_RETRIES", 5))
+
+zk_publisher = ZkPublisher(zh, max_pending=ZK_MAX_PENDING, max_retries=ZK_MAX_RETRIES, lag=zk_publish_lag, latency=zk_latency)
+zk_publisher.start()
+atexit.register(zk_publisher.stop)
 
 #Métodos para criar/gerir nós Zookeeper
 
+# Tamanho máximo dos dados publicados num nó (o ZooKeeper aceita até ~1 MB por nó, por omissão)
+ZNODE_MAX_BYTES = 512 * 1024
+
+# Notificações entregues aos participantes ligados a /stream, e intervalo (em segundos) entre keepalives
+event_bus = EventBus()
+STREAM_KEEPALIVE = float(os.environ.get("KUKO_STREAM_KEEPALIVE", 15))
+
 def create_quiz_node(quiz_id):
     """
     Cria um nó quiz, com o identificador do mesmo. Clientes registados neste quiz serão notificados quando se passa à próxima questão.
+    O nó é criado em segundo plano, pelo zk_publisher.
+    """
+    zk_publisher.ensure_path(f"/quiz/{quiz_id}")
+
+def notify_stream(id_quiz, payload):
+    """
+    Entrega a notificação aos participantes ligados a /stream, diretamente, sem passar pelo ZooKeeper.
     """
-    zh.ensure_path(f"/quiz/{quiz_id}")
+    event_bus.publish(id_quiz, (format_sse(payload), payload["type"] == "rel"))
+
+def publish_quiz_node(id_quiz):
+    """
+    Publica no nó do quiz o seu estado atual (ver Kuko.get_quiz_notification), em JSON: em "next", a pergunta atual;
+    em "rel", as pontuações. Os participantes são notificados da alteração e não precisam de pedir /get ou /rel.
+    Se as pontuações não couberem no nó, são omitidas (scores = null), e os participantes pedem /rel.
+    A escrita no nó é feita em segundo plano, pelo zk_publisher; os participantes ligados a /stream são notificados já.
+    """
+    payload = kd.get_quiz_notification(id_quiz)
+    if payload is None:
+        return
+
+    notify_stream(id_quiz, payload)
+
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    if len(data) > ZNODE_MAX_BYTES and payload["type"] == "rel":
+        payload["scores"] = None
+        data = json.dumps(payload, separators=(",", ":")).encode()
+
+    zk_publisher.set(f"/quiz/{id_quiz}", data)
 
 def watch_quiz_node(id_quiz):
     @zh.DataWatch(f"/quiz/{id_quiz}")
@@ -23,25 +145,71 @@ def watch_quiz_node(id_quiz):
         if event and event.type == 'CHANGED':
             participant_nodes = zh.get_children(f"/quiz/{id_quiz}/participants")
             for participant in participant_nodes:
-                print(f"NEXT was called on Quiz. Notification sent to {participant}.")
+                log.info("NEXT was called on Quiz. Notification sent to %s.", participant)
 
 #Métodos para gerir a ligação à bd
 
+# Esquema é criado uma única vez, no arranque, e não a cada conexão
+db_created = init_db(DB_NAME)
+
+db_pool = ConnectionPool(
+    DB_NAME,
+    max_idle=DB_POOL_MAX_IDLE,
+    synchronous=DB_SYNCHRONOUS,
+    mmap_size=DB_MMAP_SIZE,
+    cached_statements=DB_CACHED_STATEMENTS,
+)
+
+# Com DB_SHARDS > 1, os dados de cada quiz ficam no ficheiro do seu shard (ver setup_db.shard_index), com o seu próprio
+# lock de escrita: escritas em quizzes de shards diferentes não esperam umas pelas outras. O banco de questões e os qsets
+# ficam em DB_NAME, ligado (ATTACH) a cada conexão dos shards, pelo que as queries de Kuko não mudam.
+shard_pools = []
+if DB_SHARDS > 1:
+    if db_created:
+        # Base de dados nova: o quiz de exemplo de schema.sql é criado na base de dados principal e passa já para o seu shard
+        reshard(DB_NAME, DB_SHARDS, vacuum=False, report=log.info)
+    init_shards(DB_NAME, DB_SHARDS)
+    shard_pools = [
+        ConnectionPool(
+            shard_path(DB_NAME, index),
+            max_idle=DB_POOL_MAX_IDLE,
+            synchronous=DB_SYNCHRONOUS,
+            mmap_size=DB_MMAP_SIZE,
+            cached_statements=DB_CACHED_STATEMENTS,
+            attach={BANK_ALIAS: DB_NAME},
+        )
+        for index in range(DB_SHARDS)
+    ]
+
+# Quizzes novos são distribuídos pelos shards, à vez (next de itertools.count é atómico entre threads)
+quiz_counter = itertools.count()
+
+@app.before_request
+def select_shard():
+    """
+    Nos pedidos de um quiz, as conexões à base de dados passam a ser obtidas do pool do shard desse quiz.
+    """
+    if shard_pools and request.view_args and "id_quiz" in request.view_args:
+        g.db_shard = shard_index(request.view_args["id_quiz"], DB_SHARDS)
+
 @app.teardown_appcontext
 def close_connection(exception):
     """
-    Encerrra conexão à base de dados, se esta existir.
+    Devolve conexão à base de dados ao pool, se esta existir. Alterações que não tenham sido commited são revertidas.
     """
-    db = getattr(g, "_database", None)
+    db = g.pop("db", None)
     if db is not None:
-        db.close()
+        g.pop("db_pool", db_pool).release(db)
 
 def get_db():
     """
-    Devolve conexão à base de dados. Se esta ainda não existir no contexto da aplicação, estabelece conexão.
+    Devolve conexão à base de dados. Se esta ainda não existir no contexto da aplicação, obtém uma conexão do pool
+    (do shard do quiz, se g.db_shard estiver definido; caso contrário, da base de dados principal).
     """
     if "db" not in g:
-        g.db = connect_db("kuko.db")
+        shard = g.get("db_shard")
+        g.db_pool = db_pool if shard is None else shard_pools[shard]
+        g.db = g.db_pool.acquire()
 
     return g.db
 
@@ -52,19 +220,276 @@ def query_db(query, args=(), one=False):
     -query (str): query a executar
     -args (tuple): tuplo com argumentos a passar à query
     """
+    start = time.perf_counter()
     cursor = get_db().execute(query, args)
     res = cursor.fetchall()
     cursor.close()
+    elapsed = time.perf_counter() - start
+    db_latency.observe(elapsed, statement_label(query))
+    if query_profiler is not None:
+        query_profiler.record(get_db(), query, args, elapsed, len(res))
     return (res[0] if res else None) if one else res
 
+def query_many_db(query, args_list):
+    """
+    Função auxiliar para executar a mesma query na bd para vários conjuntos de argumentos (executemany).
+    Args:
+    -query (str): query a executar
+    -args_list (list[tuple]): lista de tuplos com argumentos a passar à query
+    """
+    start = time.perf_counter()
+    cursor = get_db().executemany(query, args_list)
+    cursor.close()
+    elapsed = time.perf_counter() - start
+    db_latency.observe(elapsed, statement_label(query))
+    if query_profiler is not None:
+        # Os argumentos podem ser um iterador já consumido, pelo que não é capturado o plano
+        query_profiler.record(get_db(), query, None, elapsed, cursor.rowcount)
+
+
+@contextmanager
+def writer_connection(shard=None):
+    """
+    Conexão de escrita de um GroupCommitWriter (da base de dados principal, ou de um shard), aberta num contexto da
+    aplicação próprio da thread do writer: as funções de Kuko executadas pelo writer obtêm-na através de get_db.
+    """
+    if shard is None:
+        connection = connect_db(DB_NAME, synchronous=WRITE_SYNCHRONOUS, mmap_size=DB_MMAP_SIZE, cached_statements=DB_CACHED_STATEMENTS)
+    else:
+        connection = connect_db(
+            shard_path(DB_NAME, shard), synchronous=WRITE_SYNCHRONOUS, mmap_size=DB_MMAP_SIZE,
+            cached_statements=DB_CACHED_STATEMENTS, attach={BANK_ALIAS: DB_NAME}
+        )
+    with app.app_context():
+        g.db = connection
+        # As escritas correm dentro da transação do grupo, começada pelo writer (ver begin_write)
+        g.write_transaction = True
+        try:
+            yield connection
+        finally:
+            g.pop("db")
+            connection.close()
+
+def start_writer(shard=None):
+    writer = GroupCommitWriter(
+        lambda: writer_connection(shard),
+        max_batch=WRITE_MAX_BATCH,
+        max_delay=WRITE_MAX_DELAY_MS / 1000,
+        timeout=WRITE_TIMEOUT_MS / 1000,
+        name="kuko-writer" if shard is None else f"kuko-writer-shard{shard}",
+        batch_size=db_write_batch,
+        commit_latency=db_commit_latency,
+    )
+    writer.start()
+    atexit.register(writer.stop)
+    return writer
+
+# Um writer por ficheiro: o da base de dados principal (questões e qsets, e quizzes se não houver shards) e um por shard
+db_writer = None
+shard_writers = []
+if GROUP_COMMIT:
+    db_writer = start_writer()
+    if shard_pools:
+        shard_writers = [start_writer(index) for index in range(DB_SHARDS)]
+
+def write(function, *args):
+    """
+    Executa uma escrita (ex: kd.answer_question) e devolve o seu resultado.
+    Com group commit, é executada pelo writer do ficheiro do pedido (o shard do quiz, ou a base de dados principal), e já está
+    commited quando esta função retorna. Caso contrário, é executada na conexão do pedido, e a rota faz commit_db.
+    """
+    if db_writer is None:
+        return function(*args)
+    shard = g.get("db_shard")
+    writer = db_writer if shard is None else shard_writers[shard]
+    return writer.submit(function, *args)
+
+def begin_write():
+    """
+    Começa a transação de escrita do pedido (BEGIN IMMEDIATE), que obtém já o lock de escrita. Nas escritas executadas
+    por um GroupCommitWriter não faz nada: correm dentro da transação do grupo, que já tem o lock.
+    """
+    if not g.get("write_transaction"):
+        query_db("BEGIN IMMEDIATE")
+
+def commit_db():
+    """
+    Faz commit das alterações feitas na conexão do pedido, se este obteve uma.
+    """
+    if "db" in g:
+        g.db.commit()
+
+def database_unavailable():
+    """
+    Resposta 503 quando uma escrita não pôde ser feita na base de dados (ex: erro de disco); o cliente pode repetir o pedido.
+    """
+    return return_error_success_msg(descriptor=SERVICE_UNAVAILABLE_URL, code=503, title=SERVICE_UNAVAILABLE_TITLE, detail=DATABASE_UNAVAILABLE_ERROR)
+
+@app.errorhandler(WriterUnavailableError)
+def writer_unavailable(error):
+    """
+    Escrita que o writer não fez a tempo (ou writer parado): o pedido recebe 503 em vez de ficar à espera.
+    """
+    log.warning("Write failed: %s", error)
+    return database_unavailable()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Regista contagem e latência de cada pedido, por rota, método e código HTTP.
+    """
+    start = g.get("request_start")
+    if start is not None:
+        labels = (request.endpoint or "unknown", request.method, response.status_code)
+        http_requests.inc(*labels)
+        http_latency.observe(time.perf_counter() - start, *labels)
+    return response
+
+def collect_runtime_metrics():
+    """
+    Valores lidos no momento da exportação: cache de estado dos quizzes, registos descartados e fila de escritas no ZooKeeper.
+    """
+    cache = kd.quiz_cache.stats()
+    runtime = [
+        ("kuko_quiz_cache_hits_total", "counter", "Quiz state cache hits.", cache["hits"]),
+        ("kuko_quiz_cache_misses_total", "counter", "Quiz state cache misses.", cache["misses"]),
+        ("kuko_quiz_cache_stale_total", "counter", "Quiz state cache entries dropped after a change by another process.", cache["stale"]),
+        ("kuko_quiz_cache_entries", "gauge", "Quizzes in the state cache.", cache["entries"]),
+        ("kuko_log_records_dropped_total", "counter", "Log records dropped because the queue was full.", log_handler.dropped),
+        ("kuko_zk_publish_pending", "gauge", "ZooKeeper nodes with updates not yet published.", zk_publisher.pending()),
+        ("kuko_zk_publish_oldest_pending_seconds", "gauge", "Age of the oldest ZooKeeper update not yet published.", zk_publisher.oldest_pending_age()),
+        ("kuko_zk_publish_coalesced_total", "counter", "ZooKeeper updates superseded before being published.", zk_publisher.coalesced),
+        ("kuko_zk_publish_failures_total", "counter", "ZooKeeper publish attempts that failed.", zk_publisher.failures),
+        ("kuko_zk_publish_dropped_total", "counter", "ZooKeeper updates dropped because the queue was full or after too many failed attempts.", zk_publisher.dropped),
+    ]
+    if db_writer is not None:
+        writers = [db_writer] + shard_writers
+        runtime += [
+            ("kuko_db_write_pending", "gauge", "Writes waiting for the database writers.", sum(writer.pending() for writer in writers)),
+            ("kuko_db_write_failures_total", "counter", "Group commits that failed.", sum(writer.failures for writer in writers)),
+        ]
+    if answer_log is not None:
+        runtime += [
+            ("kuko_answer_log_pending", "gauge", "Logged answers not yet written to the database.", answer_log.pending()),
+            ("kuko_answer_log_flushed_total", "counter", "Logged answers written to the database.", answer_log.flushed),
+            ("kuko_answer_log_flush_failures_total", "counter", "Answer log flushes that failed (and were retried).", answer_log.failures),
+        ]
+    return runtime
+
+metrics.add_collector(collect_runtime_metrics)
+
+@app.before_request
+def log_request():
+    """
+    Regista cada pedido recebido (nível DEBUG), se a rota for escolhida pela amostragem.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        g.log_sampled = log_sampler.sample(request.endpoint)
+        if g.log_sampled:
+            log.debug("RECEIVED %s REQUEST at %s", request.method, request.url,
+                      extra={"route": request.endpoint, "method": request.method, "url": request.url})
+
 #Inicialização de Kuko, que vai comunicar com a bd
-kd = Kuko(query_db)
+kd = Kuko(query_db, query_many_db, begin_function=begin_write, shared=DB_SHARED)
+
+def flush_answers(answers):
+    """
+    Guarda na base de dados (em results e quiz_score) respostas do log, agrupadas pelo shard do quiz.
+    """
+    shards = {}
+    for row in answers:
+        shards.setdefault(shard_index(row[0], DB_SHARDS) if shard_pools else None, []).append(row)
+    for shard, rows in shards.items():
+        with app.app_context():
+            if shard is not None:
+                g.db_shard = shard
+            write(kd.record_answers, rows)
+            commit_db()
+
+def load_answered(id_quiz, question_i):
+    with app.app_context():
+        if shard_pools:
+            g.db_shard = shard_index(id_quiz, DB_SHARDS)
+        return kd.get_answered_participants(id_quiz, question_i)
+
+# Respostas que ficaram no log (processo terminado antes de as passar para a base de dados) são guardadas já aqui
+answer_log = None
+if ANSWER_LOG:
+    answer_log = AnswerLog(
+        ANSWER_LOG, flush_answers, load_answered,
+        flush_interval=ANSWER_LOG_FLUSH_MS / 1000, max_pending=ANSWER_LOG_MAX_PENDING,
+    )
+    answer_log.start()
+    atexit.register(answer_log.stop)
+
+# ETags de /question, /get e /quiz. ETAG_VERSION deve ser incrementada sempre que muda o conteúdo destas respostas.
+# As questões não mudam depois de criadas: a ETag depende só do id. A de um quiz muda com o estado e a pergunta atual.
+ETAG_VERSION = 1
+
+# Questões já servidas por este processo: um pedido condicional a uma delas recebe 304 sem consultar a base de dados
+known_questions = ValidatorCache()
+
+def question_etag(id_question):
+    return f"question-{id_question}-v{ETAG_VERSION}"
+
+def quiz_etag(id_quiz, state, question_i):
+    return f"quiz-{id_quiz}-{state}-{question_i}-v{ETAG_VERSION}"
+
+def not_modified(etag):
+    """
+    Resposta 304 a um pedido condicional (If-None-Match) cuja ETag corresponde à versão atual do recurso.
+    """
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def with_etag(result, etag):
+    """
+    Acrescenta a ETag (e Cache-Control: no-cache, para o cliente revalidar sempre) a uma resposta de return_error_success_msg.
+    Se o pedido já tiver esta versão (If-None-Match), responde 304, sem corpo.
+    """
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+
+    response, code = result
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response, code
+
+# Nº máximo de respostas aceites num único pedido a /ans/<id_quiz>/batch
+MAX_BATCH_ANSWERS = int(os.environ.get("KUKO_MAX_BATCH_ANSWERS", 10000))
+
+# Nº de questões inseridas por transação em /question/bulk, e nº máximo de erros reportados
+IMPORT_CHUNK_SIZE = int(os.environ.get("KUKO_IMPORT_CHUNK_SIZE", 5000))
+MAX_IMPORT_ERRORS = 1000
 
 # Rotas da app
 @app.get("/")
 def home_route():
     return "Welcome to KuKo."
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Rota com as métricas da aplicação, no formato de texto do Prometheus.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.get("/admin/queries")
+def get_query_profile():
+    """
+    Rota com o perfil das queries executadas (ver kuko_profiler), se KUKO_PROFILE_QUERIES estiver ativo.
+    """
+    if query_profiler is None:
+        return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=QUERY_PROFILE_DISABLED_ERROR)
+
+    return return_error_success_msg(detail=GET_QUERY_PROFILE_SUCCESS, code=200, data=query_profiler.report())
+
 @app.get("/question/<int:id_question>")
 def get_question(id_question):
     """
@@ -73,12 +498,15 @@ def get_question(id_question):
     # Como não é uma rota acessível pelo cliente, não faço validação de argumentos.
     # Só id_question é que é relevante, e o seu cast para int já é validado.
 
-    print(f"RECEIVED GET REQUEST at {request.url}")
+    etag = question_etag(id_question)
+    if id_question in known_questions and request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
 
     question = kd.get_registered_question(id_question)
 
     if question:
-        return return_error_success_msg(detail=GET_QUESTION_SUCESS, code=200, param=question[0])
+        known_questions.add(id_question)
+        return with_etag(return_error_success_msg(detail=GET_QUESTION_SUCESS, code=200, param=question[0]), etag)
 
     else:
         return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=ERROR_QUESTION_ID_DOES_NOT_EXIST)
@@ -88,7 +516,6 @@ def add_question():
     """ 
     Rota para adicionar uma questão à base de dados. Devolve o identificador da nova questão.
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
 
     args = request.json
 
@@ -110,10 +537,10 @@ def add_question():
 
             return return_error_success_msg(descriptor=BAD_REQUEST_URL, title=BAD_REQUEST_TITLE, code=400, detail=POST_QUESTION_LIST_ERROR)
 
-        success = kd.add_new_question(question, answers, right_answer)
+        success = write(kd.add_new_question, question, answers, right_answer)
 
         if success:
-            get_db().commit()  # commit das alterações na db
+            commit_db()  # commit das alterações na db
 
             return return_error_success_msg(code=200, detail=POST_QUESTION_SUCCESS, param=success[0])
 
@@ -124,12 +551,77 @@ def add_question():
     else:
         return return_error_success_msg(descriptor=BAD_REQUEST_URL,title=BAD_REQUEST_TITLE, code=400, detail=BAD_REQUEST_PARAMS)
 
+@app.post("/question/bulk")
+def add_questions_bulk():
+    """
+    Rota para importar um banco de questões. O body é JSON delimitado por linhas (uma questão por linha, com question, answers e right_answer),
+    lido de forma incremental e inserido em transações de IMPORT_CHUNK_SIZE questões.
+    Devolve os intervalos de identificadores atribuídos e as linhas inválidas.
+    """
+
+    try:
+        int(request.args.get("client_id"))
+    except (TypeError, ValueError):
+        return return_error_success_msg(descriptor=BAD_REQUEST_URL, title=BAD_REQUEST_TITLE, code=400, detail=BAD_REQUEST_PARAMS)
+
+    id_ranges = []
+    errors = []
+    n_errors = 0
+    n_imported = 0
+    chunk = []
+
+    def insert_chunk():
+        first_id, last_id = write(kd.add_questions_bulk, chunk)
+        commit_db()
+
+        # Juntamos intervalos consecutivos
+        if id_ranges and id_ranges[-1][1] == first_id - 1:
+            id_ranges[-1][1] = last_id
+        else:
+            id_ranges.append([first_id, last_id])
+
+    # Lemos o body linha a linha, sem o guardar todo em memória
+    for line_number, line in enumerate(request.stream, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            args = json.loads(line)
+            question = args["question"]
+            answers = args["answers"]
+            right_answer = int(args["right_answer"])
+            if not isinstance(question, str) or not isinstance(answers, list) or not all(isinstance(answer, str) for answer in answers):
+                # Ex: question a null, ou answers numa string (seria dividida em caracteres): rejeitada antes de chegar à inserção
+                error = POST_QUESTION_BULK_LINE_ERROR
+            else:
+                error = None if 1 <= right_answer <= len(answers) else POST_QUESTION_K_ERROR
+        except (ValueError, KeyError, TypeError):
+            error = POST_QUESTION_BULK_LINE_ERROR
+
+        if error:
+            n_errors += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"line": line_number, "error": error})
+            continue
+
+        chunk.append((question, answers, right_answer))
+        n_imported += 1
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            insert_chunk()
+            chunk.clear()
+
+    if chunk:
+        insert_chunk()
+
+    return return_error_success_msg(detail=POST_QUESTION_BULK_SUCCESS, code=200, param=str(n_imported),
+                                    data={"ids": id_ranges, "errors": errors, "n_errors": n_errors})
+
 @app.post("/qset")
 def add_qset():
     """
     Rota para adicionar um qset à base de dados. Devolve o identificador do novo qset, bem como os identificadores das perguntas que o compõem.
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
     args = request.json
 
     if len(args) == 2:
@@ -141,15 +633,16 @@ def add_qset():
         except ValueError:
             return return_error_success_msg(descriptor=BAD_REQUEST_URL, title=BAD_REQUEST_TITLE, code=400, detail=POST_QSET_LIST_ERROR)
 
-        success = kd.add_new_question_set(questions)
+        success = write(kd.add_new_question_set, questions)
 
-        if success:
-            get_db().commit()
+        if success[0]:
+            commit_db()
 
             return return_error_success_msg(detail=POST_QSET_SUCCESS, code=200, param=str(success[0]) + "\nQSet questions: " + ";".join(questions))
 
         else:
-            return return_error_success_msg(descriptor=BAD_REQUEST_URL,title=BAD_REQUEST_TITLE, code=400, detail=POST_QSET_IDS_DONT_EXIST)
+            # Indicamos todas as questões que não existem, e não apenas a primeira
+            return return_error_success_msg(descriptor=BAD_REQUEST_URL,title=BAD_REQUEST_TITLE, code=400, detail=POST_QSET_IDS_DONT_EXIST + POST_QSET_MISSING_IDS + ";".join(success[1]))
 
     else:
         return return_error_success_msg(descriptor=BAD_REQUEST_URL,title=BAD_REQUEST_TITLE, code=400, detail=BAD_REQUEST_PARAMS)
@@ -159,14 +652,19 @@ def get_quiz_status(id_quiz):
     """
     Rota para aceder ao estado de um quiz existente na base de dados.
     """
-    print(f"RECEIVED GET REQUEST at {request.url}")
 
+    # Estado em cache (confirmado com a versão do quiz, se a base de dados for partilhada com outros processos)
     quiz_status = kd.get_quiz_status(id_quiz)
 
     if quiz_status:
-        return return_error_success_msg(
+        # Pedido condicional: 304 sem serializar a resposta
+        etag = quiz_etag(id_quiz, *quiz_status)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+
+        return with_etag(return_error_success_msg(
             detail=GET_QUIZ_STATUS_SUCCESS, code=200, param=quiz_status[0]
-        )
+        ), etag)
 
     else:
         return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR)
@@ -176,7 +674,6 @@ def add_quiz():
     """
     Rota para adicionar um quiz à base de dados. Devolve o identificador do novo quiz.
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
     args = request.json
 
     if len(args) == 3:
@@ -190,13 +687,26 @@ def add_quiz():
         except ValueError:
             return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=POST_QUIZ_INTS_ERROR)
 
-        success = kd.add_new_quiz(qset_id, scores)
+        shard = None
+        if shard_pools:
+            shard = next(quiz_counter) % DB_SHARDS
+            g.db_shard = shard
+
+        def create_quiz():
+            id_quiz = None
+            if shard is not None:
+                # O identificador do quiz determina o seu shard: é escolhido aqui, dentro da transação do shard
+                begin_write()
+                id_quiz = next_quiz_id(query_db("SELECT MAX(id_quiz) FROM quiz", one=True)[0], shard, DB_SHARDS)
+            return kd.add_new_quiz(qset_id, scores, id_quiz)
+
+        success = write(create_quiz)
 
         # Quando há erro, devolve-se False, e uma mensagem de erro
         # Quando não há erro, devolve-se identificador do novo quiz e o seu state
         # Sempre um tuplo com 2 elementos
         if success[0]:
-            get_db().commit()
+            commit_db()
             create_quiz_node(success[0][0]) #Criamos znode, que será watched pelos participantes
             # print("Nó criado", zh.get(f"/quiz/{success[0][0]}"))
                 
@@ -212,15 +722,22 @@ def launch_quiz(id_quiz):
     """
     Rota para "lançar" um dado quiz, isto é, mudar o seu estado para "ONGOING" (altera registo deste quiz na base de dados).
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
     args = request.json
 
     if len(args) == 1:
 
-        success = kd.launch_quiz(id_quiz)
+        success = write(kd.launch_quiz, id_quiz)
 
         if success:
-            get_db().commit()
+            commit_db()
+            # Invalidamos novamente após o commit, para descartar estado lido por outro pedido antes deste estar visível
+            kd.quiz_cache.invalidate(id_quiz)
+
+            # O nó do quiz só muda em /next; os participantes ligados a /stream recebem já a primeira pergunta
+            payload = kd.get_quiz_notification(id_quiz)
+            if payload is not None:
+                notify_stream(id_quiz, payload)
+            prepare_current_question(id_quiz)
 
             return return_error_success_msg(code=200, detail=POST_LAUNCH_QUIZ_SUCCESS)
 
@@ -235,30 +752,54 @@ def go_to_next_question(id_quiz):
     """
     Rota para avançar para a próxima pergunta num dado quiz.
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
     args = request.json
 
     if len(args) == 1:  # Só é passado no body do request client_id
 
-        success = kd.go_to_next_question(id_quiz)
+        if answer_log is not None:
+            # A pergunta atual deixa de aceitar respostas, e as já aceites ficam na base de dados antes de o quiz avançar
+            # (e antes de as pontuações serem publicadas, se for a última)
+            quiz_state = kd.quiz_cache.get(id_quiz, check=True)
+            if quiz_state and quiz_state.state == "ONGOING":
+                answer_log.close(id_quiz, quiz_state.question_i)
+            try:
+                answer_log.flush()
+            except Exception as e:
+                # Quiz não avança: a pergunta volta a aceitar respostas (as já aceites ficam no log, para a próxima passagem)
+                answer_log.forget(id_quiz)
+                log.warning("Couldn't flush answer log before advancing quiz %s: %s", id_quiz, e)
+                return database_unavailable()
+
+        success = write(kd.go_to_next_question, id_quiz)
 
         if len(success) == 2:
             if success[0] and "questions" in success[1]: #No more questions
-                get_db().commit() #commit pq passámos estado para ended e alterámos timestamp_e
-                zh.set(f"/quiz/{id_quiz}", "rel".encode()) #alteramos valor de data do node quiz/id_quiz para rel - isto é, já não tem mais perguntas, e participantes devem pedir o relatório
+                commit_db() #commit pq passámos estado para ended e alterámos timestamp_e
+                kd.quiz_cache.invalidate(id_quiz)
+                if answer_log is not None:
+                    answer_log.forget(id_quiz)
+                publish_quiz_node(id_quiz) #alteramos data do node quiz/id_quiz para rel (com as pontuações) - isto é, já não tem mais perguntas
                 # print("Nó depois de mudarmos data", zh.get(f"/quiz/{id_quiz}"))
 
                 return return_error_success_msg(detail=POST_NEXT_SUCCESS_NO_MORE_QUESTIONS, code=200)
             else:
+                if answer_log is not None:
+                    # Quiz não avançou: respostas seguintes voltam a ser validadas com a base de dados
+                    answer_log.forget(id_quiz)
+
                 if "database" in success[1]:
                     return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR)
+                elif success[1] == QUIZ_CONFLICT_ERROR:
+                    return return_error_success_msg(descriptor=CONFLICT_URL, code=409, title=CONFLICT_TITLE, detail=success[1])
                 else:
                     return return_error_success_msg(descriptor=BAD_REQUEST_URL, code=400, title=BAD_REQUEST_TITLE, detail=NEXT_ERROR)
             
         elif success[0]: #tem mais perguntas
-            get_db().commit()
+            commit_db()
+            kd.quiz_cache.invalidate(id_quiz)
             
-            zh.set(f"/quiz/{id_quiz}", "next".encode()) #alteramos data para next - participantes devem pedir pergunta atual
+            publish_quiz_node(id_quiz) #alteramos data para next, com a pergunta atual - participantes já não precisam de a pedir
+            prepare_current_question(id_quiz)
             # print("Nó depois de mudarmos data", zh.get(f"/quiz/{id_quiz}"))
             
             return return_error_success_msg(detail=POST_NEXT_SUCCESS_QUESTION, code=200)
@@ -272,7 +813,6 @@ def add_participant(id_quiz):
     """
     Rota para adicionar participante a dado quiz. Retorna participantes inscritos neste.
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
     args = request.json
 
     if len(args) == 1:
@@ -284,10 +824,11 @@ def add_participant(id_quiz):
         except ValueError:
             return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=POST_REG_INTS_ERROR)
 
-        success = kd.register_participant(id_quiz, participant_id)
+        success = write(kd.register_participant, id_quiz, participant_id)
 
         if success[0]:
-            get_db().commit()
+            commit_db()
+            kd.quiz_cache.invalidate(id_quiz)
             
             return return_error_success_msg(detail=POST_REG_SUCCESS, code=200, param=success[1])
         else:
@@ -299,12 +840,31 @@ def add_participant(id_quiz):
     else:
         return return_error_success_msg(descriptor=BAD_REQUEST_URL, title=BAD_REQUEST_TITLE, detail=BAD_REQUEST_PARAMS, code=400)
 
+def current_question_body(quiz_state):
+    """
+    Devolve a resposta de /get (igual para todos os participantes) para a pergunta atual do quiz, serializada uma única vez
+    por pergunta e guardada no estado do quiz em cache.
+    """
+    body = quiz_state.response
+    if body is None:
+        body = quiz_state.response = serialize_msg(
+            detail=GET_CURRENT_QUESTION_SUCCESS, code=200, param=quiz_state.question, data=kd.question_payload(quiz_state)
+        )
+    return body
+
+def prepare_current_question(id_quiz):
+    """
+    Serializa a resposta de /get logo que o quiz passa a uma nova pergunta (em /launch e /next), antes dos pedidos dos participantes.
+    """
+    quiz_state = kd.quiz_cache.get(id_quiz)
+    if quiz_state and quiz_state.state == "ONGOING":
+        current_question_body(quiz_state)
+
 @app.get("/get/<int:id_quiz>")
 def get_current_question(id_quiz):
     """
     Rota para aceder à pergunta atual de um dado quiz ONGOING.
     """
-    print(f"RECEIVED GET REQUEST at {request.url}")
     participant_id = request.args.get("client_id")
 
     try:
@@ -314,10 +874,15 @@ def get_current_question(id_quiz):
 
     if participant_id:
 
+        # Com o estado do quiz em cache, a validação (e a resposta 304) não consulta a base de dados
         success = kd.get_current_question(id_quiz, participant_id)
 
         if success[0]:
-            return return_error_success_msg(detail=GET_CURRENT_QUESTION_SUCCESS, code=200, param=success[1][0])
+            quiz_state = success[1]
+            etag = quiz_etag(id_quiz, quiz_state.state, quiz_state.question_i)
+            if request.if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            return with_etag(return_serialized_msg(current_question_body(quiz_state), 200), etag)
         else:
             if "database" in success[1]:
                 return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR)
@@ -326,12 +891,68 @@ def get_current_question(id_quiz):
     else:
         return return_error_success_msg(descriptor=BAD_REQUEST_URL, title=BAD_REQUEST_TITLE, detail=BAD_REQUEST_PARAMS, code=400)
 
+def prepare_stream(id_quiz, participant_id):
+    """
+    Valida um pedido a /stream e devolve a notificação com o estado atual do quiz, enviada logo após a ligação.
+    Deve ser chamada com o contexto da aplicação ativo (usa a base de dados se o estado do quiz não estiver em cache).
+
+    Returns:
+    - tuple: (resposta de erro ou None, primeiro evento SSE ou None)
+    """
+    try:
+        participant_id = int(participant_id)
+    except (TypeError, ValueError):
+        return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=POST_REG_INTS_ERROR), None
+
+    if shard_pools:
+        g.db_shard = shard_index(id_quiz, DB_SHARDS)
+    quiz_state = kd.quiz_cache.get(id_quiz)
+
+    if not quiz_state:
+        return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR), None
+    if participant_id not in quiz_state.participants:
+        return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=STREAM_NOT_REGISTERED_ERROR), None
+
+    payload = kd.get_quiz_notification(id_quiz)
+    return None, (format_sse(payload), payload["type"] == "rel") if payload else None
+
+@app.get("/stream/<int:id_quiz>")
+def stream_quiz(id_quiz):
+    """
+    Rota com as notificações de um quiz (pergunta atual e fim do quiz), enviadas como server-sent events
+    numa única conexão, em alternativa ao ZooKeeper. Só para participantes inscritos no quiz.
+    Neste modo, cada conexão ocupa uma thread do servidor; com kuko_asgi, é tratada no event loop.
+    """
+    # Subscrevemos antes de ler o estado atual, para não perder notificações publicadas entretanto
+    subscription = event_bus.subscribe(id_quiz)
+
+    error, first_event = prepare_stream(id_quiz, request.args.get("client_id"))
+    if error:
+        event_bus.unsubscribe(subscription)
+        return error
+
+    def events():
+        try:
+            event = first_event
+            while True:
+                if event is None:
+                    yield SSE_KEEPALIVE
+                else:
+                    chunk, last = event
+                    yield chunk
+                    if last:
+                        return
+                event = subscription.get(timeout=STREAM_KEEPALIVE)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/ans/<int:id_quiz>")
 def answer_question(id_quiz):
     """
     Rota para responder à pergunta atual de um dado quiz.
     """
-    print(f"RECEIVED POST REQUEST at {request.url}")
     args = request.json
 
     participant_id = args.get("client_id")
@@ -343,15 +964,55 @@ def answer_question(id_quiz):
 
     if len(args) == 2:
 
-        success = kd.answer_question(id_quiz, answer_given, participant_id)
+        if answer_log is not None:
+            success = kd.log_answer(id_quiz, answer_given, participant_id, answer_log)
+        else:
+            success = write(kd.answer_question, id_quiz, answer_given, participant_id)
 
         if success[0]:
-            get_db().commit()
+            commit_db()
 
             return return_error_success_msg(detail=POST_ANS_SUCCESS, code=200, param=success[-1])
         else:
             if "database" in success[1]:
                 return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR)
+            elif success[1] == QUIZ_CONFLICT_ERROR:
+                return return_error_success_msg(descriptor=CONFLICT_URL, code=409, title=CONFLICT_TITLE, detail=success[1])
+            else:
+                return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=success[1])
+    else:
+        return return_error_success_msg(descriptor=BAD_REQUEST_URL, title=BAD_REQUEST_TITLE, detail=BAD_REQUEST_PARAMS, code=400)
+
+@app.post("/ans/<int:id_quiz>/batch")
+def answer_question_batch(id_quiz):
+    """
+    Rota para registar, de uma só vez, várias respostas à pergunta atual de um dado quiz (ex: respostas recolhidas por um gateway).
+    Devolve o resultado de cada resposta: Correct, Incorrect, Duplicate ou a mensagem de erro respetiva.
+    """
+    args = request.json
+
+    answers = args.get("answers")
+
+    if len(args) == 2 and isinstance(answers, list):
+
+        if len(answers) > MAX_BATCH_ANSWERS:
+            return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=POST_ANS_BATCH_SIZE_ERROR + str(MAX_BATCH_ANSWERS))
+
+        if answer_log is not None:
+            success = kd.log_answers_batch(id_quiz, answers, answer_log)
+        else:
+            success = write(kd.answer_questions_batch, id_quiz, answers)
+
+        if success[0]:
+            commit_db()
+
+            registered = sum(1 for item in success[1] if item["result"] in ("Correct", "Incorrect"))
+            return return_error_success_msg(detail=POST_ANS_BATCH_SUCCESS, code=200, param=str(registered), data=success[1])
+        else:
+            if "database" in success[1]:
+                return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR)
+            elif success[1] == QUIZ_CONFLICT_ERROR:
+                return return_error_success_msg(descriptor=CONFLICT_URL, code=409, title=CONFLICT_TITLE, detail=success[1])
             else:
                 return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=success[1])
     else:
@@ -362,7 +1023,6 @@ def get_quiz_report(id_quiz):
     """
     Rota para aceder ao relatório do quiz - isto é, prestação de todos os participantes inscritos no mesmo.
     """
-    print(f"RECEIVED GET REQUEST at {request.url}")
     success = kd.get_quiz_report(id_quiz)
 
     if success[0]:
@@ -373,6 +1033,28 @@ def get_quiz_report(id_quiz):
         else:
                 return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=success[1])
 
+@app.get("/score/<int:id_quiz>")
+def get_participant_score(id_quiz):
+    """
+    Rota para aceder à pontuação atual de um participante num quiz. Pode ser consultada enquanto o quiz decorre.
+    """
+    participant_id = request.args.get("client_id")
+
+    try:
+        int(participant_id)
+    except (TypeError, ValueError):
+        return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=POST_REG_INTS_ERROR)
+
+    success = kd.get_participant_score(id_quiz, participant_id)
+
+    if success[0]:
+        return return_error_success_msg(detail=GET_SCORE_SUCCESS, code=200, param=str(success[1]))
+    else:
+        if "database" in success[1]:
+            return return_error_success_msg(descriptor=NOT_FOUND_URL, code=404, title=NOT_FOUND_TITLE, detail=GET_QUIZ_STATUS_ERROR)
+        else:
+            return return_error_success_msg(descriptor = BAD_REQUEST_URL, code = 400, title = BAD_REQUEST_TITLE, detail=success[1])
+
 
 if __name__ == "__main__":
     context = ssl.SSLContext(protocol=ssl.PROTOCOL_TLS_SERVER)
@@ -381,10 +1063,12 @@ if __name__ == "__main__":
     context.load_cert_chain(certfile='./server/serv.crt',keyfile='./server/serv.key')
     zh.start()
     
-    app.run('localhost', ssl_context=context)
+    app.run(HOST, PORT, ssl_context=context)
+    # Publica as escritas pendentes antes de fechar a sessão ZooKeeper
+    zk_publisher.stop()
     
 try:
     zh.close()
 except Exception as e:
-    print("Something wrong when closing Zookeeper connection...", e)
+    log.warning("Something wrong when closing Zookeeper connection... %s", e)
 
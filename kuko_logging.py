@@ -0,0 +1,125 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context
+
+# Logger da aplicação. Mensagens com argumentos (log.debug("... %s", x)) só são formatadas se forem emitidas
+log = logging.getLogger("kuko")
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Handler que apenas coloca os registos numa fila; a formatação e a escrita são feitas pela thread do QueueListener.
+    Se a fila estiver cheia, o registo é descartado (e contado) em vez de bloquear o pedido.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Ao contrário de QueueHandler.prepare, não formata a mensagem aqui: a fila é local ao processo,
+        # pelo que o registo pode seguir tal como está e ser formatado pelo listener
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formata cada registo como um objeto JSON numa linha, com os campos extra passados ao logger (ex: route, method).
+    """
+    FIELDS = ("route", "method", "url", "status")
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def parse_sample_rates(value):
+    """
+    Lê taxas de amostragem por rota, no formato "rota=taxa,rota=taxa" (ex: "get_current_question=0.01,*=1").
+    As rotas são os nomes das funções de cada rota (request.endpoint); "*" aplica-se às restantes.
+
+    Args:
+    - value (str): taxas de amostragem
+
+    Returns:
+    - dict: taxa (entre 0 e 1) de cada rota
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, rate = item.partition("=")
+        rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class RequestLogSampler:
+    """
+    Decide, uma vez por pedido, se os registos desse pedido são emitidos, de acordo com a taxa de amostragem da rota.
+    """
+
+    def __init__(self, rates):
+        """
+        Args:
+        - rates (dict): taxa de amostragem de cada rota (ver parse_sample_rates)
+        """
+        self.rates = rates
+        self.default = rates.get("*", 1.0)
+
+    def sample(self, route):
+        rate = self.rates.get(route, self.default)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+def request_sampled():
+    """
+    Indica se o pedido atual foi escolhido para ser registado (fora de um pedido, devolve sempre True).
+    """
+    return not has_request_context() or g.get("log_sampled", True)
+
+def setup_logging(level="INFO", json_output=False, queue_size=10000, stream=None):
+    """
+    Configura o logger da aplicação: os registos passam por uma fila e são escritos por uma thread dedicada.
+    Deve ser chamada uma única vez, no arranque. A thread é parada (e a fila esvaziada) quando o processo termina.
+
+    Args:
+    - level (str): nível mínimo dos registos (DEBUG, INFO, WARNING, ERROR)
+    - json_output (bool): escrever cada registo como JSON em vez de texto
+    - queue_size (int): nº máximo de registos em espera; acima deste valor são descartados
+    - stream: destino dos registos (por omissão, stdout)
+
+    Returns:
+    - NonBlockingQueueHandler: handler associado ao logger (tem o nº de registos descartados em .dropped)
+    """
+    if json_output:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    atexit.register(listener.stop)
+
+    log.handlers = [handler]
+    log.setLevel(level.upper())
+    log.propagate = False
+    return handler
@@ -0,0 +1,170 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """
+    Contador monotónico, com um valor por combinação de labels.
+    """
+
+    def __init__(self, name, description, labels=()):
+        """
+        Args:
+        - name (str): nome da métrica
+        - description (str): descrição (linha HELP)
+        - labels (tuple[str]): nomes das labels
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Histogram:
+    """
+    Histograma de durações (em segundos), com buckets cumulativos, soma e contagem por combinação de labels.
+    """
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+        - name (str): nome da métrica
+        - description (str): descrição (linha HELP)
+        - labels (tuple[str]): nomes das labels
+        - buckets (tuple[float]): limites superiores dos buckets, por ordem crescente
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # labels -> [contagem de cada bucket (não cumulativa) + +Inf, soma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """
+        Devolve context manager que regista a duração do bloco (ex: with histogram.time("set"): ...).
+        """
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(label_values, list(counts), total) for label_values, (counts, total) in self._series.items()]
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, [('le', le)])} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas da aplicação, exportadas no formato de texto do Prometheus.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, description, labels=()):
+        metric = Counter(name, description, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, description, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Regista função chamada a cada exportação, que devolve valores lidos no momento.
+
+        Args:
+        - collector (function): função sem argumentos que devolve lista de (nome, tipo, descrição, valor)
+        """
+        self.collectors.append(collector)
+
+    def render(self):
+        """
+        Devolve todas as métricas no formato de texto do Prometheus (versão 0.0.4).
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, kind, description, value in collector():
+                lines.extend((f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name} {value}"))
+        return "\n".join(lines) + "\n"
+
+class StatementLabels:
+    """
+    Converte cada query SQL no valor da label "statement": a query numa só linha, com os espaços normalizados.
+    As queries da aplicação são constantes (os valores vão como argumentos), pelo que o nº de valores é limitado.
+    """
+
+    def __init__(self, max_statements=500):
+        """
+        Args:
+        - max_statements (int): nº máximo de queries distintas; as restantes ficam com a label "other"
+        """
+        self.max_statements = max_statements
+        self._labels = {}
+
+    def __call__(self, query):
+        label = self._labels.get(query)
+        if label is None:
+            label = " ".join(query.split()) if len(self._labels) < self.max_statements else "other"
+            self._labels[query] = label
+        return label
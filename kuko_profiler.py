@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+
+class QueryProfiler:
+    """
+    Perfil das queries executadas: para cada query distinta, nº de execuções, tempo total e máximo, e nº de linhas.
+    Quando uma execução demora mais do que o limite, é guardado o EXPLAIN QUERY PLAN da query (uma vez por query),
+    para identificar leituras completas de tabelas (SCAN).
+    """
+
+    def __init__(self, slow_threshold=0.01, statement_label=None):
+        """
+        Args:
+        - slow_threshold (float): duração (em segundos) a partir da qual uma execução é considerada lenta
+        - statement_label (function): função que converte a query no seu identificador (por omissão, a query numa só linha)
+        """
+        self.slow_threshold = slow_threshold
+        self.statement_label = statement_label or (lambda query: " ".join(query.split()))
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, connection, query, args, elapsed, rows):
+        """
+        Regista uma execução de uma query.
+
+        Args:
+        - connection (Connection): conexão em que a query foi executada (usada para o EXPLAIN QUERY PLAN)
+        - query (str): query executada
+        - args (tuple): argumentos da query, ou None se não for possível repeti-la (ex: executemany)
+        - elapsed (float): duração, em segundos
+        - rows (int): nº de linhas devolvidas (ou afetadas)
+        """
+        statement = self.statement_label(query)
+        slow = elapsed >= self.slow_threshold
+
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                stats = self._stats[statement] = {
+                    "statement": statement, "calls": 0, "total_time": 0.0, "max_time": 0.0,
+                    "rows": 0, "slow_calls": 0, "plan": None, "full_scan": None,
+                }
+            stats["calls"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["rows"] += rows
+            stats["slow_calls"] += slow
+            capture_plan = slow and stats["plan"] is None and args is not None
+            if capture_plan:
+                stats["plan"] = []  # evita que outro pedido capture o mesmo plano em simultâneo
+
+        if capture_plan:
+            plan = self.explain(connection, query, args)
+            with self._lock:
+                stats["plan"] = plan
+                stats["full_scan"] = any(
+                    detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail and "USING INDEX" not in detail
+                    for detail in plan
+                )
+
+    @staticmethod
+    def explain(connection, query, args):
+        """
+        Devolve o EXPLAIN QUERY PLAN de uma query, como lista de passos (ex: "SCAN results").
+        """
+        try:
+            cursor = connection.execute(f"EXPLAIN QUERY PLAN {query}", args)
+            plan = [row[3] for row in cursor.fetchall()]
+            cursor.close()
+            return plan
+        except sqlite3.Error as e:
+            return [f"EXPLAIN QUERY PLAN failed: {e}"]
+
+    def report(self):
+        """
+        Devolve estatísticas de todas as queries, da que ocupou mais tempo no total para a que ocupou menos.
+
+        Returns:
+        - list[dict]: estatísticas de cada query (statement, calls, total_time, avg_time, max_time, rows, slow_calls, plan, full_scan)
+        """
+        with self._lock:
+            stats = [dict(entry, plan=list(entry["plan"]) if entry["plan"] is not None else None) for entry in self._stats.values()]
+
+        for entry in stats:
+            entry["avg_time"] = entry["total_time"] / entry["calls"]
+        return sorted(stats, key=lambda entry: entry["total_time"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def dump(self, path):
+        """
+        Escreve o relatório num ficheiro JSON.
+
+        Args:
+        - path (str): caminho do ficheiro
+        """
+        with open(path, "w") as f:
+            json.dump({"slow_threshold": self.slow_threshold, "queries": self.report()}, f, indent=2)
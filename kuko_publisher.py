@@ -0,0 +1,202 @@
+import threading
+import time
+
+from kazoo.exceptions import NoNodeError
+
+from kuko_logging import log
+
+class ZkPublisher:
+    """
+    Escritas no ZooKeeper (criação e atualização dos nós dos quizzes) feitas por uma thread própria, fora dos pedidos.
+    Os pedidos apenas colocam a escrita numa fila e respondem; um ZooKeeper lento ou a religar não atrasa /quiz nem /next.
+
+    A fila guarda só a escrita mais recente de cada nó: uma atualização ainda por publicar é substituída pela seguinte
+    (os participantes só precisam do estado atual do quiz). Escritas que falham são repetidas, com espera crescente
+    entre tentativas, até serem publicadas, substituídas ou descartadas ao fim de max_retries falhas seguidas do nó.
+    A espera é contada por nó: enquanto um nó aguarda nova tentativa, as escritas dos outros nós continuam a ser publicadas.
+    """
+
+    def __init__(self, client, max_pending=10000, backoff=0.1, max_backoff=5.0, max_retries=5, lag=None, latency=None):
+        """
+        Args:
+        - client: cliente ZooKeeper (KazooClient)
+        - max_pending (int): nº máximo de nós com escritas por publicar; acima disso, novas escritas são descartadas (e contadas)
+        - backoff (float): espera, em segundos, após a primeira falha de um nó (duplica a cada falha seguida)
+        - max_backoff (float): espera máxima entre tentativas, em segundos
+        - max_retries (int): nº de falhas seguidas de um nó ao fim do qual a sua escrita é descartada (e contada)
+        - lag (Histogram): métrica onde é registado o atraso de cada escrita publicada (desde que foi pedida)
+        - latency (Histogram): métrica onde é registada a duração de cada chamada ao ZooKeeper, por operação
+        """
+        self.client = client
+        self.max_pending = max_pending
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.lag = lag
+        self.latency = latency
+
+        self._pending = {}  # caminho do nó -> (dados ou None para só criar o nó, instante do pedido mais antigo por publicar)
+        self._retries = {}  # caminho do nó -> (nº de falhas seguidas, instante a partir do qual pode ser tentado de novo)
+        self._cond = threading.Condition()
+        self._busy = False
+        self._stopped = False
+        self._thread = None
+
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="kuko-zk-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Tenta publicar as escritas pendentes (até timeout segundos) e termina a thread.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def ensure_path(self, path):
+        """
+        Pede a criação de um nó (se ainda não existir).
+        """
+        self._enqueue(path, None)
+
+    def set(self, path, data):
+        """
+        Pede a atualização dos dados de um nó (criado, se ainda não existir). Substitui escritas pendentes do mesmo nó.
+        """
+        self._enqueue(path, data)
+
+    def _enqueue(self, path, data):
+        with self._cond:
+            if path in self._pending:
+                requested_at = self._pending[path][1]
+                self.coalesced += 1
+                if data is None:
+                    return  # a escrita pendente já cria o nó
+                self._pending[path] = (data, requested_at)
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                log.warning("ZooKeeper publish queue full, dropping update of %s", path)
+                return
+            else:
+                self._pending[path] = (data, time.monotonic())
+            self._cond.notify_all()
+
+    def pending(self):
+        """
+        Devolve o nº de nós com escritas por publicar.
+        """
+        with self._cond:
+            return len(self._pending) + self._busy
+
+    def oldest_pending_age(self):
+        """
+        Devolve há quantos segundos espera a escrita pendente mais antiga (0 se não houver).
+        """
+        with self._cond:
+            if not self._pending:
+                return 0.0
+            return time.monotonic() - min(requested_at for _, requested_at in self._pending.values())
+
+    def flush(self, timeout=None):
+        """
+        Espera que as escritas pendentes sejam publicadas.
+
+        Returns:
+        - bool: True se não ficou nenhuma por publicar
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _call(self, operation, *args, **kwargs):
+        if self.latency is None:
+            return getattr(self.client, operation)(*args, **kwargs)
+        with self.latency.time(operation):
+            return getattr(self.client, operation)(*args, **kwargs)
+
+    def _write(self, path, data):
+        if data is None:
+            self._call("ensure_path", path)
+            return
+        try:
+            self._call("set", path, data)
+        except NoNodeError:
+            self._call("create", path, data, makepath=True)
+
+    def _next_ready(self):
+        """
+        (Com _cond) Devolve o nó com escrita pendente pedida há mais tempo que não esteja à espera de nova tentativa
+        (dicts mantêm a ordem de inserção), ou None e o instante da próxima tentativa.
+        """
+        if not self._retries:
+            return next(iter(self._pending)), None
+        now = time.monotonic()
+        retry_at = None
+        for path in self._pending:
+            if path not in self._retries or self._retries[path][1] <= now:
+                return path, None
+            retry_at = self._retries[path][1] if retry_at is None else min(retry_at, self._retries[path][1])
+        return None, retry_at
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    if self._pending:
+                        path, retry_at = self._next_ready()
+                        if path is not None:
+                            break
+                        self._cond.wait(retry_at - time.monotonic())
+                    else:
+                        self._cond.wait()
+                data, requested_at = self._pending.pop(path)
+                self._busy = True
+
+            try:
+                self._write(path, data)
+            except Exception as e:
+                self._failed(path, data, requested_at, e)
+                continue
+
+            with self._cond:
+                self._busy = False
+                self._retries.pop(path, None)
+                self.published += 1
+                self._cond.notify_all()
+            if self.lag is not None:
+                self.lag.observe(time.monotonic() - requested_at)
+
+    def _failed(self, path, data, requested_at, error):
+        with self._cond:
+            self._busy = False
+            self.failures += 1
+            failures = self._retries.get(path, (0, None))[0] + 1
+            if failures >= self.max_retries:
+                # Ex: nó inválido ou sem permissões; uma atualização mais recente do nó, se houver, é tentada de novo
+                self._retries.pop(path, None)
+                self.dropped += 1
+                log.warning("ZooKeeper publish of %s failed %d times, dropping it: %s", path, failures, error)
+            else:
+                delay = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+                self._retries[path] = (failures, time.monotonic() + delay)
+                log.warning("ZooKeeper publish of %s failed, retrying in %.2fs: %s", path, delay, error)
+                # Volta para a fila, a menos que entretanto tenha sido pedida uma atualização mais recente do mesmo nó
+                if path not in self._pending or self._pending[path][0] is None:
+                    self._pending[path] = (data, requested_at)
+            self._cond.notify_all()
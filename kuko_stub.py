@@ -1,38 +1,120 @@
+import json
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from kazoo.client import KazooClient
 
+# Versões do formato das notificações (dados dos nós dos quizzes) que o stub sabe ler
+NOTIFICATION_VERSIONS = (1,)
+
+def parse_notification(data):
+    """
+    Lê os dados publicados no nó de um quiz. O servidor publica um JSON com a pergunta atual ("next") ou as
+    pontuações ("rel"); servidores antigos publicam só "next" ou "rel".
+
+    Args:
+    - data (bytes): dados do nó
+
+    Returns:
+    - tuple: (tipo - "next" ou "rel" -, conteúdo da notificação ou None). Sem conteúdo (formato antigo ou versão
+    desconhecida), o participante deve pedir a pergunta (/get) ou o relatório (/rel) ao servidor.
+    """
+    text = data.decode()
+    if text in ("next", "rel"):
+        return text, None
+
+    try:
+        payload = json.loads(text)
+        kind = payload["type"]
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+    if payload.get("v") not in NOTIFICATION_VERSIONS:
+        return kind, None
+    if kind == "rel" and payload.get("scores") is None:  # pontuações não couberam no nó
+        return kind, None
+    return kind, payload
+
+def make_session(cert, ca_file='root.pem', pool_size=4):
+    """
+    Cria sessão HTTP persistente para os pedidos ao servidor (mTLS com o certificado do cliente).
+    As conexões ficam abertas (keep-alive) num pool e são reutilizadas, pelo que o handshake TLS só é feito ao abrir cada conexão.
+
+    Args:
+    - cert (tuple): tuplo com chaves ssl do cliente
+    - ca_file (str): certificado da CA que assina o certificado do servidor
+    - pool_size (int): nº máximo de conexões abertas mantidas com o servidor
+
+    Returns:
+    - Session: sessão HTTP
+    """
+    session = requests.Session()
+    session.verify = ca_file
+    session.cert = cert
+    # Sem isto, REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE (se definidas) substituiriam session.verify em cada pedido
+    session.trust_env = False
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    return session
+
 class KukoStub:
 
-    def __init__(self, localhost, port, cert, client_id):
+    def __init__(self, localhost, port, cert, client_id, pool_size=4, notifications="zookeeper"):
         """
         Cria instância de KukoStub. Guarda endereço e porto da aplicação para onde serão enviados os pedidos.
+        Os pedidos são feitos numa sessão HTTP persistente: as conexões (e o handshake TLS) são reutilizadas entre pedidos.
         Args:
         - localhost(str): endereço do servidor
         - port(str): porto
         - cert (tuple): tuplo com chaves ssl
         - client_id (int): identificador do cliente
+        - pool_size (int): nº máximo de conexões abertas mantidas com o servidor
+        - notifications (str): como são recebidas as notificações dos quizzes - "zookeeper" (watch no nó do quiz)
+        ou "sse" (conexão à rota /stream do servidor, sem ZooKeeper no cliente)
         """
         self.host = localhost
         self.port = port
         self.cert = cert
         self.client_id = client_id
-        self.zh = KazooClient(hosts='127.0.0.1:2181')
+        self.base_url = f"https://{localhost}:{port}"
+
+        self.notifications = notifications
 
-        self.zh.start()
+        # A conexão de /stream fica ocupada enquanto o quiz decorre, pelo que reservamos uma conexão para ela
+        self.session = make_session(cert, pool_size=pool_size + 1 if notifications == "sse" else pool_size)
+        if notifications == "sse":
+            self.zh = None
+        else:
+            self.zh = KazooClient(hosts='127.0.0.1:2181')
+            self.zh.start()
 
     def handle_notif(self, data, stat, event):
         """
-        Função callback quando se recebe uma notificação de mudança num nó quiz em que o participante está inscrito. Consoante o valor da mudança, efetua pedido na rota /get ou /rel, para receber a pergunta atual do quiz ou o relatório do mesmo, respetivamente.
+        Função callback quando se recebe uma notificação de mudança num nó quiz em que o participante está inscrito. O nó traz a pergunta atual do quiz ou as pontuações finais; se não trouxer (formato antigo ou desconhecido), efetua pedido na rota /get ou /rel, respetivamente.
         """
         print("Received notification. Change in znode...")
-        data = data.decode()
         if event and data:
-            if data == "next":
+            self.show_notification(event.path.split("/")[-1], *parse_notification(data))
+
+    def show_notification(self, quiz_id, kind, payload):
+        """
+        Mostra a pergunta atual ou as pontuações finais de uma notificação. Sem conteúdo, efetua pedido na rota /get ou /rel, respetivamente.
+        Args:
+        - quiz_id(str): id do quiz
+        - kind(str): tipo da notificação ("next" ou "rel")
+        - payload(dict): conteúdo da notificação, ou None
+        """
+        if kind == "next":
+            if payload:
+                print(f"Question {payload['question_i'] + 1}: {payload['question']}\nAnswers: {';'.join(payload['answers'])}")
+            else:
                 print("Requesting new question...")
-                self.get(event.path.split("/")[-1], self.client_id)
-            elif data == "rel":
+                self.get(quiz_id, self.client_id)
+        elif kind == "rel":
+            if payload:
+                print("Quiz ended.\nScores:", payload["scores"])
+            else:
                 print("Requesting quiz report...")
-                self.rel(event.path.split("/")[-1], self.client_id)
+                self.rel(quiz_id, self.client_id)
 
     def add_participant(self, id_quiz, participant_id):
         """
@@ -42,16 +124,50 @@ class KukoStub:
         - id_quiz (int): identificador do quiz
         - participant_id (int): identificador do participante
         """
+        if self.zh is None:
+            threading.Thread(target=self.listen_stream, args=(id_quiz, participant_id), daemon=True).start()
+            return
+
         self.zh.ensure_path(f"/quiz/{id_quiz}/participants/{participant_id}")
         self.zh.DataWatch(f"/quiz/{id_quiz}", func=self.handle_notif)
         print("Nó criado", self.zh.get(f"/quiz/{id_quiz}/participants/{participant_id}"))
         print("Fihos - participantes registados no quiz", self.zh.get_children(f"/quiz/{id_quiz}/participants"))
     
+    def listen_stream(self, id_quiz, participant_id):
+        """
+        Recebe as notificações de um quiz pela rota /stream (server-sent events), até ao fim do quiz ou da conexão.
+
+        Args:
+        - id_quiz (int): identificador do quiz
+        - participant_id (int): identificador do participante
+        """
+        try:
+            with self.session.get(f"{self.base_url}/stream/{id_quiz}?client_id={participant_id}", stream=True, timeout=(10, None)) as r:
+                if r.status_code != 200:
+                    print("Couldn't subscribe quiz notifications.\nSERVER RESPONSE:", r.text)
+                    return
+
+                event = None
+                for line in r.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:") and event is not None:
+                        print("Received notification...")
+                        kind, payload = parse_notification(line[len("data:"):].strip().encode())
+                        self.show_notification(id_quiz, kind, payload)
+                        if event == "end":
+                            return
+                        event = None
+        except requests.exceptions.RequestException as e:
+            print("Quiz notifications interrupted.\nError:", e)
+
     def close_zh(self):
         """
-        Encerra client Kazoo
+        Encerra client Kazoo (se existir) e a sessão HTTP
         """
-        self.zh.close()
+        if self.zh is not None:
+            self.zh.close()
+        self.session.close()
     
     def post_question(self, question, answers, right_answer, client_id):
         """
@@ -71,7 +187,7 @@ class KukoStub:
         }
 
         try:
-            r = requests.post("https://localhost:5000/question", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/question", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -82,6 +198,30 @@ class KukoStub:
         except requests.exceptions.RequestException as e:
             print("An error occurred.\nError:", e)
 
+    def import_questions(self, path, client_id):
+        """
+        Formula o pedido a enviar ao servidor para importar um banco de questões. Envia o ficheiro em streaming (sem o ler todo para memória)
+        num pedido POST para a route /question/bulk.
+        Args:
+        - path(str): ficheiro JSON delimitado por linhas, com uma questão por linha (question, answers, right_answer)
+        - client_id(int): id do cliente
+        """
+        try:
+            with open(path, "rb") as questions_file:
+                r = self.session.post(f"{self.base_url}/question/bulk?client_id={client_id}", data=questions_file,
+                                      headers={"Content-Type": "application/x-ndjson"})
+            print("POSTED", path, "to", r.url)
+
+            response = r.json()
+            print("SERVER RESPONSE:", response)
+
+        except OSError as e:
+            print("Couldn't read file.\nError:", e)
+        except requests.exceptions.JSONDecodeError as e:
+            print("Coudn't decode message.\nError:", e)
+        except requests.exceptions.RequestException as e:
+            print("An error occurred.\nError:", e)
+
     def qset(self, questions, client_id):
         """
         Formula o pedido a enviar ao servidor para criação de um qset. Cria um pedido POST para a route /qset, com os parâmetros necessários à criação de um qset.
@@ -95,7 +235,7 @@ class KukoStub:
             }
         
         try:
-            r = requests.post("https://localhost:5000/qset", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/qset", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -121,7 +261,7 @@ class KukoStub:
             }
         
         try:
-            r = requests.post("https://localhost:5000/quiz", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/quiz", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -144,7 +284,7 @@ class KukoStub:
             }
 
         try:
-            r = requests.post(f"https://localhost:5000/launch/{quiz_id}", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/launch/{quiz_id}", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -167,7 +307,7 @@ class KukoStub:
         }
 
         try:
-            r = requests.post(f"https://localhost:5000/next/{quiz_id}", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/next/{quiz_id}", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -190,7 +330,7 @@ class KukoStub:
             }
         
         try:
-            r = requests.post(f"https://localhost:5000/reg/{quiz_id}", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/reg/{quiz_id}", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -211,7 +351,7 @@ class KukoStub:
         - client_id(int): id do cliente
         """
         try:
-            r = requests.get(f"https://localhost:5000/get/{quiz_id}?client_id={client_id}", verify='root.pem', cert=self.cert)
+            r = self.session.get(f"{self.base_url}/get/{quiz_id}?client_id={client_id}")
             print("REQUESTED", r.url)
             
             
@@ -237,7 +377,7 @@ class KukoStub:
             }
         
         try:
-            r = requests.post(f"https://localhost:5000/ans/{quiz_id}", json=params, verify='root.pem', cert=self.cert)
+            r = self.session.post(f"{self.base_url}/ans/{quiz_id}", json=params)
             print("POSTED", params, "to", r.url)
             
             response = r.json()
@@ -248,6 +388,32 @@ class KukoStub:
         except requests.exceptions.RequestException as e:
             print("An error occurred.\nError:", e)
 
+    def ans_batch(self, quiz_id, answers, client_id):
+        """
+        Formula o pedido a enviar ao servidor para registar várias respostas à pergunta atual de um quiz (ex: recolhidas por um gateway).
+        Cria um pedido POST para a route /ans/<quiz_id>/batch.
+        Args:
+        - quiz_id(str): id do quiz
+        - answers(list(tuple)): lista de (client_id, answer_given) dos participantes
+        - client_id(int): id do cliente que envia o pedido
+        """
+        params = {
+            "answers": [{"client_id": participant, "answer_given": answer} for participant, answer in answers],
+            "client_id": client_id
+            }
+
+        try:
+            r = self.session.post(f"{self.base_url}/ans/{quiz_id}/batch", json=params)
+            print("POSTED", len(params["answers"]), "answers to", r.url)
+
+            response = r.json()
+            print("SERVER RESPONSE:", response)
+
+        except requests.exceptions.JSONDecodeError as e:
+            print("Coudn't decode message.\nError:", e)
+        except requests.exceptions.RequestException as e:
+            print("An error occurred.\nError:", e)
+
     def rel(self, quiz_id, client_id):
         """
         Formula o pedido a enviar ao servidor para receber o relatório final da prestação dos participantes de um dado quiz.
@@ -257,7 +423,7 @@ class KukoStub:
         """
 
         try:
-            r = requests.get(f"https://localhost:5000/rel/{quiz_id}?client_id={client_id}", verify='root.pem', cert=self.cert)
+            r = self.session.get(f"{self.base_url}/rel/{quiz_id}?client_id={client_id}")
             print("REQUESTED", r.url)
             
             response = r.json()
@@ -268,6 +434,26 @@ class KukoStub:
         except requests.exceptions.RequestException as e:
             print("An error occurred.\nError:", e)
         
+    def score(self, quiz_id, client_id):
+        """
+        Formula o pedido a enviar ao servidor para obter a pontuação atual do participante num dado quiz.
+        Args:
+        - quiz_id(str): id do quiz
+        - client_id(int): id do cliente
+        """
+
+        try:
+            r = self.session.get(f"{self.base_url}/score/{quiz_id}?client_id={client_id}")
+            print("REQUESTED", r.url)
+            
+            response = r.json()
+            print("SERVER RESPONSE:", response)
+
+        except requests.exceptions.JSONDecodeError as e:
+            print("Coudn't decode message.\nError:", e)
+        except requests.exceptions.RequestException as e:
+            print("An error occurred.\nError:", e)
+
     def get_question(self, question_id, client_id):
         """
         Formula o pedido a enviar ao servidor para pesquisar uma questão existente.
@@ -276,7 +462,7 @@ class KukoStub:
         - client_id(int): id do cliente
         """
         try:
-            r = requests.get(f"https://localhost:5000/question/{question_id}?client_id={client_id}", verify='root.pem', cert=self.cert)
+            r = self.session.get(f"{self.base_url}/question/{question_id}?client_id={client_id}")
             print("REQUESTED", r.url)
             
             response = r.json()
@@ -295,7 +481,7 @@ class KukoStub:
         - client_id(int): id do cliente
         """
         try:
-            r = requests.get(f"https://localhost:5000/quiz/{quiz_id}?client_id={client_id}", verify='root.pem', cert=self.cert)
+            r = self.session.get(f"{self.base_url}/quiz/{quiz_id}?client_id={client_id}")
             print("REQUESTED", r.url)
             
             response = r.json()
@@ -0,0 +1,240 @@
+"""
+Variante assíncrona (asyncio) do KukoStub, para simular ou servir de proxy a milhares de participantes num único processo.
+
+Todos os participantes partilham um AsyncKukoClient: um pool de conexões HTTP (httpx) e uma única sessão ZooKeeper.
+Cada quiz tem um só watch no ZooKeeper; as notificações são entregues à fila de cada participante inscrito,
+e tratadas pela corrotina do participante (AsyncKukoStub.listen).
+
+Requer httpx (pip install httpx).
+"""
+import asyncio
+import json
+import ssl
+
+from kazoo.client import KazooClient
+from kuko_stub import parse_notification
+
+try:
+    import httpx
+except ImportError:  # dependência opcional, só necessária para este módulo
+    httpx = None
+
+class AsyncKukoClient:
+    """
+    Recursos partilhados pelos participantes: cliente HTTP com pool de conexões e sessão ZooKeeper.
+    """
+
+    def __init__(self, localhost, port, cert, ca_file='root.pem', max_connections=100, zk_hosts='127.0.0.1:2181', zk=None, transport=None):
+        """
+        Args:
+        - localhost (str): endereço do servidor
+        - port (int): porto
+        - cert (tuple): tuplo com chaves ssl do cliente
+        - ca_file (str): certificado da CA que assina o certificado do servidor
+        - max_connections (int): nº máximo de conexões abertas com o servidor, partilhadas por todos os participantes
+        - zk_hosts (str): endereço do ZooKeeper
+        - zk: cliente ZooKeeper já criado (por omissão, é criado um KazooClient)
+        - transport: transporte httpx alternativo (ex: httpx.ASGITransport, para testes sem rede)
+        """
+        if httpx is None:
+            raise ImportError("AsyncKukoClient requires httpx (pip install httpx).")
+
+        if transport is None:
+            context = ssl.create_default_context(cafile=ca_file)
+            context.load_cert_chain(*cert)
+            self.http = httpx.AsyncClient(
+                base_url=f"https://{localhost}:{port}",
+                verify=context,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=30.0,
+            )
+        else:
+            self.http = httpx.AsyncClient(base_url=f"http://{localhost}:{port}", transport=transport, timeout=30.0)
+
+        self.zh = zk if zk is not None else KazooClient(hosts=zk_hosts)
+        self.loop = None
+        self.subscribers = {}  # id_quiz -> {participant_id: fila de notificações}
+
+    async def start(self):
+        """
+        Liga a sessão ZooKeeper. Deve ser chamada dentro do event loop que vai tratar as notificações.
+        """
+        self.loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self.zh.start)
+
+    async def close(self):
+        """
+        Encerra o cliente HTTP e a sessão ZooKeeper.
+        """
+        await self.http.aclose()
+        await asyncio.to_thread(self.zh.stop)
+        self.zh.close()
+
+    def participant(self, client_id):
+        """
+        Devolve stub de um participante, que usa os recursos partilhados deste cliente.
+
+        Args:
+        - client_id (int): identificador do participante
+        """
+        return AsyncKukoStub(self, client_id)
+
+    async def request(self, method, path, **kwargs):
+        """
+        Envia um pedido ao servidor.
+
+        Returns:
+        - tuple: (código HTTP, resposta em JSON ou None se não for possível descodificá-la)
+        """
+        r = await self.http.request(method, path, **kwargs)
+        try:
+            return r.status_code, r.json()
+        except json.JSONDecodeError:
+            return r.status_code, None
+
+    async def subscribe(self, id_quiz, participant_id):
+        """
+        Inscreve participante nas notificações de um quiz: cria o nó do participante e, se for o primeiro
+        participante do quiz neste cliente, o watch (único) sobre o nó do quiz.
+
+        Returns:
+        - asyncio.Queue: fila onde são entregues as notificações do quiz (tuplos devolvidos por parse_notification)
+        """
+        await asyncio.to_thread(self.zh.ensure_path, f"/quiz/{id_quiz}/participants/{participant_id}")
+
+        queue = asyncio.Queue()
+        first = id_quiz not in self.subscribers
+        self.subscribers.setdefault(id_quiz, {})[participant_id] = queue
+
+        if first:
+            def watch(data, stat, event):
+                # Chamado numa thread do Kazoo: a entrega às filas é feita no event loop
+                if event and data:
+                    self.loop.call_soon_threadsafe(self.dispatch, id_quiz, parse_notification(data))
+
+            await asyncio.to_thread(self.zh.DataWatch, f"/quiz/{id_quiz}", watch)
+
+        return queue
+
+    def unsubscribe(self, id_quiz, participant_id):
+        self.subscribers.get(id_quiz, {}).pop(participant_id, None)
+
+    def dispatch(self, id_quiz, notification):
+        """
+        Entrega uma notificação de um quiz a todos os participantes inscritos.
+
+        Args:
+        - id_quiz (int): identificador do quiz
+        - notification (tuple): (tipo - "next" ou "rel" -, conteúdo ou None)
+        """
+        for queue in self.subscribers.get(id_quiz, {}).values():
+            queue.put_nowait(notification)
+
+class AsyncKukoStub:
+    """
+    Stub assíncrono de um participante. Tem os mesmos métodos que KukoStub, mas cada método devolve
+    (código HTTP, resposta) em vez de a imprimir.
+    """
+
+    def __init__(self, client, client_id):
+        """
+        Args:
+        - client (AsyncKukoClient): recursos partilhados
+        - client_id (int): identificador do participante
+        """
+        self.client = client
+        self.client_id = client_id
+        self.notifications = {}  # id_quiz -> fila de notificações
+
+    async def post_question(self, question, answers, right_answer, client_id):
+        params = {"question": question, "answers": answers, "right_answer": right_answer, "client_id": client_id}
+        return await self.client.request("POST", "/question", json=params)
+
+    async def import_questions(self, path, client_id):
+        async def chunks():
+            # Ficheiro enviado em streaming, sem o ler todo para memória
+            with open(path, "rb") as questions_file:
+                while chunk := await asyncio.to_thread(questions_file.read, 65536):
+                    yield chunk
+
+        return await self.client.request("POST", f"/question/bulk?client_id={client_id}", content=chunks(),
+                                         headers={"Content-Type": "application/x-ndjson"})
+
+    async def qset(self, questions, client_id):
+        return await self.client.request("POST", "/qset", json={"questions": questions, "client_id": client_id})
+
+    async def quiz(self, qset_id, scores, client_id):
+        return await self.client.request("POST", "/quiz", json={"qset_id": qset_id, "scores": scores, "client_id": client_id})
+
+    async def launch(self, quiz_id, client_id):
+        return await self.client.request("POST", f"/launch/{quiz_id}", json={"client_id": client_id})
+
+    async def next(self, quiz_id, client_id):
+        return await self.client.request("POST", f"/next/{quiz_id}", json={"client_id": client_id})
+
+    async def reg(self, quiz_id, client_id):
+        """
+        Regista participante no quiz e, se o registo for aceite, inscreve-o nas notificações do quiz.
+        """
+        status, response = await self.client.request("POST", f"/reg/{quiz_id}", json={"client_id": client_id})
+        if status == 200:
+            self.notifications[int(quiz_id)] = await self.client.subscribe(int(quiz_id), client_id)
+        return status, response
+
+    async def get(self, quiz_id, client_id):
+        return await self.client.request("GET", f"/get/{quiz_id}?client_id={client_id}")
+
+    async def ans(self, quiz_id, answer_given, client_id):
+        return await self.client.request("POST", f"/ans/{quiz_id}", json={"answer_given": answer_given, "client_id": client_id})
+
+    async def ans_batch(self, quiz_id, answers, client_id):
+        params = {
+            "answers": [{"client_id": participant, "answer_given": answer} for participant, answer in answers],
+            "client_id": client_id
+        }
+        return await self.client.request("POST", f"/ans/{quiz_id}/batch", json=params)
+
+    async def rel(self, quiz_id, client_id):
+        return await self.client.request("GET", f"/rel/{quiz_id}?client_id={client_id}")
+
+    async def score(self, quiz_id, client_id):
+        return await self.client.request("GET", f"/score/{quiz_id}?client_id={client_id}")
+
+    async def get_question(self, question_id, client_id):
+        return await self.client.request("GET", f"/question/{question_id}?client_id={client_id}")
+
+    async def get_quiz_status(self, quiz_id, client_id):
+        return await self.client.request("GET", f"/quiz/{quiz_id}?client_id={client_id}")
+
+    async def listen(self, quiz_id, on_question=None):
+        """
+        Trata as notificações de um quiz em que o participante está registado, tal como KukoStub.handle_notif:
+        em "next" recebe a pergunta atual (e chama on_question), em "rel" recebe as pontuações e termina.
+        A pergunta e as pontuações vêm na própria notificação; só se não vierem são pedidas ao servidor (/get ou /rel).
+
+        Args:
+        - quiz_id (int): identificador do quiz
+        - on_question (function): corrotina chamada com (stub, pergunta) a cada nova pergunta (ex: para responder).
+        A pergunta é um dict com question_i, question e answers, ou None se não foi possível obtê-la
+
+        Returns:
+        - dict: pontuações finais ({participante: pontuação}), ou a resposta de /rel se não vierem na notificação
+        """
+        quiz_id = int(quiz_id)
+        queue = self.notifications[quiz_id]
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "next":
+                    if payload is None:
+                        status, response = await self.get(quiz_id, self.client_id)
+                        payload = response.get("data") if status == 200 and response else None
+                    if on_question is not None:
+                        await on_question(self, payload)
+                elif kind == "rel":
+                    if payload is not None:
+                        return payload["scores"]
+                    return await self.rel(quiz_id, self.client_id)
+        finally:
+            self.client.unsubscribe(quiz_id, self.client_id)
+            self.notifications.pop(quiz_id, None)
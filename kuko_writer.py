@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+
+from kuko_logging import log
+
+class WriterUnavailableError(RuntimeError):
+    """
+    A escrita não foi feita pelo writer: está parado (ou a sua thread terminou com um erro), ou não respondeu a tempo.
+    """
+
+class GroupCommitWriter:
+    """
+    Escritas na base de dados feitas por uma única thread, dona da conexão de escrita, em vez de cada pedido fazer o seu commit.
+
+    Os pedidos colocam a escrita (uma função, ex: Kuko.answer_question) numa fila e esperam. A thread executa as escritas
+    pela ordem em que chegam, juntando-as numa única transação (group commit) até max_batch escritas ou max_delay
+    segundos desde a primeira, e faz um só commit (e um só fsync) para todo o grupo. Cada pedido só recebe o resultado
+    depois de o commit do seu grupo terminar.
+
+    Cada escrita corre dentro de um SAVEPOINT: se lançar uma exceção, só as suas alterações são revertidas, e a exceção é
+    devolvida ao pedido respetivo. Se o commit falhar, todas as escritas do grupo recebem a exceção.
+
+    Os pedidos esperam no máximo timeout segundos (WriterUnavailableError). Se a thread terminar com um erro (ex: não
+    conseguiu abrir a conexão), as escritas na fila e as seguintes falham com WriterUnavailableError.
+    """
+
+    def __init__(self, connect, max_batch=64, max_delay=0.001, max_pending=10000, timeout=10.0, name="kuko-writer", batch_size=None, commit_latency=None):
+        """
+        Args:
+        - connect (function): devolve um context manager com a conexão de escrita, usado pela thread enquanto estiver ativa
+        - max_batch (int): nº máximo de escritas por commit
+        - max_delay (float): tempo máximo, em segundos, que um grupo fica aberto à espera de mais escritas (0: só junta as que já estão na fila)
+        - max_pending (int): nº máximo de escritas na fila; acima disso, os pedidos esperam por espaço
+        - timeout (float): tempo máximo, em segundos, que um pedido espera pelo resultado da sua escrita (incluindo espaço na fila)
+        - name (str): nome da thread
+        - batch_size (Histogram): métrica onde é registado o nº de escritas de cada commit
+        - commit_latency (Histogram): métrica onde é registada a duração de cada commit
+        """
+        self.connect = connect
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.name = name
+        self.batch_size = batch_size
+        self.commit_latency = commit_latency
+
+        self._queue = deque()  # (future, function, args)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._error = None  # erro com que a thread terminou
+        self._group = []  # futures das escritas da transação em curso
+        self._thread = None
+
+        self.committed = 0
+        self.commits = 0
+        self.failures = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Executa as escritas que ainda estão na fila (até timeout segundos) e termina a thread.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, function, *args):
+        """
+        Executa function(*args) na thread de escrita e devolve o seu resultado, depois de as alterações feitas estarem commited.
+        Exceções lançadas pela função (ou pelo commit) são relançadas aqui; WriterUnavailableError se o writer estiver parado
+        ou a escrita não terminar em timeout segundos.
+        """
+        future = Future()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while len(self._queue) >= self.max_pending and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WriterUnavailableError(f"Database writer {self.name} queue is full")
+                self._cond.wait(remaining)
+            if self._stopped:
+                raise WriterUnavailableError(f"Database writer {self.name} is stopped") from self._error
+            self._queue.append((future, function, args))
+            self._cond.notify_all()
+
+        try:
+            return future.result(max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            if future.cancel():
+                # Ainda na fila: o writer descarta-a, e nada é escrito
+                raise WriterUnavailableError(f"Database writer {self.name} didn't run the write in {self.timeout}s") from None
+            # Já a ser executada: pode vir a ser commited
+            raise WriterUnavailableError(f"Database writer {self.name} didn't commit the write in {self.timeout}s") from None
+
+    def pending(self):
+        """
+        Devolve o nº de escritas na fila.
+        """
+        with self._cond:
+            return len(self._queue)
+
+    def _next(self, deadline):
+        """
+        Devolve a próxima escrita da fila, esperando no máximo até deadline (None se não chegar nenhuma).
+        """
+        with self._cond:
+            while not self._queue and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if not self._queue:
+                return None
+            item = self._queue.popleft()
+            self._cond.notify_all()  # há espaço na fila
+            return item
+
+    def _apply(self, connection, future, function, args):
+        if not future.set_running_or_notify_cancel():
+            return None  # o pedido já desistiu (ver submit)
+        self._group.append(future)
+        connection.execute("SAVEPOINT kuko_write")
+        try:
+            result = function(*args)
+        except BaseException as e:
+            connection.execute("ROLLBACK TO kuko_write")
+            connection.execute("RELEASE kuko_write")
+            # Nada desta escrita fica na base de dados: o pedido pode ser respondido já
+            self._group.remove(future)
+            future.set_exception(e)
+            return None
+        connection.execute("RELEASE kuko_write")
+        return (future, result)
+
+    def _run(self):
+        try:
+            self._process()
+        except BaseException as e:
+            self.failures += 1
+            log.error("Database writer %s stopped: %s", self.name, e)
+            error = WriterUnavailableError(f"Database writer {self.name} stopped: {e}")
+            error.__cause__ = e
+            with self._cond:
+                self._stopped = True
+                self._error = e
+                queued, self._queue = self._queue, deque()
+                self._cond.notify_all()
+            # Escritas da transação que não chegou ao commit, e as que estavam na fila
+            for future in self._group + [item[0] for item in queued]:
+                if not future.done() and (future.running() or future.set_running_or_notify_cancel()):
+                    future.set_exception(error)
+            self._group = []
+
+    def _process(self):
+        with self.connect() as connection:
+            while True:
+                with self._cond:
+                    while not self._queue and not self._stopped:
+                        self._cond.wait()
+                    if not self._queue:
+                        return
+
+                group = []
+                try:
+                    connection.execute("BEGIN IMMEDIATE")
+                except Exception as e:
+                    # Ex: base de dados bloqueada por outro processo para além do timeout; falha a escrita mais antiga
+                    self.failures += 1
+                    log.warning("Couldn't start write transaction: %s", e)
+                    item = self._next(time.monotonic())
+                    if item is not None and item[0].set_running_or_notify_cancel():
+                        item[0].set_exception(e)
+                    continue
+
+                self._group = []
+                deadline = time.monotonic() + self.max_delay
+                while len(group) < self.max_batch:
+                    item = self._next(deadline)
+                    if item is None:
+                        break
+                    done = self._apply(connection, *item)
+                    if done is not None:
+                        group.append(done)
+
+                start = time.perf_counter()
+                try:
+                    connection.commit()
+                except Exception as e:
+                    self.failures += 1
+                    log.warning("Group commit of %d write(s) failed: %s", len(group), e)
+                    connection.rollback()
+                    self._group = []
+                    for future, _ in group:
+                        future.set_exception(e)
+                    continue
+
+                if self.commit_latency is not None:
+                    self.commit_latency.observe(time.perf_counter() - start)
+                if self.batch_size is not None:
+                    self.batch_size.observe(len(group))
+                self.commits += 1
+                self.committed += len(group)
+                self._group = []
+                for future, result in group:
+                    future.set_result(result)
@@ -1,35 +1,68 @@
+DROP TABLE IF EXISTS quiz_score;
 DROP TABLE IF EXISTS results;
+DROP TABLE IF EXISTS quiz_participant;
+DROP TABLE IF EXISTS quiz_points;
 DROP TABLE IF EXISTS quiz;
+DROP TABLE IF EXISTS qset_question;
 DROP TABLE IF EXISTS qset;
+DROP TABLE IF EXISTS question_answer;
 DROP TABLE IF EXISTS question;
 
 CREATE TABLE question (
     id_question INTEGER,
     question TEXT NOT NULL,
-    answers TEXT NOT NULL,
     k INT NOT NULL,
 
     CONSTRAINT pk_question
     PRIMARY KEY (id_question)
 );
 
+-- Respostas possíveis de cada questão. position começa em 1, tal como k
+CREATE TABLE question_answer (
+    id_question INTEGER,
+    position INT,
+    answer TEXT NOT NULL,
+
+    CONSTRAINT pk_question_answer
+    PRIMARY KEY (id_question, position),
+
+    CONSTRAINT fk_question_answer_question
+    FOREIGN KEY (id_question) REFERENCES question(id_question) ON DELETE CASCADE
+) WITHOUT ROWID;
+
 CREATE TABLE qset (
     id_qset INTEGER,
-    questions TEXT NOT NULL,
 
     CONSTRAINT pk_qset
     PRIMARY KEY (id_qset)
 );
 
+-- Questões de cada qset. position começa em 0, tal como quiz.question_i
+CREATE TABLE qset_question (
+    id_qset INTEGER,
+    position INT,
+    id_question INTEGER NOT NULL,
+
+    CONSTRAINT pk_qset_question
+    PRIMARY KEY (id_qset, position),
+
+    CONSTRAINT fk_qset_question_qset
+    FOREIGN KEY (id_qset) REFERENCES qset(id_qset) ON DELETE CASCADE,
+
+    CONSTRAINT fk_qset_question_question
+    FOREIGN KEY (id_question) REFERENCES question(id_question)
+) WITHOUT ROWID;
+
+CREATE INDEX idx_qset_question_question ON qset_question (id_question);
+
 CREATE TABLE quiz (
     id_quiz INTEGER,
     id_qset INTEGER,
-    state VARCHAR(50) DEFAULT 'PREPARED', -- PREPARED, ONGOING, ENDED 
-    points TEXT,
+    state VARCHAR(50) DEFAULT 'PREPARED', -- PREPARED, ONGOING, ENDED
     timestamp_p DATETIME,
     timestamp_e DATETIME,
     question_i INT DEFAULT 0,
-    participants TEXT,
+    version INT NOT NULL DEFAULT 0, -- incrementada a cada alteração do quiz (ver Kuko.go_to_next_question)
 
     CONSTRAINT pk_quiz
     PRIMARY KEY (id_quiz),
@@ -38,6 +71,31 @@ CREATE TABLE quiz (
     FOREIGN KEY (id_qset) REFERENCES qset(id_qset) ON DELETE CASCADE
 );
 
+-- Pontuação de cada questão do quiz. position começa em 0, tal como quiz.question_i
+CREATE TABLE quiz_points (
+    id_quiz INTEGER,
+    position INT,
+    points INT NOT NULL,
+
+    CONSTRAINT pk_quiz_points
+    PRIMARY KEY (id_quiz, position),
+
+    CONSTRAINT fk_quiz_points_quiz
+    FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Participantes inscritos em cada quiz. O rowid guarda a ordem de inscrição
+CREATE TABLE quiz_participant (
+    id_quiz INTEGER,
+    participant INT,
+
+    CONSTRAINT pk_quiz_participant
+    PRIMARY KEY (id_quiz, participant),
+
+    CONSTRAINT fk_quiz_participant_quiz
+    FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
+);
+
 CREATE TABLE results (
     id_quiz INTEGER,
     question_i INT,
@@ -51,23 +109,62 @@ CREATE TABLE results (
     FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
 );
 
-INSERT INTO question (question, answers, k) 
+-- Pontuação de cada participante, atualizada sempre que é registada uma resposta.
+-- first_question_i guarda a primeira pergunta respondida, para ordenar o relatório
+CREATE TABLE quiz_score (
+    id_quiz INTEGER,
+    participant INT,
+    score INT NOT NULL DEFAULT 0,
+    first_question_i INT NOT NULL,
+
+    CONSTRAINT pk_quiz_score
+    PRIMARY KEY (id_quiz, participant),
+
+    CONSTRAINT fk_quiz_score_quiz
+    FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
+);
+
+INSERT INTO question (question, k)
 VALUES
-('What is the capital of France?', 'Paris;Berlin;London;Madrid', 1),
-('Who wrote "Romeo and Juliet"', 'William Shakespeare;Jane Austen;Virgina Woolf;Lord Byron', 1),
-('What is the chemical symbol for silver', 'Au;Ag;Fe;Cu', 1),
-('What is the capital of Italy?', 'Rome;Berlin;Paris;Madrid', 1),
-('What is the chemical symbol for tin', 'Ti;Zr;Sn;At', 3),
-('Cleopatra was romantically linked to what historical figure?', 'Alexander the Great;Julius Caesar;King Tut;Genghis Khan', 4),
-('King Henry VIII established the Church of England in order to marry what woman?', 'Catherine of Aragon;Jane Seymour;Katherine Parr;Anne Boleyn', 4),
-('After their spouse died in 1861, what monarch wore black every day for 40 years?', 'Queen Victoria;Marie Antoinette;Catherine the Great;Queen Elizabeth I', 4),
-('Which of these is known as the “love hormone” and “cuddle chemical?', 'oxytocin;cortisol;dopamine;adrenaline', 4),
-('Roughly three percent of mammals are monogamous. Which of these mammals mate for life?', 'African elephants;silverback gorillas;prairie voles;fruit bats', 3);
-
-INSERT INTO qset (questions)
+('What is the capital of France?', 1),
+('Who wrote "Romeo and Juliet"', 1),
+('What is the chemical symbol for silver', 1),
+('What is the capital of Italy?', 1),
+('What is the chemical symbol for tin', 3),
+('Cleopatra was romantically linked to what historical figure?', 4),
+('King Henry VIII established the Church of England in order to marry what woman?', 4),
+('After their spouse died in 1861, what monarch wore black every day for 40 years?', 4),
+('Which of these is known as the “love hormone” and “cuddle chemical?', 4),
+('Roughly three percent of mammals are monogamous. Which of these mammals mate for life?', 3);
+
+INSERT INTO question_answer (id_question, position, answer)
 VALUES
-('1;2;3;4');
+(1, 1, 'Paris'), (1, 2, 'Berlin'), (1, 3, 'London'), (1, 4, 'Madrid'),
+(2, 1, 'William Shakespeare'), (2, 2, 'Jane Austen'), (2, 3, 'Virgina Woolf'), (2, 4, 'Lord Byron'),
+(3, 1, 'Au'), (3, 2, 'Ag'), (3, 3, 'Fe'), (3, 4, 'Cu'),
+(4, 1, 'Rome'), (4, 2, 'Berlin'), (4, 3, 'Paris'), (4, 4, 'Madrid'),
+(5, 1, 'Ti'), (5, 2, 'Zr'), (5, 3, 'Sn'), (5, 4, 'At'),
+(6, 1, 'Alexander the Great'), (6, 2, 'Julius Caesar'), (6, 3, 'King Tut'), (6, 4, 'Genghis Khan'),
+(7, 1, 'Catherine of Aragon'), (7, 2, 'Jane Seymour'), (7, 3, 'Katherine Parr'), (7, 4, 'Anne Boleyn'),
+(8, 1, 'Queen Victoria'), (8, 2, 'Marie Antoinette'), (8, 3, 'Catherine the Great'), (8, 4, 'Queen Elizabeth I'),
+(9, 1, 'oxytocin'), (9, 2, 'cortisol'), (9, 3, 'dopamine'), (9, 4, 'adrenaline'),
+(10, 1, 'African elephants'), (10, 2, 'silverback gorillas'), (10, 3, 'prairie voles'), (10, 4, 'fruit bats');
 
-INSERT INTO quiz (id_qset, points, timestamp_p)
+INSERT INTO qset (id_qset)
 VALUES
-(1, '5;5;5;5', 1714385134);
\ No newline at end of file
+(1);
+
+INSERT INTO qset_question (id_qset, position, id_question)
+VALUES
+(1, 0, 1), (1, 1, 2), (1, 2, 3), (1, 3, 4);
+
+INSERT INTO quiz (id_qset, timestamp_p)
+VALUES
+(1, 1714385134);
+
+INSERT INTO quiz_points (id_quiz, position, points)
+VALUES
+(1, 0, 5), (1, 1, 5), (1, 2, 5), (1, 3, 5);
+
+-- Versão do esquema, usada por setup_db.migrate_db
+PRAGMA user_version = 4;
@@ -1,25 +1,359 @@
 import sqlite3
-from os.path import isfile
+import threading
+from os.path import isfile, splitext
 
-def connect_db(dbname):
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Versão atual do esquema (PRAGMA user_version). Bases de dados antigas, sem versão, têm user_version = 0
+SCHEMA_VERSION = 4
+
+def init_db(dbname, schema_file="schema.sql"):
     """
-    Estabelece conexão com base de dados, dado nome da mesma.
+    Prepara a base de dados, dado nome da mesma. Deve ser chamada uma única vez, no arranque da aplicação.
     Se base de dados não existir, é executado um ficheiro sql para a criação e inserção de dados na mesma.
+    Se existir, mas com uma versão antiga do esquema, são aplicadas as migrações em falta.
+    Ativa também o modo WAL, que fica guardado no próprio ficheiro da base de dados.
 
     Args:
     - dbname (str): nome da base de dados.
+    - schema_file (str): ficheiro sql com o esquema da base de dados.
+
+    Returns:
+    - bool: True se a base de dados foi criada (e não apenas aberta ou migrada)
+    """
+    db_is_created = isfile(dbname)  # Existe ficheiro da base de dados?
+    connection = sqlite3.connect(dbname)
+    try:
+        if not db_is_created:
+            with open(schema_file, "r") as sql_file:
+                sql_script = sql_file.read()
+
+            connection.executescript(sql_script)
+            connection.commit()
+        else:
+            migrate_db(connection)
+
+        connection.execute("PRAGMA journal_mode = WAL")
+    finally:
+        connection.close()
+
+    return not db_is_created
+
+def migrate_db(connection):
+    """
+    Aplica à base de dados as migrações necessárias para chegar a SCHEMA_VERSION. Cada migração corre numa única transação.
+
+    Args:
+    - connection (Connection): conexão à base de dados.
+    """
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+    for target_version, migration in MIGRATIONS:
+        if version < target_version:
+            connection.execute("BEGIN")
+            try:
+                migration(connection)
+                connection.execute(f"PRAGMA user_version = {target_version}")
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            version = target_version
+
+def _split(value):
+    """
+    Devolve lista com os elementos de uma string separada por ';' (formato antigo das listas na bd).
+    """
+    return value.split(";") if value else []
+
+def _migrate_normalize_lists(connection):
+    """
+    Migração para a versão 2: as colunas com listas separadas por ';' (question.answers, qset.questions,
+    quiz.points e quiz.participants) passam a tabelas próprias, com chaves primárias e índices.
+    """
+    connection.execute("""
+        CREATE TABLE question_answer (
+            id_question INTEGER,
+            position INT,
+            answer TEXT NOT NULL,
+            CONSTRAINT pk_question_answer PRIMARY KEY (id_question, position),
+            CONSTRAINT fk_question_answer_question FOREIGN KEY (id_question) REFERENCES question(id_question) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    connection.execute("""
+        CREATE TABLE qset_question (
+            id_qset INTEGER,
+            position INT,
+            id_question INTEGER NOT NULL,
+            CONSTRAINT pk_qset_question PRIMARY KEY (id_qset, position),
+            CONSTRAINT fk_qset_question_qset FOREIGN KEY (id_qset) REFERENCES qset(id_qset) ON DELETE CASCADE,
+            CONSTRAINT fk_qset_question_question FOREIGN KEY (id_question) REFERENCES question(id_question)
+        ) WITHOUT ROWID
+    """)
+    connection.execute("CREATE INDEX idx_qset_question_question ON qset_question (id_question)")
+    connection.execute("""
+        CREATE TABLE quiz_points (
+            id_quiz INTEGER,
+            position INT,
+            points INT NOT NULL,
+            CONSTRAINT pk_quiz_points PRIMARY KEY (id_quiz, position),
+            CONSTRAINT fk_quiz_points_quiz FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    connection.execute("""
+        CREATE TABLE quiz_participant (
+            id_quiz INTEGER,
+            participant INT,
+            CONSTRAINT pk_quiz_participant PRIMARY KEY (id_quiz, participant),
+            CONSTRAINT fk_quiz_participant_quiz FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
+        )
+    """)
+
+    connection.executemany(
+        "INSERT INTO question_answer (id_question, position, answer) VALUES (?, ?, ?)",
+        (
+            (id_question, position, answer)
+            for id_question, answers in connection.execute("SELECT id_question, answers FROM question").fetchall()
+            for position, answer in enumerate(_split(answers), start=1)
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO qset_question (id_qset, position, id_question) VALUES (?, ?, ?)",
+        (
+            (id_qset, position, int(id_question))
+            for id_qset, questions in connection.execute("SELECT id_qset, questions FROM qset").fetchall()
+            for position, id_question in enumerate(_split(questions))
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO quiz_points (id_quiz, position, points) VALUES (?, ?, ?)",
+        (
+            (id_quiz, position, int(points))
+            for id_quiz, points_list in connection.execute("SELECT id_quiz, points FROM quiz").fetchall()
+            for position, points in enumerate(_split(points_list))
+        ),
+    )
+    connection.executemany(
+        "INSERT OR IGNORE INTO quiz_participant (id_quiz, participant) VALUES (?, ?)",
+        (
+            (id_quiz, int(participant))
+            for id_quiz, participants in connection.execute("SELECT id_quiz, participants FROM quiz").fetchall()
+            for participant in _split(participants)
+        ),
+    )
+
+    connection.execute("ALTER TABLE question DROP COLUMN answers")
+    connection.execute("ALTER TABLE qset DROP COLUMN questions")
+    connection.execute("ALTER TABLE quiz DROP COLUMN points")
+    connection.execute("ALTER TABLE quiz DROP COLUMN participants")
+
+def _migrate_quiz_score(connection):
+    """
+    Migração para a versão 3: tabela quiz_score, com a pontuação de cada participante, preenchida a partir de results.
+    """
+    connection.execute("""
+        CREATE TABLE quiz_score (
+            id_quiz INTEGER,
+            participant INT,
+            score INT NOT NULL DEFAULT 0,
+            first_question_i INT NOT NULL,
+            CONSTRAINT pk_quiz_score PRIMARY KEY (id_quiz, participant),
+            CONSTRAINT fk_quiz_score_quiz FOREIGN KEY (id_quiz) REFERENCES quiz(id_quiz) ON DELETE CASCADE
+        )
+    """)
+    connection.execute("""
+        INSERT INTO quiz_score (id_quiz, participant, score, first_question_i)
+        SELECT re.id_quiz, re.participant, SUM(CASE WHEN re.answer = qu.k THEN qp.points ELSE 0 END), MIN(re.question_i)
+        FROM results re
+        JOIN quiz q ON q.id_quiz = re.id_quiz
+        JOIN qset_question qq ON qq.id_qset = q.id_qset AND qq.position = re.question_i
+        JOIN question qu ON qu.id_question = qq.id_question
+        JOIN quiz_points qp ON qp.id_quiz = re.id_quiz AND qp.position = re.question_i
+        GROUP BY re.id_quiz, re.participant
+    """)
+
+def _migrate_quiz_version(connection):
+    """
+    Migração para a versão 4: coluna quiz.version, incrementada a cada alteração do quiz (controlo de concorrência otimista).
+    """
+    connection.execute("ALTER TABLE quiz ADD COLUMN version INT NOT NULL DEFAULT 0")
+
+# Migrações, por ordem: (versão resultante, função que a aplica)
+MIGRATIONS = [
+    (2, _migrate_normalize_lists),
+    (3, _migrate_quiz_score),
+    (4, _migrate_quiz_version),
+]
+
+# Tabelas com os dados de cada quiz. Com a base de dados dividida em shards, ficam no ficheiro do shard do quiz;
+# as restantes (banco de questões e qsets) ficam no ficheiro principal, partilhado por todos os shards
+QUIZ_TABLES = ("quiz", "quiz_points", "quiz_participant", "results", "quiz_score")
+
+# Nome com que o ficheiro principal é ligado (ATTACH) às conexões dos shards
+BANK_ALIAS = "bank"
+
+def shard_path(dbname, index):
+    """
+    Devolve nome do ficheiro de um shard (ex: kuko.db -> kuko.shard0.db).
+    """
+    root, ext = splitext(dbname)
+    return f"{root}.shard{index}{ext or '.db'}"
+
+def shard_index(id_quiz, shards):
+    """
+    Devolve o shard onde estão guardados os dados de um quiz.
+    """
+    return (id_quiz - 1) % shards
+
+def next_quiz_id(last_id, index, shards):
+    """
+    Devolve identificador para um novo quiz no shard index, dado o maior identificador já usado nesse shard (ou None).
+    Os identificadores de cada shard seguem a progressão index + 1, index + 1 + shards, ..., pelo que são únicos entre shards.
+    """
+    if last_id is None:
+        return index + 1
+    return last_id + shards
+
+def quiz_tables_schema(connection):
+    """
+    Devolve os comandos SQL (CREATE TABLE e CREATE INDEX) das tabelas de QUIZ_TABLES, tal como estão na base de dados dada.
+    """
+    placeholders = ", ".join("?" for _ in QUIZ_TABLES)
+    return [
+        sql for (sql,) in connection.execute(
+            f"SELECT sql FROM sqlite_master WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL ORDER BY type = 'index', rowid",
+            QUIZ_TABLES
+        )
+    ]
+
+def init_shards(dbname, shards, check=True):
+    """
+    Prepara os ficheiros dos shards, dado nome da base de dados principal (já preparada com init_db) e nº de shards.
+    Os shards em falta são criados com as tabelas de QUIZ_TABLES, copiadas do esquema da base de dados principal.
+    Deve ser chamada uma única vez, no arranque da aplicação.
+
+    Se algum quiz não estiver no seu shard (ex: quizzes criados antes de a base de dados ser dividida, ou com outro
+    nº de shards), é lançado RuntimeError: os dados devem primeiro ser redistribuídos com shard_db.py.
+
+    Args:
+    - dbname (str): nome da base de dados principal.
+    - shards (int): nº de shards.
+    - check (bool): verificar se todos os quizzes estão no seu shard.
+    """
+    source = sqlite3.connect(dbname)
+    try:
+        schema = quiz_tables_schema(source)
+        misplaced = source.execute("SELECT COUNT(*) FROM quiz").fetchone()[0]
+    finally:
+        source.close()
+
+    for index in range(shards):
+        path = shard_path(dbname, index)
+        db_is_created = isfile(path)
+        connection = sqlite3.connect(path)
+        try:
+            if not db_is_created:
+                for sql in schema:
+                    connection.execute(sql)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                connection.commit()
+            else:
+                # Shards são criados com o esquema já normalizado (versão 3 ou seguinte): só lhes faltam migrações das tabelas dos quizzes
+                migrate_db(connection)
+
+            connection.execute("PRAGMA journal_mode = WAL")
+            misplaced += connection.execute(
+                "SELECT COUNT(*) FROM quiz WHERE (id_quiz - 1) % ? != ?", (shards, index)
+            ).fetchone()[0]
+        finally:
+            connection.close()
+
+    if check and misplaced:
+        raise RuntimeError(
+            f"{misplaced} quiz(zes) are not stored in their shard; run 'python shard_db.py --db {dbname} --shards {shards}' first."
+        )
+
+def connect_db(dbname, synchronous="NORMAL", mmap_size=0, cached_statements=256, timeout=5.0, attach=None):
+    """
+    Estabelece conexão com base de dados, dado nome da mesma. Assume que a base de dados já foi preparada com init_db.
+
+    Args:
+    - dbname (str): nome da base de dados.
+    - synchronous (str): nível de PRAGMA synchronous (OFF, NORMAL, FULL ou EXTRA).
+    - mmap_size (int): nº de bytes da base de dados a mapear em memória (0 desativa).
+    - cached_statements (int): nº de statements preparados a manter em cache na conexão.
+    - timeout (float): segundos a aguardar quando a base de dados está bloqueada por outra conexão.
+    - attach (dict): outras bases de dados a ligar à conexão ({nome: ficheiro}), ex: a base de dados principal, nas conexões aos shards.
 
     Return:
     - connection (Connection): conexão à base de dados.
     """
-    db_is_created = isfile(dbname)  # Existe ficheiro da base de dados?
-    connection = sqlite3.connect("kuko.db")
-    cursor = connection.cursor()
-    if not db_is_created:
-        with open("schema.sql", "r") as sql_file:
-            sql_script = sql_file.read()
-
-        cursor.executescript(sql_script)
-        connection.commit()
+    synchronous = synchronous.upper()
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Invalid synchronous level: {synchronous}")
+
+    # check_same_thread=False: a conexão pode passar entre threads, mas só é usada por uma de cada vez (ver ConnectionPool)
+    connection = sqlite3.connect(dbname, timeout=timeout, cached_statements=cached_statements, check_same_thread=False)
+    connection.execute(f"PRAGMA synchronous = {synchronous}")
+    connection.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    for alias, path in (attach or {}).items():
+        # As tabelas que não existem no ficheiro principal da conexão são procuradas nas bases de dados ligadas
+        connection.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+        connection.execute(f"PRAGMA {alias}.mmap_size = {int(mmap_size)}")
     return connection
 
+class ConnectionPool:
+    """
+    Pool de conexões de longa duração à base de dados.
+
+    Cada worker obtém uma conexão com acquire() e devolve-a com release() no fim do pedido.
+    As conexões não são fechadas entre pedidos, pelo que mantêm a cache de páginas e de statements.
+    Funciona tanto com servidores com threads fixas como com servidores que criam uma thread por pedido.
+    """
+
+    def __init__(self, dbname, max_idle=32, **connect_options):
+        """
+        Args:
+        - dbname (str): nome da base de dados
+        - max_idle (int): nº máximo de conexões inativas mantidas no pool
+        - connect_options: argumentos passados a connect_db (synchronous, mmap_size, ...)
+        """
+        self.dbname = dbname
+        self.max_idle = max_idle
+        self.connect_options = connect_options
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Devolve uma conexão inativa do pool ou, se não existir nenhuma, abre uma nova.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        return connect_db(self.dbname, **self.connect_options)
+
+    def release(self, connection):
+        """
+        Devolve conexão ao pool. Transações por terminar são revertidas, para não passarem para o pedido seguinte.
+        """
+        if connection.in_transaction:
+            connection.rollback()
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+
+        connection.close()
+
+    def close_all(self):
+        """
+        Fecha todas as conexões inativas do pool.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection in idle:
+            connection.close()
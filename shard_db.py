@@ -0,0 +1,133 @@
+"""
+Redistribui os dados dos quizzes pelos shards (ver KUKO_DB_SHARDS) e compacta os ficheiros.
+
+Uso:
+    python shard_db.py [--db kuko.db] --shards N [--no-vacuum]
+
+Cada quiz é movido (com todas as suas linhas de quiz, quiz_points, quiz_participant, results e quiz_score)
+para o shard setup_db.shard_index(id_quiz, N): da base de dados principal, ao dividi-la pela primeira vez, ou
+de outro shard, ao mudar o nº de shards. Com --shards 1, os quizzes voltam todos para a base de dados principal.
+Shards que deixam de ser usados são apagados e os restantes são compactados (VACUUM), salvo com --no-vacuum.
+
+Deve ser executado com os servidores parados. Se for interrompido, basta executá-lo de novo.
+"""
+import argparse
+import os
+import sqlite3
+from os.path import isfile
+
+from setup_db import init_db, init_shards, shard_path, shard_index, QUIZ_TABLES
+
+def existing_shards(dbname):
+    """
+    Devolve os ficheiros dos shards existentes (shard0, shard1, ... até ao primeiro em falta).
+    """
+    paths = []
+    while isfile(shard_path(dbname, len(paths))):
+        paths.append(shard_path(dbname, len(paths)))
+    return paths
+
+def move_quizzes(source, target, quiz_ids):
+    """
+    Move as linhas dos quizzes dados de um ficheiro para outro, numa única transação.
+    Linhas já copiadas por uma execução interrompida são ignoradas (INSERT OR IGNORE), e apagadas da origem.
+    """
+    connection = sqlite3.connect(target, isolation_level=None)
+    try:
+        connection.execute("ATTACH DATABASE ? AS src", (source,))
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for table in QUIZ_TABLES:
+                connection.execute(
+                    f"INSERT OR IGNORE INTO main.{table} SELECT * FROM src.{table} WHERE id_quiz IN (SELECT value FROM json_each(?))",
+                    (quiz_ids,)
+                )
+                connection.execute(
+                    f"DELETE FROM src.{table} WHERE id_quiz IN (SELECT value FROM json_each(?))", (quiz_ids,)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.close()
+
+def remove_db_file(path):
+    for suffix in ("", "-wal", "-shm"):
+        if isfile(path + suffix):
+            os.remove(path + suffix)
+
+def reshard(dbname, shards, vacuum=True, report=print):
+    """
+    Redistribui os quizzes por shards (ver descrição do módulo).
+
+    Args:
+    - dbname (str): nome da base de dados principal.
+    - shards (int): nº de shards pretendido (1 para não dividir).
+    - vacuum (bool): compactar os ficheiros no fim.
+    - report (function): chamada com uma mensagem por cada passo.
+
+    Returns:
+    - int: nº de quizzes movidos
+    """
+    init_db(dbname)
+    old_shards = existing_shards(dbname)
+    if shards > 1:
+        init_shards(dbname, shards, check=False)
+
+    def target_of(id_quiz):
+        if shards == 1:
+            return dbname
+        return shard_path(dbname, shard_index(id_quiz, shards))
+
+    moved = 0
+    for source in [dbname] + existing_shards(dbname):
+        connection = sqlite3.connect(source)
+        try:
+            quiz_ids = [quiz[0] for quiz in connection.execute("SELECT id_quiz FROM quiz ORDER BY id_quiz")]
+        finally:
+            connection.close()
+
+        by_target = {}
+        for id_quiz in quiz_ids:
+            target = target_of(id_quiz)
+            if target != source:
+                by_target.setdefault(target, []).append(id_quiz)
+
+        for target, ids in by_target.items():
+            move_quizzes(source, target, str(ids))
+            moved += len(ids)
+            report(f"Moved {len(ids)} quiz(zes) from {source} to {target}")
+
+    # Shards para além do nº pretendido já não têm quizzes
+    for index, path in enumerate(old_shards):
+        if shards == 1 or index >= shards:
+            remove_db_file(path)
+            report(f"Removed {path}")
+
+    if vacuum:
+        for path in [dbname] + (existing_shards(dbname) if shards > 1 else []):
+            connection = sqlite3.connect(path, isolation_level=None)
+            try:
+                connection.execute("VACUUM")
+            finally:
+                connection.close()
+            report(f"Compacted {path}")
+
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="kuko.db", help="base de dados principal")
+    parser.add_argument("--shards", type=int, required=True, help="nº de shards pretendido (1 para não dividir)")
+    parser.add_argument("--no-vacuum", action="store_true", help="não compactar os ficheiros no fim")
+    args = parser.parse_args()
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+
+    moved = reshard(args.db, args.shards, vacuum=not args.no_vacuum)
+    print(f"Moved {moved} quiz(zes); {args.shards} shard(s).")
+
+if __name__ == "__main__":
+    main()
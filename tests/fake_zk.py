@@ -0,0 +1,135 @@
+"""
+Substituto em memória do cliente ZooKeeper (KazooClient), para correr a aplicação nos testes e nos benchmarks sem servidor
+ZooKeeper. Implementa apenas as operações usadas por kuko_flask e kuko_publisher, com as exceções de kazoo (NoNodeError,
+NodeExistsError, BadVersionError) e watches (DataWatch) chamados de forma síncrona.
+"""
+import inspect
+import threading
+from types import SimpleNamespace
+
+from kazoo.exceptions import BadVersionError, NoNodeError, NodeExistsError
+from kazoo.protocol.states import EventType, WatchedEvent
+
+class FakeZooKeeper:
+
+    def __init__(self):
+        self.nodes = {}  # caminho -> [dados, versão, True se for efémero]
+        self.calls = 0  # nº de operações de escrita (ensure_path, create, set, delete)
+        self._data_watches = {}  # caminho -> funções
+        self._lock = threading.RLock()
+
+    def start(self, timeout=None):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def ensure_path(self, path):
+        with self._lock:
+            self.calls += 1
+            parts = path.strip("/").split("/")
+            for i in range(1, len(parts) + 1):
+                self._create(f"/{'/'.join(parts[:i])}", b"", False, exist_ok=True)
+        return True
+
+    def create(self, path, value=b"", ephemeral=False, sequence=False, makepath=False):
+        with self._lock:
+            self.calls += 1
+            parent = path.rsplit("/", 1)[0]
+            if parent and parent not in self.nodes:
+                if not makepath:
+                    raise NoNodeError(parent)
+                self.ensure_path(parent)
+            self._create(path, value, ephemeral)
+        return path
+
+    def _create(self, path, value, ephemeral, exist_ok=False):
+        if path in self.nodes:
+            if exist_ok:
+                return
+            raise NodeExistsError(path)
+        self.nodes[path] = [value, 0, ephemeral]
+        self._fire(path, EventType.CREATED)
+
+    def set(self, path, value, version=-1):
+        with self._lock:
+            self.calls += 1
+            if path not in self.nodes:
+                raise NoNodeError(path)
+            node = self.nodes[path]
+            if version != -1 and node[1] != version:
+                raise BadVersionError(path)
+            node[0] = value
+            node[1] += 1
+            self._fire(path, EventType.CHANGED)
+        return self._stat(path)
+
+    def get(self, path, watch=None):
+        with self._lock:
+            if path not in self.nodes:
+                raise NoNodeError(path)
+            return self.nodes[path][0], self._stat(path)
+
+    def get_children(self, path, watch=None):
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            if path not in self.nodes:
+                raise NoNodeError(path)
+            return sorted({node[len(prefix):].split("/")[0] for node in self.nodes if node.startswith(prefix)})
+
+    def exists(self, path, watch=None):
+        with self._lock:
+            return self._stat(path) if path in self.nodes else None
+
+    def delete(self, path, version=-1, recursive=False):
+        with self._lock:
+            self.calls += 1
+            if path not in self.nodes:
+                raise NoNodeError(path)
+            for node in sorted((node for node in self.nodes if node == path or (recursive and node.startswith(path + "/"))), reverse=True):
+                del self.nodes[node]
+                self._fire(node, EventType.DELETED)
+
+    def DataWatch(self, path, func=None):
+        """
+        Chama func(dados, stat[, evento]) já com o valor atual, e depois a cada alteração; termina se devolver False.
+        Tal como em kazoo, pode ser usado como decorador, e o evento só é passado se func aceitar três argumentos.
+        """
+        if func is None:
+            return lambda function: self.DataWatch(path, function)
+        function = func
+        if len(inspect.signature(func).parameters) < 3:
+            function = lambda data, stat, event=None: func(data, stat)
+        with self._lock:
+            self._data_watches.setdefault(path, []).append(function)
+            data, stat = (self.nodes[path][0], self._stat(path)) if path in self.nodes else (None, None)
+        self._call_watch(self._data_watches, path, function, data, stat, None)
+        return func
+
+    def _call_watch(self, watches, path, function, *args):
+        if function(*args) is False:
+            with self._lock:
+                if function in watches.get(path, []):
+                    watches[path].remove(function)
+
+    def _fire(self, path, event_type):
+        if path in self._data_watches:
+            data, stat = (self.nodes[path][0], self._stat(path)) if path in self.nodes else (None, None)
+            event = WatchedEvent(event_type, None, path)
+            for function in list(self._data_watches[path]):
+                self._call_watch(self._data_watches, path, function, data, stat, event)
+
+    def _stat(self, path):
+        return SimpleNamespace(version=self.nodes[path][1])
+
+def install(kuko_flask):
+    """
+    Substitui o cliente ZooKeeper de kuko_flask (e o do zk_publisher) por um FakeZooKeeper, e devolve-o.
+    """
+    fake = FakeZooKeeper()
+    kuko_flask.zh = fake
+    kuko_flask.zk_publisher.client = fake
+    return fake
@@ -0,0 +1,121 @@
+"""
+Log de respostas (kuko_answer_log): respostas repetidas, fecho de perguntas e replay no arranque.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_answer_log import AnswerLog
+
+# /next com o log de respostas ativo, quando a passagem das respostas para a base de dados falha (corre num processo
+# próprio: kuko_flask lê KUKO_ANSWER_LOG ao ser importado)
+NEXT_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+statuses = []
+
+for participant in (5, 6):
+    statuses.append(client.post("/reg/1", json={"client_id": participant}).status_code)
+statuses.append(client.post("/launch/1", json={"client_id": 1}).status_code)
+statuses.append(client.post("/ans/1", json={"client_id": 5, "answer_given": 1}).status_code)
+
+def fail(answers):
+    raise OSError("disk error")
+
+apply = kuko_flask.answer_log.apply
+kuko_flask.answer_log.apply = fail
+statuses.append(client.post("/next/1", json={"client_id": 1}).status_code)
+
+# O quiz não avançou, e a pergunta voltou a aceitar respostas
+statuses.append(client.post("/ans/1", json={"client_id": 6, "answer_given": 2}).status_code)
+
+kuko_flask.answer_log.apply = apply
+statuses.append(client.post("/next/1", json={"client_id": 1}).status_code)
+question_i = client.get("/get/1?client_id=5").get_json()["data"]["question_i"]
+scores = [client.get(f"/score/1?client_id={participant}").get_json()["message"] for participant in (5, 6)]
+kuko_flask.answer_log.stop()
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps([statuses, question_i, scores]))
+"""
+
+def make_log(path, applied, current):
+    """
+    Log cujas respostas passadas para a "base de dados" ficam em applied; current tem a pergunta atual de cada quiz.
+    """
+    def load_answered(id_quiz, question_i):
+        if current.get(id_quiz) != question_i:
+            return None
+        return {participant for quiz, qi, participant, _, _ in applied if (quiz, qi) == (id_quiz, question_i)}
+
+    return AnswerLog(path, applied.extend, load_answered, flush_interval=60)
+
+def test_close_and_forget(tmp_path):
+    applied = []
+    current = {1: 0}
+    log = make_log(str(tmp_path / "answers.log"), applied, current)
+    log.start()
+
+    assert log.add(1, 0, 7, 2, 5) is True
+    assert log.add(1, 0, 7, 3, 0) is False
+
+    # Pergunta fechada antes de o quiz avançar: respostas a essa pergunta são recusadas
+    log.close(1, 0)
+    assert log.add(1, 0, 8, 2, 5) is None
+    log.flush()
+    assert applied == [(1, 0, 7, 2, 5)]
+
+    current[1] = 1
+    assert log.add_many(1, 1, [(7, 1, 0), (8, 1, 0), (7, 2, 0)]) == [True, True, False]
+
+    # Quiz terminou: o estado em memória é descartado, e respostas atrasadas são recusadas com a base de dados
+    log.close(1, 1)
+    log.flush()
+    del current[1]
+    log.forget(1)
+    assert log.add(1, 1, 9, 1, 0) is None
+    assert log.pending() == 0
+
+    log.stop()
+    assert applied == [(1, 0, 7, 2, 5), (1, 1, 7, 1, 0), (1, 1, 8, 1, 0)]
+    assert os.listdir(tmp_path) == []
+
+def test_replay(tmp_path):
+    path = str(tmp_path / "answers.log")
+    applied = []
+    log = make_log(path, applied, {1: 0})
+    log.start()
+    log.add(1, 0, 7, 2, 5)
+    log.add(1, 0, 8, 1, 0)
+
+    # Processo terminado sem passar as respostas para a base de dados (última linha incompleta)
+    log._file.write("1 0 9")
+    log._file.flush()
+    assert applied == []
+
+    replayed = []
+    make_log(path, replayed, {1: 0}).start()
+    assert replayed == [(1, 0, 7, 2, 5), (1, 0, 8, 1, 0)]
+
+def test_next_flush_failure(tmp_path):
+    env = dict(
+        os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_ANSWER_LOG=str(tmp_path / "answers.log"),
+        KUKO_ANSWER_LOG_FLUSH_MS="60000", KUKO_LOG_LEVEL="ERROR",
+    )
+    result = subprocess.run([sys.executable, "-c", NEXT_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    statuses, question_i, scores = json.loads(result.stdout.strip().splitlines()[-1])
+    assert statuses == [200, 200, 200, 200, 503, 200, 200]
+    assert question_i == 1
+    # Respostas à primeira pergunta (certa é a 1, vale 5 pontos) passadas para a base de dados pelo segundo /next
+    assert scores == ["Sucessfully retrieved participant's score.\nScore: 5", "Sucessfully retrieved participant's score.\nScore: 0"]
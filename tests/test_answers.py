@@ -0,0 +1,76 @@
+"""
+Respostas em lote (POST /ans/<id_quiz>/batch): resultado de cada resposta, pontuações e limite de respostas por pedido.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tests.test_scores import make_kuko
+
+# Corre num processo próprio: kuko_flask lê KUKO_MAX_BATCH_ANSWERS ao ser importado
+BATCH_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+for participant in (5, 6):
+    client.post("/reg/1", json={"client_id": participant})
+client.post("/launch/1", json={"client_id": 1})
+
+results = []
+for answers in ([{"client_id": 5, "answer_given": 1}, {"client_id": 6, "answer_given": 2}], [{"client_id": 5, "answer_given": 1}] * 3):
+    response = client.post("/ans/1/batch", json={"client_id": 1, "answers": answers})
+    results.append([response.status_code, response.get_json()])
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps(results))
+"""
+
+def test_answer_batch(tmp_path):
+    kd, db = make_kuko(tmp_path)
+    (id_quiz,), _ = kd.add_new_quiz(1, [1, 2, 3, 4])
+    for participant in (5, 6, 7, 8):
+        assert kd.register_participant(id_quiz, participant)[0]
+    assert kd.launch_quiz(id_quiz)
+    assert kd.answer_question(id_quiz, 1, 8) == (True, "Correct")
+    db.commit()  # cada pedido faz o seu commit; o lote começa a sua transação
+
+    success, results = kd.answer_questions_batch(id_quiz, [
+        {"client_id": 5, "answer_given": 1},
+        {"client_id": 6, "answer_given": 2},
+        {"client_id": 5, "answer_given": 2},  # repetida no mesmo lote
+        {"client_id": 8, "answer_given": 1},  # já respondida antes
+        {"client_id": 9, "answer_given": 1},  # não inscrito
+        {"client_id": 7, "answer_given": 5},  # fora das respostas possíveis
+        {"client_id": "x", "answer_given": 1},
+    ])
+    assert success is True
+    assert [item["result"] for item in results] == [
+        "Correct", "Incorrect", "Duplicate", "Duplicate", "Participant is not registered in quiz.",
+        "Invalid answer (answer must be number between 1 and 4).", "Answer given and client id must be integers.",
+    ]
+    assert db.execute("SELECT participant, answer FROM results WHERE id_quiz = ? ORDER BY 1", (id_quiz,)).fetchall() == [
+        (5, 1), (6, 2), (8, 1)
+    ]
+    assert kd.check_quiz_scores(id_quiz) == []
+    assert kd.get_participant_score(id_quiz, 5) == (True, 1)
+
+    assert kd.answer_questions_batch(9999, [{"client_id": 5, "answer_given": 1}]) == (False, "Quiz doesn't exist in the database.")
+
+def test_answer_batch_route(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_MAX_BATCH_ANSWERS="2", KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", BATCH_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    (status, body), (too_many_status, too_many) = json.loads(result.stdout.strip().splitlines()[-1])
+    assert status == 200
+    assert body["message"].endswith("Answers registered: 2")
+    assert [item["result"] for item in body["data"]] == ["Correct", "Incorrect"]
+    assert too_many_status == 400 and too_many["detail"].endswith("Maximum: 2")
@@ -0,0 +1,84 @@
+"""
+Modo de execução assíncrono (kuko_asgi): pedidos executados pela app Flask, /stream no event loop e limite de pedidos
+em curso.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pedidos ASGI feitos diretamente à aplicação (corre num processo próprio: kuko_flask lê a configuração ao ser importado)
+ASGI_SCRIPT = """
+import asyncio
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+from kuko_asgi import KukoAsgi, app
+
+async def request(app, method, path, body=None, disconnect_after=None):
+    path, _, query_string = path.partition("?")
+    data = json.dumps(body).encode() if body else b""
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())] if body else []
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http", "path": path, "root_path": "",
+        "raw_path": path.encode(), "query_string": query_string.encode(), "server": ("localhost", 5000),
+        "client": ("127.0.0.1", 1234), "headers": headers,
+    }
+    messages = [{"type": "http.request", "body": data, "more_body": False}]
+    received = asyncio.Event()
+    status, chunks = [], []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await received.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message.get("body"):
+            chunks.append(message["body"])
+            # O cliente desliga-se depois de receber disconnect_after blocos (ex: de um stream)
+            if disconnect_after is not None and len(chunks) >= disconnect_after:
+                received.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 10)
+    return status[0], b"".join(chunks)
+
+async def main():
+    results = []
+    status, body = await request(app, "POST", "/reg/1", {"client_id": 5})
+    results.append([status, json.loads(body)["httpStatus"]])
+    status, body = await request(app, "POST", "/launch/1", {"client_id": 1})
+    results.append([status])
+    status, body = await request(app, "GET", "/get/1?client_id=5")
+    results.append([status, json.loads(body)["data"]["question_i"]])
+
+    # /stream: a primeira notificação é enviada logo, e o pedido termina quando o cliente se desliga
+    status, body = await request(app, "GET", "/stream/1?client_id=5", disconnect_after=1)
+    results.append([status, body.decode().startswith("event:") or body.decode().startswith("data:")])
+    status, body = await request(app, "GET", "/stream/1?client_id=9")
+    results.append([status])
+
+    status, body = await request(KukoAsgi(kuko_flask.app, max_pending=0), "GET", "/get/1?client_id=5")
+    results.append([status, json.loads(body)["httpStatus"]])
+    print(json.dumps(results))
+
+asyncio.run(main())
+kuko_flask.zk_publisher.stop(0)
+"""
+
+def test_asgi_requests(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", ASGI_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    results = json.loads(result.stdout.strip().splitlines()[-1])
+    assert results == [[200, 200], [200], [200, 0], [200, True], [400], [503, 503]]
@@ -0,0 +1,89 @@
+"""
+Pedidos condicionais (If-None-Match) a /question, /get e /quiz: respostas 304 enquanto o recurso não muda, sem
+consultar a base de dados, e nova ETag quando o quiz avança.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_cache import ValidatorCache
+
+# Corre num processo próprio, com a sua base de dados; conta as queries feitas pelo Kuko em cada pedido condicional
+ETAG_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+queries = []
+query_db = kuko_flask.kd.query_db
+kuko_flask.kd.query_db = lambda query, *args, **kwargs: queries.append(query) or query_db(query, *args, **kwargs)
+
+def conditional(path, etag):
+    del queries[:]
+    response = client.get(path, headers={"If-None-Match": etag})
+    return [response.status_code, response.headers.get("ETag"), len(queries), len(response.get_data())]
+
+question = client.get("/question/1")
+missing = client.get("/question/999")
+results = {
+    "question": [question.headers["ETag"], question.headers["Cache-Control"]],
+    "question_304": conditional("/question/1", question.headers["ETag"]),
+    "question_weak": conditional("/question/1", "W/" + question.headers["ETag"]),
+    "question_other": conditional("/question/2", question.headers["ETag"]),
+    "missing": [missing.status_code, missing.headers.get("ETag")],
+}
+
+client.post("/reg/1", json={"client_id": 5})
+client.post("/launch/1", json={"client_id": 1})
+get = client.get("/get/1?client_id=5").headers["ETag"]
+status = client.get("/quiz/1").headers["ETag"]
+results["before_next"] = [conditional("/get/1?client_id=5", get), conditional("/quiz/1", status), conditional("/quiz/1", "*")]
+
+client.post("/next/1", json={"client_id": 1})
+results["after_next"] = [conditional("/get/1?client_id=5", get), conditional("/quiz/1", status)]
+kuko_flask.zk_publisher.stop()
+print(json.dumps(results))
+"""
+
+def test_validator_cache():
+    cache = ValidatorCache(max_entries=2)
+    cache.add(1)
+    cache.add(2)
+    cache.add(1)
+    assert 1 in cache and 2 in cache
+    # Cheio: a chave mais antiga é descartada
+    cache.add(3)
+    assert 1 not in cache and 2 in cache and 3 in cache
+
+def test_conditional_requests(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", ETAG_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    results = json.loads(result.stdout.strip().splitlines()[-1])
+
+    etag = '"question-1-v1"'
+    assert results["question"] == [etag, "no-cache"]
+    # Questão já servida: 304, sem corpo e sem consultar a base de dados (também com a ETag fraca)
+    assert results["question_304"] == [304, etag, 0, 0]
+    assert results["question_weak"] == [304, etag, 0, 0]
+    # Questão ainda não servida por este processo: lida da base de dados
+    other = results["question_other"]
+    assert other[:2] == [200, '"question-2-v1"'] and other[2] > 0
+    assert results["missing"] == [404, None]
+
+    get, status, any_version = results["before_next"]
+    assert get == status == [304, '"quiz-1-ONGOING-0-v1"', 0, 0]
+    assert any_version[:2] == [304, '"quiz-1-ONGOING-0-v1"']
+
+    # O quiz avançou: a versão que o cliente tem deixou de ser a atual
+    get, status = results["after_next"]
+    assert get[:2] == [200, '"quiz-1-ONGOING-1-v1"'] and get[3] > 0
+    assert status[:2] == [200, '"quiz-1-ONGOING-1-v1"'] and status[3] > 0
@@ -0,0 +1,92 @@
+"""
+Notificações por server-sent events (kuko_events e GET /stream): formato dos eventos, entrega aos subscritores de cada
+quiz, e a rota /stream no modo WSGI.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_events import EventBus, format_sse
+
+# /stream do quiz 1, lido enquanto o quiz avança (corre num processo próprio, com a sua base de dados)
+STREAM_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+client.post("/reg/1", json={"client_id": 5})
+client.post("/launch/1", json={"client_id": 1})
+
+errors = [client.get(path).status_code for path in ("/stream/1?client_id=9", "/stream/1?client_id=x", "/stream/999?client_id=5")]
+response = client.get("/stream/1?client_id=5", buffered=False)
+chunks = response.iter_encoded()
+events = [next(chunks).decode()]
+for _ in range(4):
+    client.post("/next/1", json={"client_id": 1})
+    events.append(next(chunks).decode())
+ended = next(chunks, None) is None
+response.close()
+kuko_flask.zk_publisher.stop()
+print(json.dumps([errors, response.status_code, response.mimetype, events, ended, kuko_flask.event_bus.count()]))
+"""
+
+def test_format_sse():
+    payload = {"v": 1, "type": "rel", "quiz": 1, "scores": {"5": 10}}
+    assert format_sse(payload) == b'event: end\ndata: {"v":1,"type":"rel","quiz":1,"scores":{"5":10}}\n\n'
+    assert format_sse({"type": "next"}).startswith(b"event: next\n")
+
+def test_event_bus():
+    bus = EventBus(max_pending=2)
+    first, second, other = bus.subscribe(1), bus.subscribe(1), bus.subscribe(2)
+    assert bus.count() == 3
+
+    for event in ("a", "b", "c"):
+        bus.publish(1, event)
+    # Subscritor lento: as notificações mais antigas são descartadas
+    assert [first.get(0), first.get(0), first.get(0)] == ["b", "c", None]
+    assert second.get(0) == "b"
+    assert other.get(0) is None
+
+    bus.unsubscribe(first)
+    bus.unsubscribe(first)
+    bus.publish(1, "d")
+    assert first.get(0) is None
+    assert bus.count() == 2
+
+def test_event_bus_async():
+    async def main():
+        bus = EventBus(max_pending=2)
+        subscription = bus.subscribe(1, asyncio.get_running_loop())
+        # Publicado noutra thread (como num pedido), entregue no event loop
+        await asyncio.to_thread(lambda: [bus.publish(1, event) for event in ("a", "b", "c")])
+        await asyncio.sleep(0)
+        return [subscription.queue.get_nowait(), subscription.queue.get_nowait(), subscription.queue.empty()]
+
+    assert asyncio.run(main()) == ["b", "c", True]
+
+def test_stream_route(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", STREAM_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    errors, status, mimetype, events, ended, subscribers = json.loads(result.stdout.strip().splitlines()[-1])
+    assert errors == [400, 400, 404]
+    assert (status, mimetype) == (200, "text/event-stream")
+
+    # A pergunta atual é enviada logo após a ligação; o stream termina com as pontuações
+    names = [event.split("\n", 1)[0] for event in events]
+    assert names == ["event: next"] * 4 + ["event: end"]
+    payloads = [json.loads(event.split("\ndata: ", 1)[1]) for event in events]
+    assert [payload.get("question_i") for payload in payloads] == [0, 1, 2, 3, None]
+    assert payloads[-1]["scores"] == {}
+    assert ended
+    assert subscribers == 0
@@ -0,0 +1,47 @@
+"""
+Importação de um banco de questões (POST /question/bulk): validação de cada linha.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Corre num processo próprio: kuko_flask prepara a base de dados (KUKO_DB) ao ser importado
+IMPORT_SCRIPT = """
+import json, sys
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+kuko_flask.IMPORT_CHUNK_SIZE = 2
+response = kuko_flask.app.test_client().post("/question/bulk?client_id=1", data=sys.stdin.read())
+print(json.dumps([response.status_code, response.get_json()]))
+kuko_flask.zk_publisher.stop(0)
+"""
+
+def test_invalid_lines(tmp_path):
+    lines = [
+        {"question": "Q1?", "answers": ["a", "b"], "right_answer": 1},
+        {"question": "Q2?", "answers": ["a", "b"], "right_answer": 2},
+        {"question": None, "answers": ["a", "b"], "right_answer": 1},
+        {"question": {"text": "Q?"}, "answers": ["a", "b"], "right_answer": 1},
+        {"question": "Q?", "answers": "abc", "right_answer": 1},
+        {"question": "Q?", "answers": ["a", 2], "right_answer": 1},
+        {"question": "Q3?", "answers": ["a", "b"], "right_answer": 1},
+    ]
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="WARNING")
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+        input="\n".join(json.dumps(line) for line in lines),
+    )
+    assert result.returncode == 0, result.stderr
+
+    status, body = json.loads(result.stdout.strip().splitlines()[-1])
+    assert status == 200
+    # As questões válidas são todas importadas (schema.sql já tem as questões 1 a 10), e as inválidas reportadas por linha
+    assert body["data"]["ids"] == [[11, 13]]
+    assert [error["line"] for error in body["data"]["errors"]] == [3, 4, 5, 6]
@@ -0,0 +1,31 @@
+"""
+Teste de carga de ponta a ponta (benchmarks.load_e2e), numa execução pequena: todos os pedidos do ciclo de vida dos
+quizzes têm sucesso e os resultados são escritos em JSON.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_small_run(tmp_path):
+    output = str(tmp_path / "results.json")
+    args = ["--quizzes", "2", "--participants", "5", "--questions", "2", "--threads", "2", "--output", output]
+    env = dict(os.environ, KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_e2e"] + args, cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+
+    with open(output) as f:
+        results = json.load(f)
+    assert results["parameters"] == {"participants": 5, "questions": 2, "quizzes": 2, "threads": 2, "seed": 0}
+    requests = {route: stats["requests"] for route, stats in results["routes"].items()}
+    # Por quiz: /quiz, 5 x /reg, /launch, 2 x (5 x /get, 5 x /ans, /next), /rel
+    assert requests == {"quiz": 2, "reg": 10, "launch": 2, "get": 20, "ans": 20, "next": 4, "rel": 2}
+    assert all(stats["errors"] == 0 for stats in results["routes"].values())
+    assert results["db_size_bytes"] > 0
@@ -0,0 +1,70 @@
+"""
+Registos da aplicação (kuko_logging): escrita por uma thread em segundo plano, formato JSON, registos descartados com
+a fila cheia e amostragem por rota.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import io
+import json
+import logging
+import os
+import queue
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_logging import NonBlockingQueueHandler, RequestLogSampler, log, parse_sample_rates, setup_logging
+
+class Formatted:
+    """
+    Argumento de uma mensagem que conta quantas vezes foi formatado.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "value"
+
+def test_json_output():
+    handlers, level, propagate = log.handlers, log.level, log.propagate
+    stream = io.StringIO()
+    try:
+        setup_logging("INFO", json_output=True, stream=stream)
+        argument = Formatted()
+        log.debug("Not logged: %s", argument)
+        log.info("Request %s", argument, extra={"route": "get_quiz_status", "method": "GET", "status": 200})
+
+        # Escrito pela thread do listener, depois de log.info terminar
+        deadline = time.monotonic() + 5
+        while not stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        log.handlers, log.level, log.propagate = handlers, level, propagate
+
+    entry = json.loads(stream.getvalue())
+    assert entry["level"] == "INFO" and entry["logger"] == "kuko" and entry["message"] == "Request value"
+    assert (entry["route"], entry["method"], entry["status"]) == ("get_quiz_status", "GET", 200)
+    assert "url" not in entry
+    # O registo DEBUG não chegou a ser formatado
+    assert argument.count == 1
+
+def test_full_queue_drops_records():
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    for i in range(5):
+        handler.handle(logging.LogRecord("kuko", logging.INFO, __file__, 0, "message %s", (i,), None))
+    assert handler.dropped == 3
+    assert handler.queue.get_nowait().args == (0,)
+
+def test_sampling():
+    rates = parse_sample_rates(" get_current_question=0, answer_question = 0.5 ,*=2,")
+    assert rates == {"get_current_question": 0.0, "answer_question": 0.5, "*": 1.0}
+
+    sampler = RequestLogSampler(rates)
+    assert not any(sampler.sample("get_current_question") for _ in range(100))
+    assert all(sampler.sample("launch_quiz") for _ in range(100))
+    assert 0 < sum(sampler.sample("answer_question") for _ in range(1000)) < 1000
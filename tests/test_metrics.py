@@ -0,0 +1,86 @@
+"""
+Métricas (kuko_metrics e GET /metrics): formato de texto do Prometheus.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_metrics import MetricsRegistry, StatementLabels
+
+# Corre num processo próprio: as métricas são globais a kuko_flask
+METRICS_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+client.get("/quiz/1")
+client.get("/quiz/1")
+client.get("/quiz/999")
+response = client.get("/metrics")
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps([response.status_code, response.content_type, response.get_data(as_text=True)]))
+"""
+
+def test_render():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests handled.", ("route", "status"))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    registry.add_collector(lambda: [("entries", "gauge", "Cached entries.", 3)])
+
+    requests.inc("get", 200)
+    requests.inc("get", 200)
+    requests.inc('say "hi"\n', 404, amount=5)
+    latency.observe(0.05, "get")
+    latency.observe(0.1, "get")  # o limite de cada bucket é inclusivo
+    latency.observe(2.0, "get")
+
+    assert registry.render() == "\n".join([
+        "# HELP requests_total Requests handled.",
+        "# TYPE requests_total counter",
+        'requests_total{route="get",status="200"} 2',
+        'requests_total{route="say \\"hi\\"\\n",status="404"} 5',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="get",le="0.1"} 2',
+        'latency_seconds_bucket{route="get",le="1.0"} 2',
+        'latency_seconds_bucket{route="get",le="+Inf"} 3',
+        'latency_seconds_sum{route="get"} 2.15',
+        'latency_seconds_count{route="get"} 3',
+        "# HELP entries Cached entries.",
+        "# TYPE entries gauge",
+        "entries 3",
+    ]) + "\n"
+
+def test_statement_labels():
+    labels = StatementLabels(max_statements=1)
+    assert labels("SELECT *\n    FROM quiz\n    WHERE id_quiz = ?") == "SELECT * FROM quiz WHERE id_quiz = ?"
+    # Acima do limite de queries distintas, a label é "other"
+    assert labels("SELECT 1") == "other"
+    assert labels("SELECT *\n    FROM quiz\n    WHERE id_quiz = ?") == "SELECT * FROM quiz WHERE id_quiz = ?"
+
+def test_metrics_route(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", METRICS_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    status, content_type, body = json.loads(result.stdout.strip().splitlines()[-1])
+    assert status == 200
+    assert content_type == "text/plain; version=0.0.4; charset=utf-8"
+    lines = body.splitlines()
+    assert 'kuko_http_requests_total{route="get_quiz_status",method="GET",status="200"} 2' in lines
+    assert 'kuko_http_requests_total{route="get_quiz_status",method="GET",status="404"} 1' in lines
+    assert 'kuko_http_request_duration_seconds_count{route="get_quiz_status",method="GET",status="200"} 2' in lines
+    assert any(line.startswith('kuko_db_query_duration_seconds_count{statement="SELECT') for line in lines)
+    assert "# TYPE kuko_quiz_cache_entries gauge" in lines
+    # Cada linha de amostra é "nome{labels} valor", com um valor numérico
+    for line in lines:
+        if not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
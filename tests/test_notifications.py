@@ -0,0 +1,76 @@
+"""
+Notificações publicadas no nó ZooKeeper de cada quiz: a pergunta atual ("next") ou as pontuações finais ("rel"), e
+a leitura dessas notificações pelo stub (kuko_stub.parse_notification).
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_stub import parse_notification
+
+# Quiz 1 (4 perguntas) do início ao fim, guardando os dados publicados no nó do quiz (corre num processo próprio, com
+# a sua base de dados). O argumento é o tamanho máximo dos dados de um nó.
+QUIZ_SCRIPT = """
+import json
+import sys
+import kuko_flask
+from tests import fake_zk
+fake = fake_zk.install(kuko_flask)
+kuko_flask.ZNODE_MAX_BYTES = int(sys.argv[1])
+client = kuko_flask.app.test_client()
+published = []
+fake.DataWatch("/quiz/1", lambda data, stat, event: event and published.append(data.decode()))
+
+client.post("/reg/1", json={"client_id": 5})
+client.post("/launch/1", json={"client_id": 1})
+for _ in range(4):
+    client.post("/ans/1", json={"client_id": 5, "answer_given": 1})
+    client.post("/next/1", json={"client_id": 1})
+    kuko_flask.zk_publisher.flush(5)
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps(published))
+"""
+
+def run_quiz(tmp_path, max_bytes):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run(
+        [sys.executable, "-c", QUIZ_SCRIPT, str(max_bytes)], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return [parse_notification(data.encode()) for data in json.loads(result.stdout.strip().splitlines()[-1])]
+
+def test_parse_notification():
+    # Formato antigo, versão desconhecida e dados inválidos: o participante pede /get ou /rel
+    assert parse_notification(b"next") == ("next", None)
+    assert parse_notification(b"rel") == ("rel", None)
+    assert parse_notification(b'{"v":2,"type":"next","question":"?"}') == ("next", None)
+    assert parse_notification(b"{") == (None, None)
+    assert parse_notification(b'{"v":1}') == (None, None)
+    assert parse_notification(b'{"v":1,"type":"rel","quiz":1,"scores":null}') == ("rel", None)
+
+    payload = {"v": 1, "type": "rel", "quiz": 1, "scores": {"5": 10}}
+    assert parse_notification(json.dumps(payload).encode()) == ("rel", payload)
+
+def test_published_payloads(tmp_path):
+    notifications = run_quiz(tmp_path, 512 * 1024)
+    kinds = [kind for kind, _ in notifications]
+    assert kinds == ["next", "next", "next", "rel"]
+
+    questions = [payload for _, payload in notifications[:3]]
+    assert [payload["question_i"] for payload in questions] == [1, 2, 3]
+    assert all(payload["quiz"] == 1 and payload["question"] and len(payload["answers"]) == 4 for payload in questions)
+    # Todas as perguntas do quiz 1 valem 5 pontos e a resposta certa é a 1
+    assert notifications[-1][1] == {"v": 1, "type": "rel", "quiz": 1, "scores": {"5": 20}}
+
+def test_scores_too_large(tmp_path):
+    # As pontuações que não cabem no nó são omitidas: o participante pede /rel
+    notifications = run_quiz(tmp_path, 40)
+    assert notifications[-1] == ("rel", None)
+    assert all(payload is not None for _, payload in notifications[:3])
@@ -0,0 +1,103 @@
+"""
+Perfil das queries (kuko_profiler e GET /admin/queries): estatísticas por query e captura do plano das queries lentas.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_profiler import QueryProfiler
+
+# /admin/queries com e sem KUKO_PROFILE_QUERIES (corre num processo próprio: kuko_flask lê a variável ao ser importado)
+PROFILE_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+client.get("/quiz/1")
+client.get("/quiz/1")
+response = client.get("/admin/queries")
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps([response.status_code, response.get_json().get("data")]))
+"""
+
+def make_db():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE results (id_quiz INTEGER, id_participant INTEGER, score INTEGER)")
+    connection.execute("CREATE INDEX results_quiz ON results (id_quiz)")
+    return connection
+
+def test_stats():
+    connection = make_db()
+    profiler = QueryProfiler(slow_threshold=1)
+    by_quiz = "SELECT score\n    FROM results\n    WHERE id_quiz = ?"
+    profiler.record(connection, by_quiz, (1,), 0.25, 3)
+    profiler.record(connection, by_quiz, (2,), 0.75, 1)
+    profiler.record(connection, "INSERT INTO results VALUES (?, ?, ?)", None, 2.0, 10)
+
+    insert, select = profiler.report()
+    assert insert["statement"] == "INSERT INTO results VALUES (?, ?, ?)"
+    # Lenta, mas executada com executemany: sem plano
+    assert (insert["slow_calls"], insert["plan"], insert["full_scan"]) == (1, None, None)
+    assert select == {
+        "statement": "SELECT score FROM results WHERE id_quiz = ?", "calls": 2, "total_time": 1.0, "avg_time": 0.5,
+        "max_time": 0.75, "rows": 4, "slow_calls": 0, "plan": None, "full_scan": None,
+    }
+
+    profiler.reset()
+    assert profiler.report() == []
+
+def test_slow_query_plan(tmp_path):
+    connection = make_db()
+    profiler = QueryProfiler(slow_threshold=0.01)
+    by_quiz = "SELECT score FROM results WHERE id_quiz = ?"
+    by_participant = "SELECT score FROM results WHERE id_participant = ?"
+    profiler.record(connection, by_quiz, (1,), 0.02, 0)
+    profiler.record(connection, by_participant, (1,), 0.05, 0)
+    profiler.record(connection, "SELECT * FROM missing", (), 0.01, 0)
+
+    stats = {entry["statement"]: entry for entry in profiler.report()}
+    assert stats[by_quiz]["full_scan"] is False
+    assert any("results_quiz" in detail for detail in stats[by_quiz]["plan"])
+    assert stats[by_participant]["full_scan"] is True
+    assert stats[by_participant]["plan"][0].startswith("SCAN results")
+    assert stats["SELECT * FROM missing"]["plan"][0].startswith("EXPLAIN QUERY PLAN failed")
+
+    # O plano é capturado uma única vez por query
+    connection.execute("CREATE INDEX results_participant ON results (id_participant)")
+    profiler.record(connection, by_participant, (1,), 0.05, 0)
+    assert profiler.report()[0]["full_scan"] is True
+
+    path = str(tmp_path / "profile.json")
+    profiler.dump(path)
+    with open(path) as f:
+        dump = json.load(f)
+    assert dump["slow_threshold"] == 0.01
+    assert [entry["statement"] for entry in dump["queries"]] == [by_participant, by_quiz, "SELECT * FROM missing"]
+
+def run_profile_script(tmp_path, **env):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR", **env)
+    result = subprocess.run([sys.executable, "-c", PROFILE_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_admin_queries(tmp_path):
+    status, data = run_profile_script(
+        tmp_path, KUKO_PROFILE_QUERIES="1", KUKO_SLOW_QUERY_MS="0", KUKO_PROFILE_DUMP=str(tmp_path / "profile.json"),
+    )
+    assert status == 200
+    assert data and all(entry["calls"] >= 1 and entry["plan"] is not None for entry in data)
+    assert sum(entry["calls"] for entry in data) >= 2
+    # Escrito quando o processo termina
+    assert os.path.exists(tmp_path / "profile.json")
+
+def test_admin_queries_disabled(tmp_path):
+    assert run_profile_script(tmp_path, KUKO_PROFILE_QUERIES="0") == [404, None]
@@ -0,0 +1,71 @@
+"""
+Publicação em segundo plano das escritas no ZooKeeper (kuko_publisher): criação de nós, repetição e descarte de escritas
+que falham.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kazoo.exceptions import NoAuthError
+
+from kuko_publisher import ZkPublisher
+from tests.fake_zk import FakeZooKeeper
+
+class FailingZooKeeper(FakeZooKeeper):
+    """
+    ZooKeeper em que as escritas nos nós de bad_paths falham sempre (ex: sem permissões).
+    """
+
+    def __init__(self, bad_paths):
+        super().__init__()
+        self.bad_paths = bad_paths
+        self.attempts = {}
+
+    def set(self, path, value, version=-1):
+        self.attempts[path] = self.attempts.get(path, 0) + 1
+        if path in self.bad_paths:
+            raise NoAuthError(path)
+        return super().set(path, value, version)
+
+def test_set_creates_node():
+    zk = FakeZooKeeper()
+    publisher = ZkPublisher(zk)
+    publisher.start()
+
+    # O nó ainda não existe: set falha com NoNodeError e o nó é criado com os dados
+    publisher.set("/quiz/1", b"next")
+    publisher.ensure_path("/quiz/2")
+    assert publisher.flush(5)
+    publisher.stop()
+
+    assert zk.get("/quiz/1")[0] == b"next"
+    assert zk.exists("/quiz/2")
+    assert publisher.published == 2 and publisher.failures == 0
+
+def test_failing_node_is_dropped_without_blocking_others():
+    zk = FailingZooKeeper({"/quiz/1"})
+    publisher = ZkPublisher(zk, backoff=0.2, max_backoff=0.2, max_retries=3)
+    publisher.start()
+
+    publisher.set("/quiz/1", b"next")
+    time.sleep(0.05)
+
+    # O nó 1 está à espera de nova tentativa: a escrita do nó 2 é publicada sem esperar por ela
+    start = time.monotonic()
+    publisher.set("/quiz/2", b"next")
+    while zk.exists("/quiz/2") is None and time.monotonic() - start < 5:
+        time.sleep(0.01)
+    assert time.monotonic() - start < 0.15
+
+    assert publisher.flush(5)
+    publisher.stop()
+
+    assert zk.attempts["/quiz/1"] == 3
+    assert zk.exists("/quiz/1") is None
+    assert publisher.dropped == 1 and publisher.failures == 3 and publisher.published == 1
@@ -0,0 +1,36 @@
+"""
+Criação de qsets (POST /qset): validação das questões numa única query, mesmo com qsets muito grandes.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tests.test_scores import make_kuko
+
+def test_large_qset(tmp_path):
+    queries = []
+    kd, db = make_kuko(tmp_path, queries)
+
+    # schema.sql tem as questões 1 a 10; questões repetidas são permitidas
+    question_list = [i % 10 + 1 for i in range(5000)]
+    id_qset, missing = kd.add_new_question_set(question_list)
+    assert missing is None
+    assert len(queries) == 3  # validação, qset e questões do qset
+    assert db.execute("SELECT id_question FROM qset_question WHERE id_qset = ? ORDER BY position", (id_qset,)).fetchall() == [
+        (i,) for i in question_list
+    ]
+
+def test_missing_questions(tmp_path):
+    queries = []
+    kd, db = make_kuko(tmp_path, queries)
+    qsets = db.execute("SELECT COUNT(*) FROM qset").fetchone()[0]
+
+    # Questões que não existem, cada uma reportada uma vez, pela ordem dada
+    assert kd.add_new_question_set([3, 12, 1, 11, 12, 2] * 1000) == (False, ["12", "11"])
+    assert len(queries) == 1
+    assert db.execute("SELECT COUNT(*) FROM qset").fetchone()[0] == qsets
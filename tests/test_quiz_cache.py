@@ -0,0 +1,234 @@
+"""
+Cache de estado dos quizzes: leituras sem consultar a base de dados com um único processo, e vários processos a servir a
+mesma base de dados (cada um com a sua instância de Kuko).
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_cache import QuizStateCache
+from kuko_data import Kuko, NOT_REGISTERED_ERROR, QUIZ_CONFLICT_ERROR
+from setup_db import init_db
+
+# /get e /quiz condicionais, contando as queries feitas pelo Kuko (corre num processo próprio: kuko_flask lê
+# KUKO_DB_SHARED ao ser importado)
+ETAG_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+queries = []
+query_db = kuko_flask.kd.query_db
+kuko_flask.kd.query_db = lambda query, *args, **kwargs: queries.append(query) or query_db(query, *args, **kwargs)
+
+client.post("/reg/1", json={"client_id": 5})
+client.post("/launch/1", json={"client_id": 1})
+get = client.get("/get/1?client_id=5")
+status = client.get("/quiz/1")
+
+results = []
+for path, etag in (("/get/1?client_id=5", get.headers["ETag"]), ("/quiz/1", status.headers["ETag"])):
+    del queries[:]
+    response = client.get(path, headers={"If-None-Match": etag})
+    results.append([response.status_code, len(queries)])
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps(results))
+"""
+
+# /get com a resposta serializada uma única vez por pergunta, contando as serializações (corre num processo próprio)
+GET_SCRIPT = """
+import json
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+client = kuko_flask.app.test_client()
+serialized = []
+serialize_msg = kuko_flask.serialize_msg
+kuko_flask.serialize_msg = lambda **kwargs: serialized.append(kwargs["data"]["question_i"]) or serialize_msg(**kwargs)
+
+for participant in (5, 6, 7):
+    client.post("/reg/1", json={"client_id": participant})
+client.post("/launch/1", json={"client_id": 1})
+before = [serialized[:], kuko_flask.kd.quiz_cache.get(1).response is not None]
+bodies = [client.get(f"/get/1?client_id={participant}").get_data(as_text=True) for participant in (5, 6, 7)]
+client.post("/next/1", json={"client_id": 1})
+after = client.get("/get/1?client_id=5").get_data(as_text=True)
+not_registered = client.get("/get/1?client_id=8")
+kuko_flask.zk_publisher.stop()
+print(json.dumps([before, bodies, after, not_registered.status_code, serialized]))
+"""
+
+def server(dbname, shared=True, queries=None):
+    """
+    Devolve uma instância de Kuko com a sua própria conexão, como a de outro processo, e a conexão (para commit).
+    Se queries for uma lista, cada query executada é-lhe acrescentada.
+    """
+    connection = sqlite3.connect(dbname)
+
+    def query_db(query, args=(), one=False):
+        if queries is not None:
+            queries.append(query)
+        res = connection.execute(query, args).fetchall()
+        return (res[0] if res else None) if one else res
+
+    return Kuko(query_db, connection.executemany, shared=shared), connection
+
+def test_cache_hits_and_invalidation():
+    loads = []
+
+    def loader(id_quiz):
+        loads.append(id_quiz)
+        return None if id_quiz == 404 else (id_quiz, len(loads))
+
+    cache = QuizStateCache(loader, max_entries=2)
+    assert cache.get(1) == (1, 1)
+    assert cache.get(1) == (1, 1)
+    # Quizzes que não existem não ficam em cache
+    assert cache.get(404) is None and cache.get(404) is None
+
+    cache.invalidate(1)
+    assert cache.get(1) == (1, 4)
+
+    # Cheia: a entrada mais antiga (quiz 1) é descartada
+    cache.get(2)
+    cache.get(3)
+    cache.get(2)
+    assert loads == [1, 404, 404, 1, 2, 3]
+    cache.get(1)
+    assert loads[-1] == 1
+    assert cache.stats() == {"hits": 2, "misses": 7, "stale": 0, "entries": 2}
+
+def test_invalidation_during_load():
+    cache = None
+
+    def loader(id_quiz):
+        # O quiz é alterado (e a cache invalidada) enquanto o estado antigo é lido
+        cache.invalidate(id_quiz)
+        return "old state"
+
+    cache = QuizStateCache(loader)
+    assert cache.get(1) == "old state"
+    assert cache.stats() == {"hits": 0, "misses": 1, "stale": 0, "entries": 0}
+
+def test_single_process_reads_from_cache(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+    init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    queries = []
+    kd, db = server(dbname, shared=False, queries=queries)
+
+    assert kd.register_participant(1, 5)[0]
+    assert kd.launch_quiz(1)
+    db.commit()
+    assert kd.get_quiz_status(1) == ("ONGOING", 0)
+
+    # Estado em cache: nem a versão do quiz é lida
+    del queries[:]
+    assert kd.get_quiz_status(1) == ("ONGOING", 0)
+    assert kd.get_current_question(1, 5)[0]
+    assert queries == []
+
+    # As alterações feitas por este processo invalidam a cache
+    assert kd.go_to_next_question(1) == (True,)
+    db.commit()
+    assert kd.get_quiz_status(1) == ("ONGOING", 1)
+
+def test_changes_by_other_process(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+    init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    a, a_db = server(dbname)
+    b, b_db = server(dbname)
+
+    # Estado do quiz 1 (PREPARED) fica em cache em B
+    assert b.get_quiz_status(1) == ("PREPARED", 0)
+
+    assert a.register_participant(1, 5)[0]
+    assert a.launch_quiz(1)
+    a_db.commit()
+
+    assert b.get_quiz_status(1) == ("ONGOING", 0)
+    assert b.get_current_question(1, 5)[0]
+    assert b.answer_question(1, 1, 5)[0]
+    b_db.commit()
+
+    assert a.go_to_next_question(1) == (True,)
+    a_db.commit()
+
+    success = b.get_current_question(1, 5)
+    assert success[0] and success[1].question_i == 1
+    assert b.answer_question(1, 1, 7) == (False, NOT_REGISTERED_ERROR)
+    assert b.quiz_cache.stats()["stale"] == 2
+
+def test_version_conflicts(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+    init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    a, a_db = server(dbname)
+    b, b_db = server(dbname)
+
+    assert a.register_participant(1, 5)[0]
+    assert a.launch_quiz(1)
+    a_db.commit()
+    assert b.get_quiz_status(1) == ("ONGOING", 0)
+
+    # A resposta é validada com o estado em cache em B, mas o quiz avançou entretanto: não é registada
+    assert a.go_to_next_question(1) == (True,)
+    a_db.commit()
+    assert b.answer_question(1, 1, 5) == (False, QUIZ_CONFLICT_ERROR)
+    b_db.rollback()
+    assert b.answer_question(1, 1, 5)[0]
+    b_db.commit()
+    assert b_db.execute("SELECT question_i FROM results WHERE id_quiz = 1").fetchall() == [(1,)]
+
+    # Dois /next em simultâneo: o quiz é alterado por A entre a leitura e a escrita de B, que não avança
+    query_db = b.query_db
+
+    def next_in_between(query, *args, **kwargs):
+        res = query_db(query, *args, **kwargs)
+        if query.startswith("SELECT q.state, q.question_i"):
+            assert a.go_to_next_question(1) == (True,)
+            a_db.commit()
+        return res
+
+    b.query_db = next_in_between
+    assert b.go_to_next_question(1) == (False, QUIZ_CONFLICT_ERROR)
+    b_db.rollback()
+    b.query_db = query_db
+    assert b.get_quiz_status(1) == ("ONGOING", 2)
+
+def run_etag_script(tmp_path, shared):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_DB_SHARED=shared, KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", ETAG_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_not_modified_without_queries(tmp_path):
+    # Um único processo: 304 sem consultar a base de dados
+    assert run_etag_script(tmp_path, "0") == [[304, 0], [304, 0]]
+
+def test_not_modified_shared(tmp_path):
+    # Base de dados partilhada: só a versão do quiz é lida
+    assert run_etag_script(tmp_path, "1") == [[304, 1], [304, 1]]
+
+def test_serialized_current_question(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", GET_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    before, bodies, after, not_registered, serialized = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Serializada em /launch, antes dos pedidos dos participantes, e enviada igual a todos
+    assert before == [[0], True]
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert json.loads(bodies[0])["data"]["question_i"] == 0
+
+    # Nova pergunta: a resposta anterior é descartada com o estado do quiz
+    assert json.loads(after)["data"]["question_i"] == 1
+    assert not_registered == 400
+    assert serialized == [0, 1]
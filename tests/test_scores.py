@@ -0,0 +1,106 @@
+"""
+Pontuações dos quizzes: cálculo agregado a partir de results, e pontuações mantidas em quiz_score à medida que as
+respostas são registadas.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_data import Kuko
+from setup_db import init_db
+
+def make_kuko(tmp_path, queries=None):
+    """
+    Devolve uma instância de Kuko sobre uma base de dados nova (schema.sql), e a conexão (para commit).
+    Se queries for uma lista, cada query executada é-lhe acrescentada.
+    """
+    dbname = str(tmp_path / "kuko.db")
+    init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    connection = sqlite3.connect(dbname)
+
+    def query_db(query, args=(), one=False):
+        if queries is not None:
+            queries.append(query)
+        res = connection.execute(query, args).fetchall()
+        return (res[0] if res else None) if one else res
+
+    return Kuko(query_db, connection.executemany), connection
+
+def expected_scores(connection, id_quiz):
+    """
+    Pontuações calculadas resposta a resposta (como antes da query agregada), para comparação.
+    """
+    scores = {}
+    for question_i, participant, answer in connection.execute(
+        "SELECT question_i, participant, answer FROM results WHERE id_quiz = ? ORDER BY question_i, participant", (id_quiz,)
+    ):
+        k, points = connection.execute(
+            "SELECT qu.k, qp.points FROM quiz q "
+            "JOIN qset_question qq ON qq.id_qset = q.id_qset AND qq.position = ? "
+            "JOIN question qu ON qu.id_question = qq.id_question "
+            "JOIN quiz_points qp ON qp.id_quiz = q.id_quiz AND qp.position = ? WHERE q.id_quiz = ?",
+            (question_i, question_i, id_quiz)
+        ).fetchone()
+        score, first = scores.get(participant, (0, question_i))
+        scores[participant] = (score + (points if answer == k else 0), first)
+    return sorted((participant, score, first) for participant, (score, first) in scores.items())
+
+def test_compute_quiz_scores(tmp_path):
+    kd, db = make_kuko(tmp_path)
+    (id_quiz,), _ = kd.add_new_quiz(1, [1, 2, 3, 4])
+    # A resposta certa de todas as perguntas do qset 1 é a 1
+    db.executemany(
+        "INSERT INTO results (id_quiz, question_i, participant, answer) VALUES (?, ?, ?, ?)",
+        [(id_quiz, 0, 8, 1), (id_quiz, 1, 8, 2), (id_quiz, 2, 8, 1), (id_quiz, 1, 7, 1), (id_quiz, 3, 7, 1), (id_quiz, 0, 9, 3)],
+    )
+    # Respostas a outro quiz não contam
+    db.execute("INSERT INTO results (id_quiz, question_i, participant, answer) VALUES (1, 0, 7, 1)")
+
+    scores = sorted(kd.compute_quiz_scores(id_quiz))
+    assert scores == [(7, 6, 1), (8, 4, 0), (9, 0, 0)]
+    assert scores == expected_scores(db, id_quiz)
+    assert kd.compute_quiz_scores(1) == [(7, 5, 0)]
+
+def test_scores_kept_at_answer_time(tmp_path):
+    kd, db = make_kuko(tmp_path)
+    (id_quiz,), _ = kd.add_new_quiz(1, [1, 2, 3, 4])
+    for participant in (7, 8):
+        assert kd.register_participant(id_quiz, participant)[0]
+    assert kd.launch_quiz(id_quiz)
+
+    assert kd.answer_question(id_quiz, 1, 8) == (True, "Correct")
+    assert kd.go_to_next_question(id_quiz) == (True,)
+    assert kd.answer_question(id_quiz, 1, 7) == (True, "Correct")
+    assert kd.answer_question(id_quiz, 2, 8) == (True, "Incorrect")
+
+    # Pontuação atual de cada participante, a meio do quiz
+    assert kd.get_participant_score(id_quiz, 7) == (True, 2)
+    assert kd.get_participant_score(id_quiz, 8) == (True, 1)
+    assert kd.get_quiz_report(id_quiz) == (False, "Quiz is ongoing.")
+
+    for _ in range(3):
+        kd.go_to_next_question(id_quiz)
+    # Ordenados pela primeira pergunta respondida
+    assert kd.get_quiz_report(id_quiz) == (id_quiz, {8: 1, 7: 2})
+    assert list(kd.get_quiz_report(id_quiz)[1]) == [8, 7]
+    assert kd.check_quiz_scores(id_quiz) == []
+
+def test_check_and_rebuild_scores(tmp_path):
+    kd, db = make_kuko(tmp_path)
+    (id_quiz,), _ = kd.add_new_quiz(1, [1, 2, 3, 4])
+    assert kd.register_participant(id_quiz, 7)[0]
+    assert kd.launch_quiz(id_quiz)
+    assert kd.answer_question(id_quiz, 1, 7) == (True, "Correct")
+
+    # Pontuação guardada diferente da calculada a partir de results (ex: escrita interrompida)
+    db.execute("UPDATE quiz_score SET score = 10 WHERE id_quiz = ?", (id_quiz,))
+    assert kd.check_quiz_scores(id_quiz) == [(7, 10, 1)]
+    kd.rebuild_quiz_scores(id_quiz)
+    assert kd.check_quiz_scores(id_quiz) == []
+    assert kd.get_participant_score(id_quiz, 7) == (True, 1)
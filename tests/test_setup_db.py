@@ -0,0 +1,112 @@
+"""
+Preparação da base de dados e conexões (setup_db): pool de conexões de longa duração e migração de bases de dados com o
+esquema antigo.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from setup_db import SCHEMA_VERSION, ConnectionPool, connect_db, init_db
+
+# Esquema antigo (sem user_version), com as listas guardadas como texto separado por ';'
+OLD_SCHEMA = """
+CREATE TABLE question (id_question INTEGER PRIMARY KEY, question TEXT NOT NULL, answers TEXT NOT NULL, k INT NOT NULL);
+CREATE TABLE qset (id_qset INTEGER PRIMARY KEY, questions TEXT NOT NULL);
+CREATE TABLE quiz (
+    id_quiz INTEGER PRIMARY KEY, id_qset INTEGER, state VARCHAR(50) DEFAULT 'PREPARED', points TEXT,
+    timestamp_p DATETIME, timestamp_e DATETIME, question_i INT DEFAULT 0, participants TEXT
+);
+CREATE TABLE results (id_quiz INTEGER, question_i INT, participant INT, answer INT, PRIMARY KEY (id_quiz, question_i, participant));
+INSERT INTO question (question, answers, k) VALUES ('Q1?', 'a;b;c', 1), ('Q2?', 'x;y', 2);
+INSERT INTO qset (questions) VALUES ('2;1');
+INSERT INTO quiz (id_qset, state, points, question_i, participants) VALUES (1, 'ONGOING', '5;3', 1, '7;8;7');
+INSERT INTO results VALUES (1, 0, 7, 2), (1, 0, 8, 1), (1, 1, 7, 1);
+"""
+
+def make_db(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+    assert init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    return dbname
+
+def test_init_db_once(tmp_path):
+    dbname = make_db(tmp_path)
+
+    # Base de dados já existente: não é recriada (os dados ficam)
+    assert not init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    connection = connect_db(dbname)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("SELECT COUNT(*) FROM question").fetchone()[0] == 10
+    connection.close()
+
+def test_connect_db_options(tmp_path):
+    dbname = make_db(tmp_path)
+    connection = connect_db(dbname, synchronous="full", mmap_size=4096)
+    assert connection.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+    assert connection.execute("PRAGMA mmap_size").fetchone()[0] == 4096
+    connection.close()
+
+    with pytest.raises(ValueError):
+        connect_db(dbname, synchronous="SOMETIMES")
+
+def test_pool_reuses_connections(tmp_path):
+    dbname = make_db(tmp_path)
+    pool = ConnectionPool(dbname, max_idle=1, synchronous="OFF")
+
+    a = pool.acquire()
+    assert a.execute("PRAGMA synchronous").fetchone()[0] == 0  # OFF
+    a.execute("INSERT INTO qset DEFAULT VALUES")
+    assert a.in_transaction
+    pool.release(a)
+
+    # A mesma conexão é reutilizada, sem a transação que ficou por terminar
+    assert pool.acquire() is a
+    assert not a.in_transaction
+    assert a.execute("SELECT COUNT(*) FROM qset").fetchone()[0] == 1
+
+    # Com a conexão em uso, é aberta outra; acima de max_idle, as conexões devolvidas são fechadas
+    b = pool.acquire()
+    assert b is not a
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire() is a
+    with pytest.raises(sqlite3.ProgrammingError):
+        b.execute("SELECT 1")
+
+    pool.release(a)
+    pool.close_all()
+    with pytest.raises(sqlite3.ProgrammingError):
+        a.execute("SELECT 1")
+
+def test_migrate_old_schema(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+    connection = sqlite3.connect(dbname)
+    connection.executescript(OLD_SCHEMA)
+    connection.close()
+
+    assert not init_db(dbname, os.path.join(ROOT, "schema.sql"))
+    connection = connect_db(dbname)
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    # Listas passadas para as suas tabelas, pela ordem original (participantes repetidos só uma vez)
+    assert connection.execute("SELECT id_question, position, answer FROM question_answer ORDER BY 1, 2").fetchall() == [
+        (1, 1, "a"), (1, 2, "b"), (1, 3, "c"), (2, 1, "x"), (2, 2, "y")
+    ]
+    assert connection.execute("SELECT position, id_question FROM qset_question ORDER BY 1").fetchall() == [(0, 2), (1, 1)]
+    assert connection.execute("SELECT position, points FROM quiz_points ORDER BY 1").fetchall() == [(0, 5), (1, 3)]
+    assert connection.execute("SELECT participant FROM quiz_participant ORDER BY 1").fetchall() == [(7,), (8,)]
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(quiz)")}
+    assert "points" not in columns and "participants" not in columns and "version" in columns
+
+    # Pontuações calculadas a partir das respostas já dadas (7 acertou nas duas perguntas, 8 em nenhuma)
+    assert connection.execute("SELECT participant, score, first_question_i FROM quiz_score ORDER BY 1").fetchall() == [
+        (7, 8, 0), (8, 0, 0)
+    ]
+    connection.close()
@@ -0,0 +1,78 @@
+"""
+Arranque do servidor com a base de dados dividida em shards (KUKO_DB_SHARDS).
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server(dbname, shards):
+    """
+    Importa kuko_flask num processo próprio (o arranque prepara a base de dados) e devolve o resultado do processo.
+    """
+    env = dict(os.environ, KUKO_DB=dbname, KUKO_DB_SHARDS=str(shards), KUKO_LOG_LEVEL="WARNING")
+    return subprocess.run(
+        [sys.executable, "-c", "import kuko_flask"], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+
+# Cria quizzes a partir de várias threads ao mesmo tempo (kuko_flask importado com KUKO_DB_SHARDS do ambiente)
+CREATE_SCRIPT = """
+import threading
+import kuko_flask
+from tests import fake_zk
+fake_zk.install(kuko_flask)
+
+statuses = []
+
+def create():
+    client = kuko_flask.app.test_client()
+    for _ in range(10):
+        statuses.append(client.post("/quiz", json={"qset_id": 1, "scores": [1, 1, 1, 1], "client_id": 1}).status_code)
+
+threads = [threading.Thread(target=create) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+kuko_flask.zk_publisher.stop(0)
+assert statuses == [200] * 80, statuses
+"""
+
+def quiz_ids(path):
+    connection = sqlite3.connect(path)
+    try:
+        return [quiz[0] for quiz in connection.execute("SELECT id_quiz FROM quiz ORDER BY id_quiz")]
+    finally:
+        connection.close()
+
+def test_clean_sharded_start(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+
+    result = start_server(dbname, 2)
+    assert result.returncode == 0, result.stderr
+
+    # O quiz de exemplo de schema.sql fica no seu shard, e não na base de dados principal
+    assert quiz_ids(dbname) == []
+    assert quiz_ids(str(tmp_path / "kuko.shard0.db")) == [1]
+    assert quiz_ids(str(tmp_path / "kuko.shard1.db")) == []
+
+    # Um segundo arranque encontra os dados já distribuídos
+    result = start_server(dbname, 2)
+    assert result.returncode == 0, result.stderr
+
+def test_concurrent_quizzes_balanced(tmp_path):
+    dbname = str(tmp_path / "kuko.db")
+    env = dict(os.environ, KUKO_DB=dbname, KUKO_DB_SHARDS="2", KUKO_LOG_LEVEL="WARNING")
+    result = subprocess.run(
+        [sys.executable, "-c", CREATE_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+
+    # 80 quizzes novos, à vez pelos dois shards, além do quiz de exemplo (no shard 0)
+    assert len(quiz_ids(str(tmp_path / "kuko.shard0.db"))) == 41
+    assert len(quiz_ids(str(tmp_path / "kuko.shard1.db"))) == 40
@@ -0,0 +1,94 @@
+"""
+KukoStub: os pedidos ao servidor reutilizam as conexões (e o handshake mTLS) da sessão HTTP persistente.
+O servidor é um servidor HTTPS mínimo, com certificados gerados para o teste com o comando openssl.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import shutil
+import ssl
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_stub import make_certificates
+from kuko_stub import KukoStub, make_session
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="requer openssl")
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.server.paths.append(f"{self.command} {self.path}")
+        body = json.dumps({"title": "OK"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = reply
+
+    def log_message(self, *args):
+        pass
+
+class CountingServer(ThreadingHTTPServer):
+    """
+    Servidor HTTPS (mTLS) que conta as conexões aceites.
+    """
+    daemon_threads = True
+
+    def __init__(self, folder):
+        super().__init__(("localhost", 0), Handler)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH, cafile=os.path.join(folder, "root.pem"))
+        context.load_cert_chain(os.path.join(folder, "serv.crt"), os.path.join(folder, "serv.key"))
+        context.verify_mode = ssl.CERT_REQUIRED
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.connections = 0
+        self.paths = []
+
+    def get_request(self):
+        request = super().get_request()
+        self.connections += 1
+        return request
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    make_certificates(str(tmp_path))
+    # make_session procura o certificado da CA (root.pem) na pasta atual
+    monkeypatch.chdir(tmp_path)
+    server = CountingServer(str(tmp_path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_make_session():
+    session = make_session(("cli.crt", "cli.key"), ca_file="ca.pem", pool_size=3)
+    assert (session.verify, session.cert, session.trust_env) == ("ca.pem", ("cli.crt", "cli.key"), False)
+    assert session.get_adapter("https://localhost:5000")._pool_maxsize == 3
+
+def test_requests_reuse_connection(server):
+    cert = ("cli.crt", "cli.key")
+    stub = KukoStub("localhost", server.server_address[1], cert, 1, pool_size=2, notifications="sse")
+    # Uma conexão é reservada para /stream
+    assert stub.session.get_adapter(stub.base_url)._pool_maxsize == 3
+
+    stub.get(1, 5)
+    stub.ans(1, 2, 5)
+    stub.get(1, 5)
+    stub.score(1, 5)
+    stub.close_zh()
+
+    assert server.paths == ["GET /get/1?client_id=5", "POST /ans/1", "GET /get/1?client_id=5", "GET /score/1?client_id=5"]
+    assert server.connections == 1
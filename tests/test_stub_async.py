@@ -0,0 +1,80 @@
+"""
+AsyncKukoClient: vários participantes num só processo, com um pool HTTP e uma sessão ZooKeeper partilhados, e um único
+watch por quiz. Os pedidos passam pela app assíncrona (kuko_asgi) através de httpx.ASGITransport, sem rede.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Quiz completo com três participantes: cada um responde a cada pergunta recebida na notificação do quiz (corre num
+# processo próprio, com a sua base de dados)
+QUIZ_SCRIPT = """
+import asyncio
+import json
+import httpx
+import kuko_flask
+from tests import fake_zk
+from kuko_asgi import app
+from kuko_stub_async import AsyncKukoClient
+
+fake = fake_zk.install(kuko_flask)
+
+async def main():
+    client = AsyncKukoClient("localhost", 5000, None, zk=fake, transport=httpx.ASGITransport(app=app))
+    await client.start()
+    admin = client.participant(1)
+    status, response = await admin.quiz("1", ["10"] * 4, 1)
+    id_quiz = int(response["message"].rsplit(" ", 1)[1])
+
+    answers = {5: [1, 1, 1, 1], 6: [2, 2, 2, 2], 7: [1, 2, 2, 2]}
+    seen = {participant: [] for participant in answers}
+    answered = asyncio.Semaphore(0)
+
+    async def on_question(stub, question):
+        seen[stub.client_id].append(question["question_i"])
+        await stub.ans(id_quiz, answers[stub.client_id][question["question_i"]], stub.client_id)
+        answered.release()
+
+    stubs = [client.participant(participant) for participant in answers]
+    statuses = [(await stub.reg(id_quiz, stub.client_id))[0] for stub in stubs]
+    statuses.append((await admin.launch(id_quiz, 1))[0])
+    listeners = [asyncio.create_task(stub.listen(id_quiz, on_question)) for stub in stubs]
+    # A primeira pergunta é pedida; as seguintes chegam nas notificações
+    for stub in stubs:
+        status, response = await stub.get(id_quiz, stub.client_id)
+        await on_question(stub, response["data"])
+
+    for _ in range(4):
+        for _ in stubs:
+            await answered.acquire()
+        statuses.append((await admin.next(id_quiz, 1))[0])
+
+    scores = await asyncio.wait_for(asyncio.gather(*listeners), 10)
+    watches = len(fake._data_watches[f"/quiz/{id_quiz}"])
+    await client.close()
+    return [statuses, seen, scores, watches, client.subscribers]
+
+result = asyncio.run(main())
+kuko_flask.zk_publisher.stop(0)
+print(json.dumps(result))
+"""
+
+def test_quiz_with_shared_client(tmp_path):
+    env = dict(os.environ, KUKO_DB=str(tmp_path / "kuko.db"), KUKO_LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-c", QUIZ_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    statuses, seen, scores, watches, subscribers = json.loads(result.stdout.strip().splitlines()[-1])
+    assert statuses == [200] * 8
+    assert seen == {"5": [0, 1, 2, 3], "6": [0, 1, 2, 3], "7": [0, 1, 2, 3]}
+    # Pontuações entregues na notificação do fim do quiz, sem pedir /rel
+    assert scores == [{"5": 40, "6": 0, "7": 10}] * 3
+    assert watches == 1
+    # Cada participante deixa de estar inscrito quando o quiz termina
+    assert list(subscribers.values()) == [{}]
@@ -0,0 +1,204 @@
+"""
+Escritas com group commit (kuko_writer): escritas e commits que falham dentro de um grupo, tempo máximo de espera e fim
+da thread de escrita.
+
+Uso (a partir da raiz do repositório):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kuko_writer import GroupCommitWriter, WriterUnavailableError
+
+class Database:
+    """
+    Base de dados de teste, com uma tabela t (x INTEGER); connect é a função de conexão do writer, e connection a conexão
+    que a thread de escrita está a usar.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+        self.broken = False  # se True, RELEASE falha (ex: erro de I/O), o que termina a thread de escrita
+        self.commit_error = None  # se definido, exceção lançada pelo próximo commit
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+
+    @contextmanager
+    def connect(self):
+        self.connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        try:
+            yield self
+        finally:
+            self.connection.close()
+
+    def execute(self, sql, *args):
+        if self.broken and sql.startswith("RELEASE"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.connection.execute(sql, *args)
+
+    def commit(self):
+        if self.commit_error is not None:
+            error, self.commit_error = self.commit_error, None
+            raise error
+        self.connection.execute("COMMIT")
+
+    def rollback(self):
+        self.connection.execute("ROLLBACK")
+
+    def insert(self, x):
+        self.execute("INSERT INTO t VALUES (?)", (x,))
+        return x
+
+    def rows(self):
+        with sqlite3.connect(self.path) as connection:
+            return [x for x, in connection.execute("SELECT x FROM t ORDER BY x")]
+
+def submit(writer, results, function, *args):
+    """
+    Corre writer.submit numa thread, juntando a results o resultado ou a exceção.
+    """
+    def run():
+        try:
+            results.append(writer.submit(function, *args))
+        except BaseException as e:
+            results.append(e)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def failing_insert(db, x):
+    db.insert(x)
+    raise ValueError(x)
+
+def submit_group(writer, writes):
+    """
+    Submete as escritas uma a uma, cada uma depois de a anterior estar a ser executada, e devolve os resultados pela ordem
+    das escritas.
+    """
+    results = [[] for _ in writes]
+    threads = []
+    for i, (function, *args) in enumerate(writes):
+        started = threading.Event()
+
+        def write(function=function, args=args, started=started):
+            started.set()
+            return function(*args)
+        threads.append(submit(writer, results[i], write))
+        started.wait(5)
+    for thread in threads:
+        thread.join(5)
+    return [result[0] for result in results]
+
+def test_failed_write_rolls_back_its_savepoint(tmp_path):
+    db = Database(str(tmp_path / "kuko.db"))
+    writer = GroupCommitWriter(db.connect, max_batch=2, max_delay=2)
+    writer.start()
+    results = submit_group(writer, [(db.insert, 1), (failing_insert, db, 2), (db.insert, 3)])
+    writer.stop()
+
+    # Só as alterações da escrita que falhou são revertidas; as outras são commited no mesmo grupo
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+    assert db.rows() == [1, 3]
+    assert writer.commits == 1 and writer.committed == 2
+
+def test_commit_failure_fails_every_write(tmp_path):
+    db = Database(str(tmp_path / "kuko.db"))
+    db.commit_error = sqlite3.OperationalError("disk I/O error")
+    writer = GroupCommitWriter(db.connect, max_batch=3, max_delay=0.5)
+    writer.start()
+    results = submit_group(writer, [(db.insert, 1), (db.insert, 2), (db.insert, 3)])
+
+    assert all(isinstance(result, sqlite3.OperationalError) for result in results)
+    assert db.rows() == []
+    assert writer.failures == 1 and writer.commits == 0
+
+    # O writer continua a funcionar depois do commit falhado
+    assert writer.submit(db.insert, 4) == 4
+    writer.stop()
+    assert db.rows() == [4]
+
+def test_writer_death_fails_writes():
+    @contextmanager
+    def connect():
+        raise sqlite3.OperationalError("unable to open database file")
+        yield
+
+    writer = GroupCommitWriter(connect, timeout=5)
+    writer.start()
+    writer._thread.join(5)
+
+    # A thread terminou: as escritas seguintes falham logo, em vez de esperarem para sempre
+    start = time.monotonic()
+    with pytest.raises(WriterUnavailableError) as error:
+        writer.submit(lambda: None)
+    assert time.monotonic() - start < 1
+    assert isinstance(error.value.__cause__, sqlite3.OperationalError)
+    assert writer.failures == 1
+
+def test_writer_death_fails_queued_writes(tmp_path):
+    db = Database(str(tmp_path / "kuko.db"))
+    started = threading.Event()
+    release = threading.Event()
+
+    def fatal_write():
+        db.insert(1)
+        started.set()
+        release.wait(5)
+        db.broken = True
+
+    writer = GroupCommitWriter(db.connect, timeout=5)
+    writer.start()
+    results = []
+    threads = [submit(writer, results, fatal_write)]
+    started.wait(5)
+    # Escrita na fila enquanto a anterior está a ser executada
+    threads.append(submit(writer, results, db.insert, 2))
+    while writer.pending() == 0:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 2
+    assert all(isinstance(result, WriterUnavailableError) for result in results)
+    assert db.rows() == []
+
+def test_submit_timeout(tmp_path):
+    db = Database(str(tmp_path / "kuko.db"))
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_write():
+        started.set()
+        release.wait(5)
+        return db.insert(1)
+
+    writer = GroupCommitWriter(db.connect, timeout=0.2)
+    writer.start()
+    results = []
+    first = submit(writer, results, slow_write)
+    started.wait(5)
+
+    # A primeira escrita bloqueia a thread; a segunda fica na fila, desiste e não chega a ser escrita
+    start = time.monotonic()
+    with pytest.raises(WriterUnavailableError, match="didn't run"):
+        writer.submit(db.insert, 2)
+    assert time.monotonic() - start < 1
+    first.join(5)
+    assert isinstance(results[0], WriterUnavailableError) and "didn't commit" in str(results[0])
+
+    release.set()
+    writer.stop()
+    # A primeira já estava a ser executada: é commited, apesar de o pedido ter desistido
+    assert db.rows() == [1]
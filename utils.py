@@ -1,12 +1,16 @@
-from flask import jsonify
+from logging import DEBUG
+from flask import jsonify, current_app
+from kuko_logging import log, request_sampled
 
-def return_error_success_msg(descriptor = None, code = None, title = None, detail = None, param = None):
+def build_msg(descriptor = None, code = None, title = None, detail = None, param = None, data = None):
     
     if not descriptor and detail:
         msg = {
             "message": f"{detail}{param if param else ''}",
             "httpStatus": code
         }
+        if data is not None:
+            msg["data"] = data  # resultados estruturados (ex: resultado de cada resposta de um batch)
     else:
         msg = {
             "describedBy": descriptor,
@@ -15,9 +19,30 @@ def return_error_success_msg(descriptor = None, code = None, title = None, detai
             "detail": detail
         }
 
-    print("SENT", msg)
+    return msg
+
+def return_error_success_msg(descriptor = None, code = None, title = None, detail = None, param = None, data = None):
+
+    msg = build_msg(descriptor, code, title, detail, param, data)
+
+    if log.isEnabledFor(DEBUG) and request_sampled():
+        log.debug("SENT %s", msg, extra={"status": code})
     return jsonify(msg), code
 
+def serialize_msg(descriptor = None, code = None, title = None, detail = None, param = None, data = None):
+    """
+    Serializa uma mensagem (tal como return_error_success_msg a enviaria), para ser guardada e reenviada com return_serialized_msg.
+    """
+    return jsonify(build_msg(descriptor, code, title, detail, param, data)).get_data()
+
+def return_serialized_msg(body, code):
+    """
+    Envia uma mensagem já serializada (ver serialize_msg), sem a voltar a construir.
+    """
+    if log.isEnabledFor(DEBUG) and request_sampled():
+        log.debug("SENT %s", body.decode(), extra={"status": code})
+    return current_app.response_class(body, mimetype="application/json"), code
+
 NOT_FOUND_URL = "http://example.com/notfound"
 
 NOT_FOUND_TITLE = "NOT FOUND"
@@ -30,6 +55,18 @@ BAD_REQUEST_URL = "http://example.com/badrequest"
 
 BAD_REQUEST_TITLE = "BAD REQUEST"
 
+SERVICE_UNAVAILABLE_URL = "http://example.com/serviceunavailable"
+
+SERVICE_UNAVAILABLE_TITLE = "SERVICE UNAVAILABLE"
+
+CONFLICT_URL = "http://example.com/conflict"
+
+CONFLICT_TITLE = "CONFLICT"
+
+SERVICE_UNAVAILABLE_ERROR = "Server is handling too many requests. Try again later."
+
+DATABASE_UNAVAILABLE_ERROR = "Couldn't save changes to the database. Try again later."
+
 ERROR_QUESTION_ID_DOES_NOT_EXIST = "Question with given id does not exist in the database."
 
 INTERNAL_SERVER_ERROR = "Something went wrong retrieving the information."
@@ -46,6 +83,10 @@ POST_QUESTION_LIST_ERROR = "Invalid data submitted (possible answers must be a l
 
 POST_QUESTION_K_ERROR = "Invalid data submitted (right answer must be a number between 1 and the number of possible answers given)."
 
+POST_QUESTION_BULK_SUCCESS = "Questions successfully imported.\nQuestions imported: "
+
+POST_QUESTION_BULK_LINE_ERROR = "Invalid line (must be a JSON object with question - string -, answers - list of strings - and right_answer - integer)."
+
 BAD_REQUEST_PARAMS = "Insufficient parameters."
 
 POST_QSET_SUCCESS = "QSet successfully added to the database.\nQSet ID: "
@@ -56,6 +97,8 @@ POST_QSET_LIST_ERROR = "Invalid data submitted. Field - questions to add to qset
 
 POST_QSET_IDS_DONT_EXIST = "Invalid data submitted (given question IDS don't correspond to existing data in the database)."
 
+POST_QSET_MISSING_IDS = "\nMissing question IDs: "
+
 GET_QUIZ_STATUS_SUCCESS = "Successfully retrieved quiz information from database.\nQuiz status: "
 
 GET_QUIZ_STATUS_ERROR = "Quiz with given id does not exist in the database."
@@ -90,10 +133,22 @@ POST_ANS_CODE_ERROR = "Invalid data submitted (command code to launch a quiz mus
 
 POST_ANS_SUCCESS = "Sucessfully registered answer.\nCorrect answer? "
 
+POST_ANS_BATCH_SUCCESS = "Sucessfully processed answers.\nAnswers registered: "
+
+POST_ANS_BATCH_SIZE_ERROR = "Too many answers in a single request. Maximum: "
+
 GET_REL_SUCCESS = "Sucessfully retrieved report.\nScores: "
 
+GET_SCORE_SUCCESS = "Sucessfully retrieved participant's score.\nScore: "
+
 GET_QSET_QUESTIONS_SUCCESS = "Successfully retrieved qset questions.Questions: "
 
 GET_QSET_QUESTIONS_ERROR = "Qset with given ID doesn't exist in database."
 
+GET_QUERY_PROFILE_SUCCESS = "Successfully retrieved query profile."
+
+QUERY_PROFILE_DISABLED_ERROR = "Query profiling is disabled (set KUKO_PROFILE_QUERIES=1)."
+
+STREAM_NOT_REGISTERED_ERROR = "Participant is not registered in quiz."
+
 NEXT_ERROR = "Quiz is currently not ongoing"
\ No newline at end of file